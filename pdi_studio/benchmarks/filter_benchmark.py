@@ -0,0 +1,94 @@
+"""
+Benchmark do motor de convolução (models/filter_model.py)
+
+Para cada tamanho de kernel, mede a convolução direta (cv2.filter2D), a DFT da imagem
+inteira e, para kernels separáveis, as duas passadas 1D, e mostra a partir de que
+tamanho a DFT passa a ganhar. Os resultados orientam DFT_MIN_KERNEL_SIZE e
+DFT_MIN_SEPARABLE_SIZE.
+
+Uso (a partir da pasta pdi_studio):
+    python benchmarks/filter_benchmark.py [--width 2000] [--height 2000] [--runs 3]
+                                          [--sizes 3,5,9,...] [--channels 1]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from models.filter_model import FilterModel, separate_kernel  # noqa: E402
+
+DEFAULT_SIZES = [3, 5, 9, 15, 21, 31, 51, 75, 101, 151, 201, 301, 401, 601, 801, 1001, 1201]
+
+def measure(function, runs):
+    """Mediana do tempo de execução (segundos), depois de uma execução de aquecimento"""
+    function()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+def crossover(sizes, slow, fast):
+    """Menor tamanho a partir do qual `fast` vence `slow` em todos os tamanhos seguintes"""
+    winner = None
+    for size, a, b in zip(reversed(sizes), reversed(slow), reversed(fast)):
+        if b >= a:
+            break
+        winner = size
+    return winner
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos de convolução")
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=2000)
+    parser.add_argument("--channels", type=int, default=1, help="1 (cinza) ou 3 (BGR)")
+    parser.add_argument("--runs", type=int, default=3, help="execuções por medição")
+    parser.add_argument("--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)),
+                        help="lados dos kernels, separados por vírgula")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shape = (args.height, args.width) if args.channels == 1 else (args.height, args.width, args.channels)
+    image = rng.random(shape, dtype=np.float32)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    sizes = [size for size in sizes if size < min(args.width, args.height)]
+    filters = FilterModel()
+
+    print(f"Imagem {args.width}x{args.height}x{args.channels} float32, mediana de {args.runs} execuções (ms)")
+    print(f"{'kernel':>7} {'direto':>9} {'DFT':>9} {'separável':>10} {'erro DFT':>10}")
+    direct_times, dft_times, separable_times = [], [], []
+    for size in sizes:
+        # Kernel genérico (posto cheio) e kernel separável do mesmo tamanho
+        kernel = rng.random((size, size), dtype=np.float32)
+        kernel /= kernel.sum()
+        profile = np.hanning(size + 2)[1:-1].astype(np.float32)
+        separable_kernel = np.outer(profile, profile) / profile.sum() ** 2
+        assert separate_kernel(separable_kernel) is not None
+
+        direct = measure(lambda: filters.convolve(image, kernel, path="direct"), args.runs)
+        dft = measure(lambda: filters.convolve(image, kernel, path="dft"), args.runs)
+        separable = measure(lambda: filters.convolve(image, separable_kernel, path="separable"), args.runs)
+        reference = filters.convolve(image, kernel, path="direct")
+        error = float(np.abs(filters.convolve(image, kernel, path="dft") - reference).max())
+
+        direct_times.append(direct)
+        dft_times.append(dft)
+        separable_times.append(separable)
+        print(f"{size:>7} {direct * 1000:>9.1f} {dft * 1000:>9.1f} {separable * 1000:>10.1f} {error:>10.1e}")
+
+    generic = crossover(sizes, direct_times, dft_times)
+    separable = crossover(sizes, separable_times, dft_times)
+    print()
+    print(f"DFT vence a convolução direta a partir de: {generic or 'nenhum tamanho medido'}"
+          f" (DFT_MIN_KERNEL_SIZE atual: {filters.dft_min_size})")
+    print(f"DFT vence as passadas separáveis a partir de: {separable or 'nenhum tamanho medido'}"
+          f" (DFT_MIN_SEPARABLE_SIZE atual: {filters.dft_min_separable_size})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark de inicialização a frio do PDI Studio
+
+Mede, em um processo Python novo, o tempo de importação do Controller e o tempo
+até a primeira janela ser desenhada, e compara com o orçamento definido abaixo.
+Também verifica que o matplotlib não foi carregado antes da janela aparecer.
+
+Uso (a partir da pasta pdi_studio):
+    python benchmarks/startup_benchmark.py [--runs N] [--budget SEGUNDOS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Orçamento para o tempo até a primeira janela (segundos)
+TIME_TO_FIRST_WINDOW_BUDGET = 0.6
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código executado no processo filho (medição a frio, sem módulos em cache)
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+from controllers.controller import Controller
+imported = time.perf_counter()
+result = {"import": imported - start}
+try:
+    app = Controller()
+    app.root.update()
+    result["first_window"] = time.perf_counter() - start
+    result["matplotlib_loaded"] = any(name.startswith("matplotlib") for name in sys.modules)
+    app.root.destroy()
+except Exception as e:
+    # Sem servidor gráfico (ex.: CI): mede apenas as importações
+    result["error"] = str(e)
+    result["matplotlib_loaded"] = any(name.startswith("matplotlib") for name in sys.modules)
+print(json.dumps(result))
+"""
+
+def run_once():
+    """Executa uma medição em um processo novo e retorna o dicionário de tempos"""
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do PDI Studio")
+    parser.add_argument("--runs", type=int, default=5, help="número de execuções")
+    parser.add_argument("--budget", type=float, default=TIME_TO_FIRST_WINDOW_BUDGET,
+                        help="orçamento para a primeira janela, em segundos")
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    import_times = sorted(r["import"] for r in results)
+    print(f"Importação do Controller (mediana): {import_times[len(import_times) // 2] * 1000:.1f} ms")
+
+    if any(r["matplotlib_loaded"] for r in results):
+        print("FALHA: matplotlib foi carregado antes da janela aparecer")
+        return 1
+
+    window_times = sorted(r["first_window"] for r in results if "first_window" in r)
+    if not window_times:
+        print(f"Janela não medida ({results[0].get('error')}); verificando só as importações")
+        measured = import_times[len(import_times) // 2]
+    else:
+        measured = window_times[len(window_times) // 2]
+        print(f"Tempo até a primeira janela (mediana): {measured * 1000:.1f} ms")
+
+    print(f"Orçamento: {args.budget * 1000:.0f} ms")
+    if measured > args.budget:
+        print("FALHA: acima do orçamento")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
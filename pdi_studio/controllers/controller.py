@@ -1,8 +1,91 @@
+import os
+import time
+import cv2
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import Tk, filedialog, messagebox, simpledialog
 from models.model import Model
+from models.document_manager import DocumentManager
 from models.pdf_exporter import PDFExporter
+from models.image_writer import ImageWriter, get_extension
+from models.histogram_engine import COLOR_SPACES, DEFAULT_JOINT
+from models.geometry_model import INTERPOLATIONS
+from models.pipeline import format_report
+from models.quality_metrics import format_metrics
+from models.session_file import SESSION_EXTENSION
 from views.view import View
 from views.histogram_canvas import HistogramCanvas
+from views.component_table import ComponentTableWindow
+from models.utils import prewarm_modules
+from models.shared_pool import shutdown_default_pool
+from controllers.preview_scheduler import PreviewScheduler
+
+# Formatos gravados por "Salvar em vários formatos": (sufixo, extensão, opções, maior lado)
+EXPORT_PRESETS = [
+    ("", ".png", {"compression": 6}, None),
+    ("", ".jpg", {"quality": 92, "progressive": True}, None),
+    ("", ".webp", {"quality": 90}, None),
+    ("_1024", ".jpg", {"quality": 85}, 1024),
+    ("_thumb", ".jpg", {"quality": 80}, 256),
+]
+
+# Parâmetros pedidos por filtro: (parâmetro, pergunta, tipo, mínimo, máximo)
+FILTER_PROMPTS = {
+    "gaussian": [("sigma", "Desvio padrão (sigma):", float, 0.1, 200.0)],
+    "box": [("size", "Tamanho da janela (N x N):", int, 1, 999)],
+    "median": [("size", "Tamanho da janela (ímpar; 16 bits/float: 3 ou 5):", int, 3, 255)],
+    "bilateral": [
+        ("diameter", "Diâmetro da vizinhança (pixels):", int, 1, 51),
+        ("sigma_color", "Sigma de intensidade (níveis de 8 bits):", float, 1.0, 255.0),
+        ("sigma_space", "Sigma espacial (pixels):", float, 0.5, 100.0),
+    ],
+    "unsharp": [
+        ("sigma", "Sigma do desfoque:", float, 0.1, 100.0),
+        ("amount", "Intensidade do realce:", float, 0.0, 10.0),
+    ],
+    "sobel": [("ksize", "Tamanho do kernel (1, 3, 5 ou 7):", int, 1, 7)],
+    "laplacian": [("ksize", "Tamanho do kernel (1, 3, 5 ou 7):", int, 1, 7)],
+}
+
+# Nomes dos filtros no log
+FILTER_NAMES = {
+    "gaussian": "Desfoque gaussiano",
+    "box": "Média (box)",
+    "median": "Mediana",
+    "bilateral": "Filtro bilateral",
+    "unsharp": "Unsharp mask",
+    "sobel": "Bordas (Sobel)",
+    "laplacian": "Bordas (Laplaciano)",
+    "custom": "Kernel personalizado",
+}
+
+# Nomes das operações morfológicas no log
+MORPHOLOGY_NAMES = {
+    "erode": "Erosão",
+    "dilate": "Dilatação",
+    "open": "Abertura",
+    "close": "Fechamento",
+    "fill_holes": "Preenchimento de buracos",
+}
+
+# Formas do elemento estruturante aceitas no diálogo (nome digitado -> forma do BinaryImage)
+MORPHOLOGY_SHAPES = {
+    "retângulo": "rect",
+    "elipse": "ellipse",
+    "cruz": "cross",
+}
+
+# Nomes dos espelhamentos no log
+FLIP_NAMES = {
+    "horizontal": "horizontal",
+    "vertical": "vertical",
+    "both": "horizontal e vertical",
+}
+
+# Módulos da exportação de PDF carregados em segundo plano enquanto o diálogo de salvar
+# está aberto (só nas sessões que exportam; o pyplot fica para a exportação, na thread do Tk)
+PDF_PREWARM_MODULES = [
+    "matplotlib.backends.backend_pdf",
+]
 
 class Controller:
     def __init__(self):
@@ -10,54 +93,323 @@ class Controller:
         self.root.title("PDI Studio - Sistema Interativo de Processamento de Imagens")
         self.root.geometry("1600x900")
 
-        # Model
+        # Documentos abertos (abas) sob um orçamento global de memória
+        self.documents = DocumentManager()
+
+        # Model do documento ativo (vazio enquanto nenhuma imagem foi aberta)
         self.model = Model()
 
+        # Evita reaplicar brilho/contraste quando os sliders são restaurados ao trocar de aba
+        self._restoring_adjustments = False
+
+        # Prévias dos sliders em resolução reduzida, refinadas quando o usuário para
+        self.preview_scheduler = PreviewScheduler()
+        self._refine_job = None
+        self._pending_refine = None
+
         # View
         self.view = View(self.root, controller=self)
         
         # Histogram
         self.histogram_canvas = HistogramCanvas(self.root)
+        self.component_table = ComponentTableWindow(self.root)
         
         # PDF Exporter
         self.pdf_exporter = PDFExporter()
 
+        # Gravação de imagens em segundo plano
+        self.image_writer = ImageWriter()
+
+        # Métricas de qualidade calculadas fora da thread da interface (uma por vez)
+        self.metrics_executor = ThreadPoolExecutor(max_workers=1)
+
     # ========== Métodos principais ==========
     def run(self):
         self.root.mainloop()
+        # Remover os arquivos temporários dos documentos enviados para o disco
+        self.documents.shutdown()
+        self.metrics_executor.shutdown(wait=False, cancel_futures=True)
+        # Encerrar os processos de trabalho, se tiverem sido iniciados
+        shutdown_default_pool()
 
     def open_image(self):
         path = filedialog.askopenfilename(
             title="Selecione uma imagem",
-            filetypes=[("Arquivos de imagem", "*.png;*.jpg;*.jpeg;*.bmp")]
+            filetypes=[("Arquivos de imagem", "*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff")]
+        )
+        if not path:
+            return
+        try:
+            self._open_document(path, lambda model: model.load_image(path))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro", f"Não foi possível abrir a imagem: {e}")
+            return
+        self.view.log_action(f"Imagem carregada: {path} ({self.model.image.dtype})")
+
+    def open_session(self):
+        """Reabre uma sessão salva (mapeada em memória, sem decodificar nem reprocessar)"""
+        path = filedialog.askopenfilename(
+            title="Selecione uma sessão",
+            filetypes=[("Sessão do PDI Studio", "*" + SESSION_EXTENSION)]
+        )
+        if not path:
+            return
+        start = time.perf_counter()
+        try:
+            self._open_document(path, lambda model: model.load_session(path))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro", f"Não foi possível abrir a sessão: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.view.log_action(
+            f"Sessão aberta: {path} ({len(self.model.op_log)} operações, {elapsed:.0f} ms)"
+        )
+
+    def save_session(self):
+        """Grava original, imagem atual, histogramas e histórico em um arquivo de sessão"""
+        self.flush_preview()
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=SESSION_EXTENSION,
+            filetypes=[("Sessão do PDI Studio", "*" + SESSION_EXTENSION)]
         )
         if path:
-            image = self.model.load_image(path)
-            self.view.display_image(image)
-            self.view.log_action(f"Imagem carregada: {path}")
-            # Resetar sliders ao abrir nova imagem
-            if hasattr(self.view, "control_panel") and hasattr(self.view.control_panel, "reset_adjustments"):
-                self.view.control_panel.reset_adjustments()
+            try:
+                self.model.save_session(path)
+            except OSError as e:
+                messagebox.showerror("Erro", f"Não foi possível salvar a sessão: {e}")
+                return
+            self.view.log_action(f"Sessão salva: {path}")
+
+    def _open_document(self, path, load):
+        """
+        Carrega um Model novo com load(model) e só então cria o documento (aba): uma falha
+        na leitura não deixa documento vazio contando no orçamento de memória
+        """
+        model = Model()
+        load(model)
+        document = self.documents.new_document(os.path.basename(path), model)
+        self.documents.activate(document)
+        self.model = document.model
+        self.view.document_tabs.add_tab(document.id, document.name)
+        self.view.document_tabs.select(document.id)
+        self.view.display_image(self.model.image)
+        # Resetar sliders ao abrir nova imagem
+        if hasattr(self.view, "control_panel") and hasattr(self.view.control_panel, "reset_adjustments"):
+            self.view.control_panel.reset_adjustments()
+
+    # ========== Documentos ==========
+    def switch_document(self, doc_id):
+        """Ativa o documento escolhido na barra de abas"""
+        # A prévia pendente pertence ao documento que está saindo
+        self.flush_preview()
+        document = next((d for d in self.documents.documents if d.id == doc_id), None)
+        if document is None or document is self.documents.active:
+            return
+        self.documents.activate(document)
+        self._show_active_document()
+        self.view.log_action(f"Documento ativo: {document.name}")
+
+    def close_document(self):
+        """Fecha o documento ativo e libera sua memória"""
+        document = self.documents.active
+        if document is None:
+            messagebox.showwarning("Aviso", "Nenhum documento aberto.")
+            return
+        self.view.document_tabs.remove_tab(document.id)
+        self.documents.close(document)
+        self.view.log_action(f"Documento fechado: {document.name}")
+        if self.documents.active is None:
+            # Nenhum documento restante: voltar para um Model vazio
+            self.model = Model()
+            self.view.image_panel.clear()
+            self.update_memory_usage()
+            return
+        self._show_active_document()
+
+    def set_memory_budget(self):
+        """Configura o orçamento global de memória dos documentos"""
+        budget_mb = simpledialog.askinteger(
+            "Orçamento de Memória",
+            "Memória máxima para as imagens abertas (MB):",
+            initialvalue=self.documents.budget_bytes // (1024 ** 2),
+            minvalue=64,
+            maxvalue=1024 * 1024
+        )
+        if budget_mb is None:
+            return  # Usuário cancelou
+        self.documents.budget_bytes = budget_mb * 1024 ** 2
+        self.documents.enforce_budget()
+        self.update_memory_usage()
+        self.view.log_action(f"Orçamento de memória: {budget_mb} MB.")
+
+    def _show_active_document(self):
+        """Exibe o documento ativo e restaura seus sliders"""
+        document = self.documents.active
+        self.model = document.model
+        self.view.document_tabs.select(document.id)
+
+        self._restoring_adjustments = True
+        self.view.control_panel.set_adjustments(*document.adjustments)
+        # Callbacks dos sliders disparados pela restauração rodam antes deste
+        self.root.after_idle(self._finish_restoring_adjustments)
+
+        if self.model.image is not None:
+            self.view.display_image(self.model.image)
+            if not self.view.image_panel.single_view and self.model.original is not None:
+                self.view.image_panel.show_original_image(self.model.original)
+
+    def _finish_restoring_adjustments(self):
+        self._restoring_adjustments = False
+
+    def update_memory_usage(self):
+        """Atualiza a leitura de memória no painel de controle"""
+        usage = self.documents.memory_usage()
+        mb = 1024 ** 2
+        text = f"Memória: {usage['resident'] / mb:.0f} / {usage['budget'] / mb:.0f} MB"
+        if usage["spilled"]:
+            text += f"\nEm disco: {usage['spilled'] / mb:.0f} MB"
+        text += f" ({len(usage['documents'])} doc.)"
+        self.view.control_panel.update_memory_usage(text)
+
+    def on_image_displayed(self):
+        """Chamado pela View sempre que uma nova imagem é exibida"""
+        self._sync_threshold_slider()
+        self.update_histogram_panel()
+        self.documents.enforce_budget()
+        self.update_memory_usage()
+        self.update_quality_metrics()
+
+    def update_quality_metrics(self):
+        """Calcula MSE/PSNR/SSIM em segundo plano e mostra no painel quando terminar"""
+        if self.model.image is None:
+            return
+        # Os arrays são lidos aqui, na thread do Tk: a thread de métricas não toca no Model
+        # (uma ROI feita no lugar durante o cálculo só gera um resultado descartado abaixo)
+        model, original, image = self.model, self.model.original, self.model.image
+        future = self.metrics_executor.submit(model.quality_metrics.compute, original, image)
+
+        def watch():
+            if not future.done():
+                self.root.after(100, watch)
+                return
+            # Resultado de uma imagem que já foi substituída: descartar
+            if self.model is not model or model.image is not image:
+                return
+            try:
+                self.view.control_panel.update_quality_metrics(format_metrics(future.result()))
+            except Exception as e:
+                self.view.control_panel.update_quality_metrics(f"Métricas indisponíveis: {e}")
+
+        watch()
 
     def save_image(self):
+        self.flush_preview()
         if self.model.image is None:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
             return
         path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG", "*.png"), ("JPEG", "*.jpg"), ("BMP", "*.bmp")]
+            filetypes=[("PNG", "*.png"), ("TIFF", "*.tif"), ("JPEG", "*.jpg"), ("WebP", "*.webp"), ("BMP", "*.bmp")]
         )
         if path:
-            self.model.save_image(path)
-            self.view.log_action(f"Imagem salva em: {path}")
+            options = self._ask_encoder_options(get_extension(path))
+            if options is None:
+                return  # Usuário cancelou
+            future = self.image_writer.save_async(self.model.share_image(), path, options)
+            self.view.log_action(f"Salvando imagem em segundo plano: {path}")
+            self._watch_saves([future])
+
+    def save_multiple_formats(self):
+        """Grava a imagem em vários formatos/tamanhos ao mesmo tempo, em paralelo"""
+        self.flush_preview()
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        base = filedialog.asksaveasfilename(
+            title="Nome base dos arquivos (sem extensão)",
+            filetypes=[("Todos os arquivos", "*.*")]
+        )
+        if not base:
+            return  # Usuário cancelou
+        base = base[:-len(get_extension(base))] if get_extension(base) else base
+        targets = [
+            {"path": base + suffix + extension, "options": options, "max_size": max_size}
+            for suffix, extension, options, max_size in EXPORT_PRESETS
+        ]
+        futures = self.image_writer.save_many_async(self.model.share_image(), targets)
+        self.view.log_action(f"Salvando {len(futures)} arquivos em segundo plano: {base}*")
+        self._watch_saves(futures)
+
+    def _ask_encoder_options(self, extension):
+        """Pergunta as opções do codificador para o formato. Retorna None se cancelado"""
+        if extension == ".png":
+            level = simpledialog.askinteger(
+                "PNG", "Nível de compressão (0 = rápido, 9 = menor arquivo):",
+                initialvalue=3, minvalue=0, maxvalue=9
+            )
+            return None if level is None else {"compression": level}
+        if extension in (".jpg", ".jpeg"):
+            quality = simpledialog.askinteger(
+                "JPEG", "Qualidade (0-100):", initialvalue=95, minvalue=0, maxvalue=100
+            )
+            if quality is None:
+                return None
+            progressive = messagebox.askyesno("JPEG", "Gravar como JPEG progressivo?")
+            return {"quality": quality, "progressive": progressive, "optimize": progressive}
+        if extension == ".webp":
+            quality = simpledialog.askinteger(
+                "WebP", "Qualidade (0-100, 101 = sem perdas):", initialvalue=90, minvalue=0, maxvalue=101
+            )
+            return None if quality is None else {"quality": quality}
+        if extension in (".tif", ".tiff"):
+            compressed = messagebox.askyesno("TIFF", "Usar compressão LZW?")
+            return {"compression": "lzw" if compressed else "none"}
+        return {}
+
+    def _watch_saves(self, futures):
+        """Acompanha gravações em segundo plano sem bloquear a interface"""
+        pending = []
+        for future in futures:
+            if not future.done():
+                pending.append(future)
+                continue
+            try:
+                self.view.log_action(f"Imagem salva em: {future.result()}")
+            except Exception as e:
+                messagebox.showerror("Erro", f"Erro ao salvar imagem:\n{str(e)}")
+                self.view.log_action(f"Erro ao salvar imagem: {str(e)}")
+        if pending:
+            self.root.after(100, lambda: self._watch_saves(pending))
     
+    def _ask_pdf_options(self):
+        """Pergunta a DPI e a compressão das imagens do PDF. Retorna None se cancelado"""
+        dpi = simpledialog.askinteger(
+            "PDF", "Resolução das imagens (DPI):", initialvalue=100, minvalue=36, maxvalue=600
+        )
+        if dpi is None:
+            return None
+        options = {"dpi": dpi, "compression": "flate"}
+        if messagebox.askyesno("PDF", "Comprimir as imagens como JPEG (arquivo menor, com perdas)?"):
+            quality = simpledialog.askinteger(
+                "PDF", "Qualidade JPEG (0-100):", initialvalue=85, minvalue=0, maxvalue=100
+            )
+            if quality is None:
+                return None
+            options.update({"compression": "jpeg", "jpeg_quality": quality})
+        return options
+
     def export_pdf(self):
         """Exporta a imagem original, processada e histogramas para PDF"""
+        self.flush_preview()
         if self.model.original is None or self.model.image is None:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
             return
         
-        # Solicitar caminho de salvamento
+        # Solicitar caminho de salvamento (o backend de PDF carrega enquanto o diálogo está aberto)
+        prewarm_modules(PDF_PREWARM_MODULES)
         path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF", "*.pdf")]
@@ -65,6 +417,10 @@ class Controller:
         
         if not path:
             return  # Usuário cancelou
+
+        options = self._ask_pdf_options()
+        if options is None:
+            return  # Usuário cancelou
         
         try:
             # Obter imagens
@@ -72,20 +428,22 @@ class Controller:
             processed_image = self.model.image
             equalized_image = self.model.equalized_image  # Imagem equalizada se disponível
             
+            bins = self.model.get_histogram_bins()
+
             # Tentar obter histogramas
-            original_hist, equalized_hist_from_model = self.model.get_histograms()
+            original_hist, equalized_hist_from_model = self.model.get_histograms(bins)
             
             # Se não houver histogramas calculados, calcular agora
             if original_hist is None:
-                original_hist = self.pdf_exporter.calculate_histogram_if_needed(original_image)
+                original_hist = self.pdf_exporter.calculate_histogram_if_needed(original_image, bins)
             
             # Calcular histograma da imagem processada
-            processed_hist = self.pdf_exporter.calculate_histogram_if_needed(processed_image)
+            processed_hist = self.pdf_exporter.calculate_histogram_if_needed(processed_image, bins)
             
             # Calcular histograma equalizado se a imagem equalizada estiver disponível
             equalized_hist = None
             if equalized_image is not None:
-                equalized_hist = self.pdf_exporter.calculate_histogram_if_needed(equalized_image)
+                equalized_hist = self.pdf_exporter.calculate_histogram_if_needed(equalized_image, bins)
             elif equalized_hist_from_model is not None:
                 equalized_hist = equalized_hist_from_model
             
@@ -97,7 +455,11 @@ class Controller:
                 processed_hist=processed_hist,
                 equalized_image=equalized_image,
                 equalized_hist=equalized_hist,
-                output_path=path
+                output_path=path,
+                bins=bins,
+                options=options,
+                metrics=self.model.get_quality_metrics(),
+                components=self.model.current_components()
             )
             
             if success:
@@ -116,8 +478,7 @@ class Controller:
         self.view.image_panel.set_single_view()
         # Atualiza a imagem atual se der
         if self.model.image is not None:
-            current_image = self.model.to_pil_image(self.model.image)
-            self.view.display_image(current_image)
+            self.view.display_image(self.model.image)
         self.view.log_action("Modo de visualização: única")
 
     def set_side_by_side_view(self):
@@ -125,11 +486,9 @@ class Controller:
         self.view.image_panel.set_side_by_side_view()
         # Atualiza ambas as imagens se der 
         if self.model.image is not None:
-            processed_image = self.model.to_pil_image(self.model.image)
-            self.view.image_panel.show_image(processed_image)
+            self.view.image_panel.show_image(self.model.image)
         if self.model.original is not None:
-            original_image = self.model.to_pil_image(self.model.original)
-            self.view.image_panel.show_original_image(original_image)
+            self.view.image_panel.show_original_image(self.model.original)
         self.view.log_action("Modo de visualização: lado a lado")
 
     def reset_image(self):
@@ -153,10 +512,132 @@ class Controller:
         self.view.display_image(result)
         self.view.log_action("Conversão para tons de cinza aplicada.")
 
-    def apply_equalization(self):
-        result = self.model.equalize_histogram()
+    def apply_equalization(self, color_space=None):
+        result = self.model.equalize_histogram(color_space=color_space)
         self.view.display_image(result)
-        self.view.log_action("Equalização de histograma aplicada.")
+        if color_space is None:
+            self.view.log_action("Equalização de histograma aplicada.")
+        else:
+            self.view.log_action(f"Equalização de histograma aplicada (luminância {color_space.upper()}).")
+
+    def apply_clahe(self, color_space=None):
+        """Aplica equalização adaptativa (CLAHE) com limite e grade ajustáveis"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+
+        clip_limit = simpledialog.askfloat(
+            "CLAHE",
+            "Digite o limite de contraste (clip limit):",
+            initialvalue=2.0,
+            minvalue=0.1,
+            maxvalue=40.0
+        )
+        if clip_limit is None:
+            return  # Usuário cancelou
+
+        grid = simpledialog.askinteger(
+            "CLAHE",
+            "Digite o tamanho da grade de blocos (N x N):",
+            initialvalue=8,
+            minvalue=1,
+            maxvalue=64
+        )
+        if grid is None:
+            return  # Usuário cancelou
+
+        result = self.model.equalize_histogram(
+            method="clahe", color_space=color_space, clip_limit=clip_limit, tile_grid=(grid, grid)
+        )
+        if result is not None:
+            self.view.display_image(result)
+            mode = "tons de cinza" if color_space is None else f"luminância {color_space.upper()}"
+            self.view.log_action(f"CLAHE aplicado ({mode}, limite: {clip_limit}, grade: {grid}x{grid}).")
+        else:
+            messagebox.showerror("Erro", "Não foi possível aplicar o CLAHE.")
+
+    def apply_filter(self, method):
+        """Aplica um filtro espacial, pedindo os parâmetros de FILTER_PROMPTS"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+
+        defaults = self.model.filter_model.METHODS[method]
+        params = {}
+        if method == "custom":
+            kernel = self._ask_kernel()
+            if kernel is None:
+                return  # Usuário cancelou
+            params = {"kernel": kernel, "normalize": messagebox.askyesno(
+                "Kernel", "Normalizar o kernel (dividir pela soma dos coeficientes)?")}
+        for name, prompt, kind, minimum, maximum in FILTER_PROMPTS.get(method, []):
+            ask = simpledialog.askfloat if kind is float else simpledialog.askinteger
+            value = ask(FILTER_NAMES[method], prompt, initialvalue=defaults[name],
+                        minvalue=minimum, maxvalue=maximum)
+            if value is None:
+                return  # Usuário cancelou
+            params[name] = value
+
+        start = time.perf_counter()
+        try:
+            result = self.model.apply_filter(method, **params)
+        except (ValueError, cv2.error) as error:
+            messagebox.showerror("Erro", f"Não foi possível aplicar o filtro:\n{error}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.view.display_image(result)
+        details = [f"{name}: {value}" for name, value in params.items() if name != "kernel"]
+        if method == "custom":
+            details.insert(0, f"{len(params['kernel'])}x{len(params['kernel'][0])}")
+            details.append(f"caminho: {self.model.filter_model.last_path}")
+        self.view.log_action(f"{FILTER_NAMES[method]} aplicado ({', '.join(details)}; {elapsed:.0f} ms).")
+
+    def apply_morphology(self, operation):
+        """Morfologia binária (imagens não binárias são binarizadas na metade do máximo)"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+
+        title = MORPHOLOGY_NAMES[operation]
+        params = {}
+        if operation != "fill_holes":
+            size = simpledialog.askinteger(title, "Tamanho do elemento estruturante (N x N):",
+                                           initialvalue=3, minvalue=1, maxvalue=255)
+            if size is None:
+                return  # Usuário cancelou
+            shape = simpledialog.askstring(title, "Forma do elemento (retângulo, elipse ou cruz):",
+                                           initialvalue="retângulo")
+            if shape is None:
+                return  # Usuário cancelou
+            if shape.strip().lower() not in MORPHOLOGY_SHAPES:
+                messagebox.showerror("Erro", f"Forma desconhecida: {shape}")
+                return
+            params = {"size": size, "shape": MORPHOLOGY_SHAPES[shape.strip().lower()]}
+
+        start = time.perf_counter()
+        result = self.model.apply_morphology(operation, **params)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.view.display_image(result)
+        details = f"{params['size']}x{params['size']} {params['shape']}, " if params else ""
+        self.view.log_action(f"{title} aplicada ({details}{elapsed:.0f} ms).")
+
+    def _ask_kernel(self):
+        """Pede um kernel como linhas separadas por ';' (ex.: '0 -1 0; -1 5 -1; 0 -1 0')"""
+        text = simpledialog.askstring(
+            "Kernel personalizado",
+            "Coeficientes (linhas separadas por ';', valores por espaço ou vírgula):",
+            initialvalue="0 -1 0; -1 5 -1; 0 -1 0"
+        )
+        if text is None:
+            return None
+        try:
+            rows = [[float(v) for v in row.replace(",", " ").split()] for row in text.split(";") if row.strip()]
+            if not rows or any(len(row) != len(rows[0]) for row in rows) or not rows[0]:
+                raise ValueError("todas as linhas devem ter o mesmo número de valores")
+        except ValueError as error:
+            messagebox.showerror("Erro", f"Kernel inválido: {error}")
+            return None
+        return rows
 
     def show_histograms(self):
         """Mostra os histogramas das imagens original e equalizada"""
@@ -180,23 +661,364 @@ class Controller:
         else:
             messagebox.showerror("Erro", "Não foi possível calcular os histogramas.")
 
+    def show_color_histograms(self):
+        """Mostra os histogramas de um espaço de cor (e o histograma 2D, como H x S)"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        color_space = simpledialog.askstring(
+            "Histogramas por Espaço de Cor",
+            f"Espaço de cor ({', '.join(COLOR_SPACES)}):",
+            initialvalue="hsv"
+        )
+        if not color_space:
+            return  # Usuário cancelou
+        color_space = color_space.strip().lower()
+        if color_space not in COLOR_SPACES:
+            messagebox.showerror("Erro", f"Espaço de cor desconhecido: {color_space}")
+            return
+        joint_bins = 64
+        if color_space in DEFAULT_JOINT:
+            joint_bins = simpledialog.askinteger(
+                "Histograma 2D", "Bins de cada eixo do histograma 2D:",
+                initialvalue=64, minvalue=4, maxvalue=512
+            )
+            if joint_bins is None:
+                return
+        start = time.perf_counter()
+        result = self.model.get_color_histograms(color_space, joint_bins=(joint_bins, joint_bins))
+        elapsed = (time.perf_counter() - start) * 1000
+        self.histogram_canvas.show_color_histograms(result)
+        self.view.log_action(f"Histogramas {color_space.upper()} exibidos ({elapsed:.0f} ms).")
+
+    # ========== Componentes conectados ==========
+    def analyze_components(self):
+        """Conta os componentes da imagem binária, desenha as caixas e mostra a tabela"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        connectivity = simpledialog.askinteger("Componentes Conectados", "Vizinhança (4 ou 8):",
+                                               initialvalue=8, minvalue=4, maxvalue=8)
+        if connectivity is None:
+            return  # Usuário cancelou
+        if connectivity not in (4, 8):
+            messagebox.showerror("Erro", "A vizinhança deve ser 4 ou 8.")
+            return
+        min_area = simpledialog.askinteger("Componentes Conectados", "Área mínima (pixels):",
+                                           initialvalue=1, minvalue=1)
+        if min_area is None:
+            return  # Usuário cancelou
+
+        start = time.perf_counter()
+        try:
+            components = self.model.analyze_components(connectivity, min_area)
+        except ValueError as error:
+            messagebox.showerror("Erro", str(error))
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        # Redesenha com as caixas (a imagem não muda)
+        self.view.image_panel.refresh_overlay()
+        self.view.log_action(f"{components.summary()} ({elapsed:.0f} ms).")
+        self.component_table.show(components, on_export=self.export_components_csv)
+
+    def export_components_csv(self):
+        """Grava a tabela da última análise de componentes em CSV"""
+        components = self.model.current_components()
+        if components is None:
+            messagebox.showwarning("Aviso", "Analise os componentes da imagem atual primeiro.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return  # Usuário cancelou
+        try:
+            components.to_csv(path)
+        except OSError as error:
+            messagebox.showerror("Erro", f"Não foi possível gravar o CSV:\n{error}")
+            return
+        self.view.log_action(f"Tabela de componentes exportada: {path}")
+
+    def hide_components(self):
+        """Remove as caixas dos componentes da imagem exibida"""
+        self.model.components = None
+        self.view.image_panel.refresh_overlay()
+
     def apply_brightness_contrast(self):
         """Aplica os ajustes de brilho e contraste baseado nos valores dos sliders"""
-        if self.model.image is None:
+        if self.model.image is None or self._restoring_adjustments:
             return
         
         brightness = self.view.control_panel.get_brightness()
         contrast = self.view.control_panel.get_contrast()
+        if self.documents.active is not None:
+            self.documents.active.adjustments = (brightness, contrast)
         
         # Aplicar sempre com base na imagem original para evitar acúmulo
-        result = self.model.adjust_brightness_contrast(brightness, contrast, apply_to_current=False)
+        self._run_interactive(
+            "brightness_contrast",
+            lambda scale: self.model.preview_brightness_contrast(brightness, contrast, scale),
+            lambda: self.model.adjust_brightness_contrast(brightness, contrast, apply_to_current=False)
+        )
+
+    # ========== Slider de limiar ==========
+    def _sync_threshold_slider(self):
+        """Ajusta a faixa do slider de limiar à imagem exibida e remove a linha de corte"""
+        if self.model.image is None:
+            return
+        control_panel = self.view.control_panel
+        if control_panel.set_threshold_range(self.model.get_max_value()):
+            # O slider dispara o callback ao ser reescalado: não é uma prévia do usuário
+            self._restoring_adjustments = True
+            self.root.after_idle(self._finish_restoring_adjustments)
+        control_panel.show_threshold_marker(None)
+
+    def preview_threshold(self):
+        """
+        Prévia do limiar do slider no tamanho de exibição (LUT binária sobre a redução em
+        cinza da imagem atual); a imagem só muda em commit_threshold
+        """
+        if self.model.image is None or self._restoring_adjustments:
+            return
+        # Um refinamento pendente de brilho/contraste muda a imagem de base
+        self.flush_preview()
+        threshold = self.view.control_panel.get_threshold()
+        start = time.perf_counter()
+        preview = self.model.preview_global_threshold(threshold, *self.view.image_panel.default_display_size())
+        self.view.image_panel.show_image(preview)
+        self.view.control_panel.show_threshold_marker(threshold / self.model.get_max_value())
+        scale = preview.shape[1] / self.model.image.shape[1]
+        self.view.control_panel.update_preview_level(min(scale, 1.0), time.perf_counter() - start)
+
+    def commit_threshold(self):
+        """Aplica em resolução total o limiar escolhido no slider"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        self.flush_preview()
+        threshold = self.view.control_panel.get_threshold()
+        result = self.model.apply_global_threshold(threshold)
         if result is not None:
             self.view.display_image(result)
+            self.view.log_action(f"Limiarização global aplicada (limiar: {threshold:g}).")
+        else:
+            messagebox.showerror("Erro", "Não foi possível aplicar limiarização global.")
+
+    def cancel_threshold_preview(self):
+        """Descarta a prévia do limiar e volta a mostrar a imagem atual"""
+        if self.model.image is None:
+            return
+        self.view.image_panel.show_image(self.model.image)
+        self.view.control_panel.show_threshold_marker(None)
+
+    # ========== Prévias interativas ==========
+    def _run_interactive(self, operation, preview, apply):
+        """
+        Executa uma operação ligada a um slider dentro do orçamento por quadro
+        preview(scale): retorna a prévia sobre a original reduzida (não altera o Model)
+        apply(): aplica a operação em resolução total e retorna a imagem
+        """
+        if self.model.original is None:
+            return
+        self._cancel_refine()
+        height, width = self.model.original.shape[:2]
+        # Com uma ROI a operação só processa a região: aplicar direto, sem prévia reduzida
+        roi = self.model.roi is not None
+        scale = 1.0 if roi else self.preview_scheduler.choose_scale(operation, width * height)
+        # A redução da original é feita uma vez por escala e fica fora da medição
+        self.model.get_preview_source(scale)
+        start = time.perf_counter()
+
+        if scale >= 1.0:
+            result = apply()
+            if result is None:
+                return
+            computed = time.perf_counter()
+            self.view.display_image(result)
+        else:
+            result = preview(scale)
+            computed = time.perf_counter()
+            # Só a área da imagem é atualizada; histograma e memória esperam o refinamento
+            self.view.image_panel.show_image(result)
+            self._pending_refine = (apply, self.model.image)
+            self._refine_job = self.root.after(self.preview_scheduler.idle_delay_ms, self._refine_preview)
+
+        shown = time.perf_counter()
+        if not roi:
+            self.preview_scheduler.record(operation, result.shape[0] * result.shape[1], computed - start, shown - computed)
+        self.view.control_panel.update_preview_level(scale, shown - start)
+
+    def _refine_preview(self):
+        """Aplica em resolução total a última prévia (chamado quando os sliders param)"""
+        self._refine_job = None
+        if self._pending_refine is None:
+            return
+        apply, base_image = self._pending_refine
+        self._pending_refine = None
+        # Se outra operação mudou a imagem nesse meio tempo, a prévia ficou para trás
+        if self.model.image is not base_image:
+            return
+        start = time.perf_counter()
+        result = apply()
+        if result is not None:
+            self.view.display_image(result)
+            self.view.control_panel.update_preview_level(1.0, time.perf_counter() - start)
+
+    def _cancel_refine(self):
+        if self._refine_job is not None:
+            self.root.after_cancel(self._refine_job)
+            self._refine_job = None
+        self._pending_refine = None
+
+    def flush_preview(self):
+        """Aplica imediatamente um refinamento pendente (antes de salvar ou exportar)"""
+        if self._refine_job is not None:
+            self.root.after_cancel(self._refine_job)
+            self._refine_job = None
+            self._refine_preview()
+
+    def update_histogram_panel(self):
+        """Atualiza o histograma permanente do painel de controle com a imagem atual"""
+        if self.model.image is None:
+            return
+        self.view.control_panel.show_histograms(self.model.get_channel_histograms())
 
     def update_pixel_info(self, x, y, r, g, b):
         """Recebe os dados do pixel clicado e atualiza o painel de controle"""
         if self.view and self.view.control_panel:
-            self.view.control_panel.update_pixel_info(x, y, r, g, b)
+            self.view.control_panel.update_pixel_info(x, y, r, g, b, max_value=self.model.get_max_value())
+
+    def set_histogram_bins(self):
+        """Configura o número de bins dos histogramas (até 65.536 níveis para 16 bits)"""
+        bins = simpledialog.askinteger(
+            "Bins do Histograma",
+            "Digite o número de bins (0 = automático, um por nível):",
+            initialvalue=self.model.histogram_bins or 0,
+            minvalue=0,
+            maxvalue=65536
+        )
+        if bins is None:
+            return  # Usuário cancelou
+        self.model.histogram_bins = bins if bins >= 2 else None
+        self.view.log_action(f"Bins do histograma: {self.model.histogram_bins or 'automático'}.")
+
+    def replay_fused_history(self):
+        """Reexecuta o histórico de operações fundindo as operações pontuais em LUTs"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        if not self.model.op_log:
+            messagebox.showinfo("Pipeline", "Nenhuma operação no histórico.")
+            return
+        try:
+            result, report = self.model.replay_fused()
+        except ValueError as error:
+            messagebox.showerror("Erro", f"Não foi possível reexecutar o histórico: {error}")
+            return
+        self.view.display_image(result)
+        self.view.log_action(f"Histórico reexecutado: {format_report(report)}.")
+
+    # ========== Região de interesse ==========
+    def start_roi_selection(self, mode):
+        """Seleção da ROI com o mouse na imagem: 'rect' (arrastar) ou 'polygon' (vértices)"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        self.view.image_panel.start_roi_selection(mode)
+        if mode == "rect":
+            self.view.log_action("Selecione a ROI arrastando um retângulo na imagem.")
+        else:
+            self.view.log_action("Clique nos vértices da ROI; clique duplo ou botão direito fecha o polígono.")
+
+    def on_roi_selected(self, roi):
+        """Chamado pelo ImagePanel ao terminar a seleção: as operações passam a valer só na ROI"""
+        roi = roi.clip(self.model.image.shape) if self.model.image is not None else None
+        if roi is None:
+            return
+        self.model.set_roi(roi)
+        self.view.image_panel.refresh_overlay()
+        self.view.log_action(f"ROI definida: {roi.describe()} ({roi.pixels:,} pixels).")
+
+    def clear_roi(self):
+        """Remove a ROI: as operações voltam a valer na imagem inteira"""
+        self.view.image_panel.cancel_roi_selection()
+        if self.model.roi is None:
+            return
+        self.model.clear_roi()
+        self.view.image_panel.refresh_overlay()
+        self.view.log_action("ROI removida: operações na imagem inteira.")
+
+    # ========== Operações geométricas ==========
+    def _apply_geometry(self, description, operation):
+        """Executa uma operação geométrica do Model, exibe o resultado e registra no log"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        self.view.image_panel.cancel_roi_selection()
+        start = time.perf_counter()
+        try:
+            result = operation()
+        except (ValueError, cv2.error) as error:
+            messagebox.showerror("Erro", str(error))
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.view.display_image(result)
+        height, width = result.shape[:2]
+        self.view.log_action(f"{description}: {width}x{height} ({elapsed:.0f} ms).")
+
+    def crop_to_roi(self):
+        """Recorta a imagem no retângulo da ROI selecionada"""
+        if self.model.image is not None and self.model.roi is None:
+            messagebox.showwarning("Aviso", "Selecione uma ROI (menu ROI) para recortar.")
+            return
+        self._apply_geometry("Imagem recortada", self.model.crop_to_roi)
+
+    def flip_image(self, axis):
+        self._apply_geometry(f"Espelhamento {FLIP_NAMES[axis]}", lambda: self.model.flip_image(axis))
+
+    def rotate_image(self, angle=None):
+        """Rotação anti-horária; sem ângulo, pergunta o ângulo e a interpolação"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        interpolation = "linear"
+        if angle is None:
+            angle = simpledialog.askfloat("Rotacionar", "Ângulo em graus (positivo = anti-horário):",
+                                          initialvalue=15.0, minvalue=-360.0, maxvalue=360.0)
+            if angle is None:
+                return  # Usuário cancelou
+            if angle % 90:
+                interpolation = self._ask_interpolation("Rotacionar", "linear")
+                if interpolation is None:
+                    return  # Usuário cancelou
+        self._apply_geometry(f"Rotação de {angle:g}°",
+                             lambda: self.model.rotate_image(angle, interpolation))
+
+    def resize_image(self):
+        """Redimensiona pela escala em porcentagem, com a interpolação escolhida"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+        height, width = self.model.image.shape[:2]
+        percent = simpledialog.askfloat("Redimensionar", f"Escala em % (atual: {width}x{height}):",
+                                        initialvalue=50.0, minvalue=0.1, maxvalue=1000.0)
+        if percent is None:
+            return  # Usuário cancelou
+        interpolation = self._ask_interpolation("Redimensionar", "area" if percent < 100 else "cubic")
+        if interpolation is None:
+            return  # Usuário cancelou
+        self._apply_geometry(f"Redimensionada para {percent:g}% ({interpolation})",
+                             lambda: self.model.resize_image(scale=percent / 100, interpolation=interpolation))
+
+    def _ask_interpolation(self, title, default):
+        """Pergunta uma das INTERPOLATIONS (None se o usuário cancelar ou digitar outra)"""
+        interpolation = simpledialog.askstring(title, f"Interpolação ({', '.join(INTERPOLATIONS)}):",
+                                               initialvalue=default)
+        if interpolation is None:
+            return None
+        interpolation = interpolation.strip().lower()
+        if interpolation not in INTERPOLATIONS:
+            messagebox.showerror("Erro", f"Interpolação desconhecida: {interpolation}")
+            return None
+        return interpolation
 
     # ========== Métodos de Conversão de Espaços de Cores ==========
     def convert_to_rgb(self):
@@ -278,23 +1100,28 @@ class Controller:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
             return
         
-        # Solicitar valor do limiar ao usuário
-        threshold = simpledialog.askinteger(
+        max_value = self.model.get_max_value()
+        is_float = self.model.image.dtype.kind == "f"
+        ask = simpledialog.askfloat if is_float else simpledialog.askinteger
+        initial = max_value / 2 if is_float else int(max_value + 1) // 2 - 1
+        
+        # Solicitar valor do limiar ao usuário (na faixa do tipo da imagem)
+        threshold = ask(
             "Limiarização Global",
-            "Digite o valor do limiar (0-255):",
-            initialvalue=127,
+            f"Digite o valor do limiar (0-{max_value:g}):",
+            initialvalue=initial,
             minvalue=0,
-            maxvalue=255
+            maxvalue=max_value if is_float else int(max_value)
         )
         
         if threshold is None:
             return  # Usuário cancelou
         
-        # Garantir que o valor é um inteiro válido
+        # Garantir que o valor é um número válido
         try:
-            threshold = int(threshold)
-            if threshold < 0 or threshold > 255:
-                messagebox.showerror("Erro", "O valor do limiar deve estar entre 0 e 255.")
+            threshold = float(threshold) if is_float else int(threshold)
+            if threshold < 0 or threshold > max_value:
+                messagebox.showerror("Erro", f"O valor do limiar deve estar entre 0 e {max_value:g}.")
                 return
         except (ValueError, TypeError):
             messagebox.showerror("Erro", "Valor inválido para o limiar.")
@@ -320,6 +1147,20 @@ class Controller:
         else:
             messagebox.showerror("Erro", "Não foi possível aplicar limiarização multissegmentada.")
 
+    def apply_multi_otsu(self, num_thresholds):
+        """Aplica o método de Otsu multinível (limiares buscados no histograma)"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+
+        result = self.model.apply_multi_otsu(num_thresholds)
+        if result is not None:
+            self.view.display_image(result)
+            thresholds = ", ".join(f"{t:g}" for t in self.model.last_thresholds)
+            self.view.log_action(f"Otsu multinível aplicado ({num_thresholds} limiares: {thresholds}).")
+        else:
+            messagebox.showerror("Erro", "Não foi possível aplicar o método de Otsu multinível.")
+
     def apply_otsu_threshold(self):
         """Aplica o método de Otsu"""
         if self.model.image is None:
@@ -332,3 +1173,31 @@ class Controller:
             self.view.log_action("Método de Otsu aplicado.")
         else:
             messagebox.showerror("Erro", "Não foi possível aplicar o método de Otsu.")
+
+
+    def apply_adaptive_threshold(self, method):
+        """Aplica limiarização adaptativa (média local, Niblack ou Sauvola)"""
+        if self.model.image is None:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada.")
+            return
+
+        # Solicitar o tamanho da janela local ao usuário
+        window_size = simpledialog.askinteger(
+            "Limiarização Adaptativa",
+            "Digite o tamanho da janela (ímpar, 3-501):",
+            initialvalue=25,
+            minvalue=3,
+            maxvalue=501
+        )
+
+        if window_size is None:
+            return  # Usuário cancelou
+
+        window_size = self.model.threshold_model.normalize_window_size(window_size)
+
+        result = self.model.apply_adaptive_threshold(method, window_size)
+        if result is not None:
+            self.view.display_image(result)
+            self.view.log_action(f"Limiarização adaptativa aplicada ({method}, janela: {window_size}).")
+        else:
+            messagebox.showerror("Erro", "Não foi possível aplicar limiarização adaptativa.")
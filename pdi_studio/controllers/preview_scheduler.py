@@ -0,0 +1,57 @@
+class PreviewScheduler:
+    """
+    Escolhe a resolução das prévias interativas (sliders) para caber em um orçamento por quadro.
+    O custo de cada operação é medido a cada quadro (segundos por pixel, média móvel), e o custo
+    de exibição, que depende do tamanho da tela e não da imagem, é medido à parte
+    """
+
+    def __init__(self, frame_budget=0.016, scales=(1.0, 0.5, 0.25, 0.125, 0.0625),
+                 smoothing=0.3, initial_pixels=1_000_000, idle_delay_ms=250):
+        """
+        frame_budget: tempo máximo por quadro em segundos (16 ms ≈ 60 quadros por segundo)
+        scales: escalas de prévia disponíveis (1.0 = resolução total)
+        smoothing: peso de cada nova medição na média móvel
+        initial_pixels: tamanho da primeira prévia de uma operação ainda não medida
+        idle_delay_ms: tempo sem mudanças nos sliders até refinar para a resolução total
+        """
+        self.frame_budget = frame_budget
+        self.scales = sorted(scales, reverse=True)
+        self.smoothing = smoothing
+        self.initial_pixels = initial_pixels
+        self.idle_delay_ms = idle_delay_ms
+        # Segundos por pixel de cada operação
+        self.pixel_costs = {}
+        # Segundos por quadro gastos na exibição
+        self.display_cost = 0.0
+
+    def _smooth(self, previous, value):
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def record(self, operation, pixels, operation_seconds, display_seconds):
+        """Registra a medição de um quadro (pixels processados pela operação)"""
+        if pixels > 0:
+            self.pixel_costs[operation] = self._smooth(
+                self.pixel_costs.get(operation), operation_seconds / pixels
+            )
+        self.display_cost = self._smooth(self.display_cost or None, display_seconds)
+
+    def estimate(self, operation, pixels, scale):
+        """Tempo previsto de um quadro na escala dada (None se a operação ainda não foi medida)"""
+        cost = self.pixel_costs.get(operation)
+        if cost is None:
+            return None
+        return self.display_cost + cost * pixels * scale * scale
+
+    def choose_scale(self, operation, pixels):
+        """Maior escala cujo quadro previsto cabe no orçamento (a menor, se nenhuma couber)"""
+        for scale in self.scales:
+            estimate = self.estimate(operation, pixels, scale)
+            if estimate is None:
+                # Sem medições: começar por uma prévia de até initial_pixels
+                if pixels * scale * scale <= self.initial_pixels:
+                    return scale
+            elif estimate <= self.frame_budget:
+                return scale
+        return self.scales[-1]
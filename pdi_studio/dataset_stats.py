@@ -0,0 +1,49 @@
+"""
+Estatísticas de um conjunto de imagens (sem interface gráfica)
+
+Percorre uma pasta, calcula histogramas (cinza e B, G, R) e momentos de cada imagem em
+um pool de processos e grava na pasta de saída:
+    images.csv          uma linha por imagem (média, desvio, mínimo e máximo por canal)
+    aggregate.npz       agregados por tipo de imagem (também é o checkpoint)
+    summary.csv         resumo por tipo e canal, com percentis e limiar de Otsu
+    histograms_*.npz    histogramas por imagem (com --per-image-histograms)
+
+Rodar de novo com a mesma saída continua de onde parou, sem reler as imagens concluídas.
+
+Uso (a partir da pasta pdi_studio):
+    python dataset_stats.py PASTA --output SAIDA [--bins 256] [--workers N] [--batch-size 256]
+"""
+import argparse
+import sys
+import time
+from models.dataset_stats import DatasetStatistics, list_images
+
+def main():
+    parser = argparse.ArgumentParser(description="Estatísticas de intensidade de um conjunto de imagens")
+    parser.add_argument("input", help="pasta com as imagens (subpastas incluídas)")
+    parser.add_argument("--output", required=True, help="pasta de saída (e de checkpoint)")
+    parser.add_argument("--bins", type=int, default=256, help="número de bins dos histogramas")
+    parser.add_argument("--workers", type=int, default=None, help="processos de trabalho")
+    parser.add_argument("--batch-size", type=int, default=256, help="imagens por checkpoint")
+    parser.add_argument("--per-image-histograms", action="store_true",
+                        help="grava também os histogramas de cada imagem")
+    args = parser.parse_args()
+
+    stats = DatasetStatistics(args.output, bins=args.bins, max_workers=args.workers,
+                              batch_size=args.batch_size, per_image_histograms=args.per_image_histograms)
+    resumed = stats.resume()
+    paths = list_images(args.input)
+    print(f"{len(paths)} imagens encontradas; {resumed} já processadas")
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        print(f"\r{done}/{total} imagens ({elapsed:.0f} s)", end="", flush=True)
+
+    processed = stats.run(paths, progress=progress)
+    print(f"\n{processed} imagens processadas nesta execução. Resultados em {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
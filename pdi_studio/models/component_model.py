@@ -0,0 +1,194 @@
+import csv
+import cv2
+import numpy as np
+from models.binary_image import BinaryImage
+
+# Pixels rotulados por faixa: imagens maiores são rotuladas em faixas horizontais e os
+# rótulos que se tocam na fronteira entre faixas são unidos (union-find)
+STRIP_PIXELS = 16_000_000
+# Colunas da tabela e do CSV, na ordem
+COLUMNS = ("label", "area", "x", "y", "width", "height", "centroid_x", "centroid_y")
+
+class ComponentTable:
+    """
+    Componentes conectados de uma imagem binária: um por linha, de cima para baixo (na ordem
+    dos rótulos do cv2.connectedComponents em cada faixa, sem o fundo). Cada coluna é um array
+    NumPy; coordenadas na imagem inteira (x, y do canto superior esquerdo da caixa envolvente)
+    """
+
+    def __init__(self, area, x, y, width, height, centroid_x, centroid_y, connectivity=8):
+        self.area = area
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.centroid_x = centroid_x
+        self.centroid_y = centroid_y
+        self.connectivity = connectivity
+
+    def __len__(self):
+        return len(self.area)
+
+    @property
+    def total_area(self):
+        return int(self.area.sum())
+
+    def select(self, indices):
+        """Tabela só com os componentes indicados (índices ou máscara booleana)"""
+        return ComponentTable(self.area[indices], self.x[indices], self.y[indices],
+                              self.width[indices], self.height[indices],
+                              self.centroid_x[indices], self.centroid_y[indices], self.connectivity)
+
+    def largest(self, count):
+        """Índices dos `count` maiores componentes, do maior para o menor"""
+        return np.argsort(-self.area, kind="stable")[:count]
+
+    def boxes(self, limit=None):
+        """Caixas (x, y, largura, altura) como array (n, 4); limit: só as dos maiores componentes"""
+        indices = slice(None) if limit is None or len(self) <= limit else np.sort(self.largest(limit))
+        return np.stack([self.x[indices], self.y[indices], self.width[indices], self.height[indices]], axis=1)
+
+    def rows(self, indices=None):
+        """Linhas (na ordem de COLUMNS) dos componentes indicados (None = todos)"""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        return [
+            (int(i) + 1, int(self.area[i]), int(self.x[i]), int(self.y[i]), int(self.width[i]),
+             int(self.height[i]), round(float(self.centroid_x[i]), 2), round(float(self.centroid_y[i]), 2))
+            for i in indices
+        ]
+
+    def summary(self):
+        """Texto curto para o log e o relatório"""
+        if not len(self):
+            return "Nenhum componente encontrado"
+        return (f"{len(self)} componentes (vizinhança {self.connectivity}), área total {self.total_area} px, "
+                f"média {self.area.mean():.1f} px, maior {int(self.area.max())} px")
+
+    def to_csv(self, path):
+        """Grava a tabela em CSV (uma linha por componente). Retorna o caminho"""
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            # Em blocos, para não montar a lista de linhas de milhões de componentes de uma vez
+            for start in range(0, len(self), 100_000):
+                writer.writerows(self.rows(range(start, min(len(self), start + 100_000))))
+        return path
+
+def find_components(image, connectivity=8, min_area=1, origin=(0, 0), strip_pixels=STRIP_PIXELS):
+    """
+    Rotula os componentes conectados e calcula área, caixa envolvente e centroide de cada um
+    image: BinaryImage ou array 2D (diferente de zero = primeiro plano)
+    connectivity: 4 ou 8
+    min_area: componentes menores são descartados (ruído)
+    origin: (x, y) somado às coordenadas (ex.: canto da ROI analisada)
+    strip_pixels: pixels por faixa; cada faixa é desempacotada e rotulada com
+    cv2.connectedComponentsWithStats, e só a última linha de rótulos é guardada entre faixas
+    Retorna um ComponentTable
+    """
+    if connectivity not in (4, 8):
+        raise ValueError("A vizinhança deve ser 4 ou 8")
+    if isinstance(image, BinaryImage):
+        height, width = image.shape
+        read = lambda y0, y1: np.unpackbits(image.packed[y0:y1], axis=1, count=width)
+    else:
+        height, width = image.shape[:2]
+        read = lambda y0, y1: (image[y0:y1] != 0).view(np.uint8)
+    strip_height = max(1, strip_pixels // max(width, 1))
+
+    strips = []   # estatísticas de cada faixa: (x, y, largura, altura, área) e somas de x e y
+    pairs = []    # rótulos globais que se tocam entre faixas
+    count = 0
+    previous_row = None
+    for y0 in range(0, height, strip_height):
+        y1 = min(height, y0 + strip_height)
+        found, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            read(y0, y1), connectivity=connectivity, ltype=cv2.CV_32S
+        )
+        # Rótulo local l >= 1 vira o global count + l - 1 (o fundo, 0, é descartado)
+        offset = count - 1
+        stats, centroids = stats[1:].astype(np.int64), centroids[1:]
+        stats[:, cv2.CC_STAT_TOP] += y0
+        area = stats[:, cv2.CC_STAT_AREA]
+        strips.append((stats, centroids[:, 0] * area, (centroids[:, 1] + y0) * area))
+        if previous_row is not None and found > 1:
+            pairs.append(_boundary_pairs(previous_row, labels[0], offset, connectivity))
+        last = labels[-1]
+        previous_row = np.where(last > 0, last + offset, -1)
+        count += found - 1
+
+    if count == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return ComponentTable(empty, empty, empty, empty, empty, empty.astype(np.float64),
+                              empty.astype(np.float64), connectivity)
+
+    stats = np.concatenate([s for s, _, _ in strips])
+    sum_x = np.concatenate([sx for _, sx, _ in strips])
+    sum_y = np.concatenate([sy for _, _, sy in strips])
+    roots = _resolve_roots(count, np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64))
+
+    # Agrupa as partes de cada componente (a raiz é o menor rótulo: a parte mais acima)
+    _, index = np.unique(roots, return_inverse=True)
+    total = int(index.max()) + 1
+    left, top = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    right, bottom = left + stats[:, cv2.CC_STAT_WIDTH], top + stats[:, cv2.CC_STAT_HEIGHT]
+    area = np.bincount(index, weights=stats[:, cv2.CC_STAT_AREA], minlength=total).astype(np.int64)
+    x0 = np.full(total, width, dtype=np.int64)
+    y0 = np.full(total, height, dtype=np.int64)
+    x1 = np.zeros(total, dtype=np.int64)
+    y1 = np.zeros(total, dtype=np.int64)
+    np.minimum.at(x0, index, left)
+    np.minimum.at(y0, index, top)
+    np.maximum.at(x1, index, right)
+    np.maximum.at(y1, index, bottom)
+    centroid_x = np.bincount(index, weights=sum_x, minlength=total) / area
+    centroid_y = np.bincount(index, weights=sum_y, minlength=total) / area
+
+    ox, oy = origin
+    table = ComponentTable(area, x0 + ox, y0 + oy, x1 - x0, y1 - y0, centroid_x + ox, centroid_y + oy,
+                           connectivity)
+    if min_area > 1:
+        table = table.select(table.area >= min_area)
+    return table
+
+def _boundary_pairs(above, below, offset, connectivity):
+    """
+    Pares (rótulo de cima, rótulo de baixo) que se tocam na fronteira entre duas faixas
+    above: rótulos globais da última linha da faixa anterior (-1 = fundo)
+    below: rótulos locais da primeira linha da faixa atual (0 = fundo)
+    """
+    below = np.where(below > 0, below + offset, -1)
+    candidates = [(above, below)]
+    if connectivity == 8:
+        # Vizinhos diagonais
+        candidates += [(above[:-1], below[1:]), (above[1:], below[:-1])]
+    pairs = []
+    for a, b in candidates:
+        touching = (a >= 0) & (b >= 0)
+        pairs.append(np.stack([a[touching], b[touching]], axis=1))
+    pairs = np.concatenate(pairs).astype(np.int64)
+    return np.unique(pairs, axis=0) if len(pairs) else pairs
+
+def _resolve_roots(count, pairs):
+    """
+    Union-find dos rótulos: cada rótulo aponta para o menor rótulo do seu componente
+    Só os rótulos das fronteiras passam pelo laço em Python; a compressão final é vetorizada
+    """
+    parent = np.arange(count, dtype=np.int64)
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    for a, b in pairs.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            # O menor rótulo vira a raiz
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    # Salto de ponteiros até todos apontarem direto para a raiz
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
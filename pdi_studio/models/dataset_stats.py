@@ -0,0 +1,350 @@
+import csv
+import glob
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from models.threshold_model import ThresholdModel
+from models.utils import compute_histogram, dtype_max, match_file_mode, normalize_loaded_image, to_gray
+
+# Canais com histograma e momentos, na ordem das linhas dos arrays
+CHANNELS = ("gray", "b", "g", "r")
+
+# Extensões lidas ao percorrer uma pasta
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+# Arquivos gravados na pasta de saída
+CHECKPOINT_FILE = "aggregate.npz"
+IMAGES_CSV = "images.csv"
+SUMMARY_CSV = "summary.csv"
+SHARD_PATTERN = "histograms_{:05d}.npz"
+
+IMAGE_COLUMNS = ["path", "status", "dtype", "width", "height"] + [
+    f"{channel}_{stat}" for channel in CHANNELS for stat in ("mean", "std", "min", "max")
+]
+
+class StatsAggregate:
+    """
+    Agregado mesclável de um grupo de imagens do mesmo tipo: histogramas, contagens,
+    médias e momentos de segunda ordem por canal. Dois agregados se combinam com merge()
+    (fórmula de Chan para médias e variâncias), então parciais podem vir de qualquer ordem
+    """
+
+    def __init__(self, bins):
+        self.bins = bins
+        self.images = 0
+        self.hist = np.zeros((len(CHANNELS), bins), dtype=np.int64)
+        self.count = 0
+        self.mean = np.zeros(len(CHANNELS))
+        self.m2 = np.zeros(len(CHANNELS))
+        self.min = np.full(len(CHANNELS), np.inf)
+        self.max = np.full(len(CHANNELS), -np.inf)
+
+    @classmethod
+    def from_image(cls, stats):
+        """Agregado de uma única imagem (resultado de image_statistics)"""
+        aggregate = cls(stats["hist"].shape[1])
+        aggregate.images = 1
+        aggregate.hist[:] = stats["hist"]
+        aggregate.count = stats["count"]
+        aggregate.mean[:] = stats["mean"]
+        aggregate.m2[:] = stats["m2"]
+        aggregate.min[:] = stats["min"]
+        aggregate.max[:] = stats["max"]
+        return aggregate
+
+    def merge(self, other):
+        """Incorpora outro agregado (mesmo número de bins)"""
+        if other.bins != self.bins:
+            raise ValueError("Agregados com números de bins diferentes")
+        total = self.count + other.count
+        if total:
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * (other.count / total)
+            self.m2 = self.m2 + other.m2 + delta * delta * (self.count * other.count / total)
+        self.count = total
+        self.images += other.images
+        self.hist += other.hist
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def std(self):
+        """Desvio padrão de cada canal"""
+        if self.count == 0:
+            return np.zeros(len(CHANNELS))
+        return np.sqrt(self.m2 / self.count)
+
+    def to_arrays(self, prefix):
+        """Arrays para gravação em NPZ (chaves com o prefixo dado)"""
+        return {
+            f"{prefix}_images": np.array(self.images),
+            f"{prefix}_hist": self.hist,
+            f"{prefix}_count": np.array(self.count),
+            f"{prefix}_mean": self.mean,
+            f"{prefix}_m2": self.m2,
+            f"{prefix}_min": self.min,
+            f"{prefix}_max": self.max,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        """Reconstrói um agregado gravado com to_arrays"""
+        hist = arrays[f"{prefix}_hist"]
+        aggregate = cls(hist.shape[1])
+        aggregate.images = int(arrays[f"{prefix}_images"])
+        aggregate.hist[:] = hist
+        aggregate.count = int(arrays[f"{prefix}_count"])
+        aggregate.mean[:] = arrays[f"{prefix}_mean"]
+        aggregate.m2[:] = arrays[f"{prefix}_m2"]
+        aggregate.min[:] = arrays[f"{prefix}_min"]
+        aggregate.max[:] = arrays[f"{prefix}_max"]
+        return aggregate
+
+def image_statistics(path, bins):
+    """
+    Lê uma imagem e calcula, para cinza e para cada canal B, G, R, o histograma
+    (mesmos bins do Model.get_histograms) e os momentos. Executada nos workers
+    Retorna um dicionário com 'path', 'dtype', 'width', 'height', 'hist', 'count',
+    'mean', 'm2', 'min' e 'max'
+    """
+    # np.fromfile + imdecode também funciona com caminhos não ASCII no Windows
+    data = np.fromfile(path, dtype=np.uint8)
+    image = normalize_loaded_image(cv2.imdecode(data, cv2.IMREAD_UNCHANGED)) if data.size else None
+    if image is None:
+        raise IOError(f"Não foi possível ler a imagem: {path}")
+
+    channels = [to_gray(image)] + list(cv2.split(image))
+    count = channels[0].size
+    hist = np.empty((len(CHANNELS), bins), dtype=np.int64)
+    mean = np.empty(len(CHANNELS))
+    m2 = np.empty(len(CHANNELS))
+    low = np.empty(len(CHANNELS))
+    high = np.empty(len(CHANNELS))
+    for index, channel in enumerate(channels):
+        hist[index] = np.rint(compute_histogram(channel, bins))
+        channel_mean, channel_std = cv2.meanStdDev(channel)
+        mean[index] = channel_mean[0, 0]
+        m2[index] = channel_std[0, 0] ** 2 * count
+        low[index], high[index] = cv2.minMaxLoc(channel)[:2]
+
+    return {
+        "path": path,
+        "dtype": image.dtype.name,
+        "width": image.shape[1],
+        "height": image.shape[0],
+        "hist": hist,
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "min": low,
+        "max": high,
+    }
+
+def _safe_statistics(path, bins):
+    """image_statistics que devolve o erro em vez de interromper o lote"""
+    try:
+        return image_statistics(path, bins)
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+def bin_upper_value(index, bins, dtype):
+    """
+    Valor na faixa do tipo correspondente ao fim do bin `index`: usado como limiar
+    em apply_global_threshold (gray > valor separa os bins acima de `index`)
+    """
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        levels = int(dtype_max(dtype)) + 1
+        return (index + 1) * levels // bins - 1
+    return (index + 1) / bins
+
+def list_images(root, extensions=IMAGE_EXTENSIONS):
+    """Lista (em ordem) as imagens de uma pasta e subpastas"""
+    paths = []
+    for path in glob.iglob(os.path.join(root, "**", "*"), recursive=True):
+        if os.path.splitext(path)[1].lower() in extensions and os.path.isfile(path):
+            paths.append(os.path.abspath(path))
+    return sorted(paths)
+
+class DatasetStatistics:
+    """
+    Agregador de estatísticas de um conjunto de imagens, sem interface gráfica.
+    As imagens passam por um pool de processos em lotes; ao fim de cada lote são gravados:
+    - uma linha por imagem em images.csv (momentos por canal)
+    - histogramas por imagem em histograms_NNNNN.npz (opcional)
+    - o checkpoint aggregate.npz (agregados por tipo, de forma atômica)
+    O checkpoint guarda até onde o CSV é válido, então uma execução interrompida
+    recomeça sem reler os arquivos já processados
+    """
+
+    def __init__(self, output_dir, bins=256, max_workers=None, batch_size=256, per_image_histograms=False):
+        self.output_dir = output_dir
+        self.bins = bins
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.per_image_histograms = per_image_histograms
+        # Agregados por tipo da imagem ('uint8', 'uint16', 'float32'): limiares são na faixa do tipo
+        self.aggregates = {}
+        self.shards = 0
+        self.csv_offset = 0
+        self.finished = set()
+        os.makedirs(output_dir, exist_ok=True)
+
+    # ========== Checkpoint ==========
+    def _path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def resume(self):
+        """Carrega o checkpoint (se existir) e descarta o que foi gravado depois dele"""
+        checkpoint = self._path(CHECKPOINT_FILE)
+        if not os.path.exists(checkpoint):
+            self._truncate_csv(0)
+            self._remove_shards_after(0)
+            return 0
+
+        with np.load(checkpoint) as arrays:
+            if int(arrays["bins"]) != self.bins:
+                raise ValueError(f"O checkpoint usa {int(arrays['bins'])} bins, não {self.bins}")
+            self.shards = int(arrays["shards"])
+            self.csv_offset = int(arrays["csv_offset"])
+            self.aggregates = {
+                str(dtype): StatsAggregate.from_arrays(arrays, str(dtype)) for dtype in arrays["dtypes"]
+            }
+
+        # Linhas e lotes gravados após o último checkpoint não valem
+        self._truncate_csv(self.csv_offset)
+        self._remove_shards_after(self.shards)
+        with open(self._path(IMAGES_CSV), newline="", encoding="utf-8") as csv_file:
+            rows = csv.reader(csv_file)
+            next(rows, None)
+            self.finished = {row[0] for row in rows if row}
+        return len(self.finished)
+
+    def _truncate_csv(self, offset):
+        path = self._path(IMAGES_CSV)
+        if offset == 0 or not os.path.exists(path):
+            with open(path, "w", newline="", encoding="utf-8") as csv_file:
+                csv.writer(csv_file).writerow(IMAGE_COLUMNS)
+                self.csv_offset = csv_file.tell()
+            return
+        with open(path, "r+b") as csv_file:
+            csv_file.truncate(offset)
+
+    def _remove_shards_after(self, shards):
+        for path in glob.glob(self._path("histograms_*.npz")):
+            number = os.path.basename(path)[len("histograms_"):-len(".npz")]
+            if number.isdigit() and int(number) > shards:
+                os.remove(path)
+
+    def _save_checkpoint(self):
+        """Grava o checkpoint em um arquivo temporário e o renomeia (nunca fica pela metade)"""
+        arrays = {
+            "bins": np.array(self.bins),
+            "shards": np.array(self.shards),
+            "csv_offset": np.array(self.csv_offset),
+            "dtypes": np.array(sorted(self.aggregates)),
+        }
+        for dtype, aggregate in self.aggregates.items():
+            arrays.update(aggregate.to_arrays(dtype))
+        fd, temp_path = tempfile.mkstemp(dir=self.output_dir, prefix=".aggregate_", suffix=".npz")
+        with os.fdopen(fd, "wb") as temp_file:
+            np.savez(temp_file, **arrays)
+            match_file_mode(temp_file.fileno(), self._path(CHECKPOINT_FILE))
+        os.replace(temp_path, self._path(CHECKPOINT_FILE))
+
+    # ========== Processamento ==========
+    def run(self, paths, progress=None):
+        """
+        Processa as imagens ainda não concluídas
+        progress: função chamada com (concluídas, total) ao fim de cada lote
+        Retorna o número de imagens processadas nesta execução
+        """
+        pending = [path for path in paths if path not in self.finished]
+        total = len(self.finished) + len(pending)
+        if not pending:
+            self.write_summary()
+            return 0
+
+        # 'spawn' para não herdar estado do processo principal (como no SharedMemoryPool)
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                chunksize = max(1, len(batch) // (4 * self.max_workers))
+                results = list(executor.map(_safe_statistics, batch, [self.bins] * len(batch),
+                                            chunksize=chunksize))
+                self._commit_batch(results)
+                if progress is not None:
+                    progress(len(self.finished), total)
+
+        self.write_summary()
+        return len(pending)
+
+    def _commit_batch(self, results):
+        """Incorpora um lote aos agregados e grava CSV, histogramas e checkpoint"""
+        with open(self._path(IMAGES_CSV), "a", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            for stats in results:
+                writer.writerow(self._image_row(stats))
+            csv_file.flush()
+            os.fsync(csv_file.fileno())
+            self.csv_offset = csv_file.tell()
+
+        completed = [stats for stats in results if "error" not in stats]
+        for stats in completed:
+            aggregate = StatsAggregate.from_image(stats)
+            if stats["dtype"] in self.aggregates:
+                self.aggregates[stats["dtype"]].merge(aggregate)
+            else:
+                self.aggregates[stats["dtype"]] = aggregate
+
+        if self.per_image_histograms and completed:
+            self.shards += 1
+            np.savez_compressed(
+                self._path(SHARD_PATTERN.format(self.shards)),
+                paths=np.array([stats["path"] for stats in completed]),
+                dtypes=np.array([stats["dtype"] for stats in completed]),
+                hist=np.stack([stats["hist"] for stats in completed]).astype(np.uint32),
+            )
+
+        self._save_checkpoint()
+        self.finished.update(stats["path"] for stats in results)
+
+    def _image_row(self, stats):
+        if "error" in stats:
+            return [stats["path"], f"erro: {stats['error']}"] + [""] * (len(IMAGE_COLUMNS) - 2)
+        row = [stats["path"], "ok", stats["dtype"], stats["width"], stats["height"]]
+        std = np.sqrt(stats["m2"] / stats["count"])
+        for index in range(len(CHANNELS)):
+            row += [f"{stats['mean'][index]:.6g}", f"{std[index]:.6g}",
+                    f"{stats['min'][index]:g}", f"{stats['max'][index]:g}"]
+        return row
+
+    # ========== Resumo ==========
+    def write_summary(self):
+        """
+        Grava summary.csv: por tipo e canal, momentos, percentis e o limiar de Otsu
+        do histograma agregado (na faixa do tipo, pronto para apply_global_threshold)
+        """
+        threshold_model = ThresholdModel()
+        with open(self._path(SUMMARY_CSV), "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["dtype", "channel", "images", "pixels", "mean", "std", "min", "max",
+                             "p01", "p50", "p99", "otsu_threshold"])
+            for dtype, aggregate in sorted(self.aggregates.items()):
+                std = aggregate.std()
+                for index, channel in enumerate(CHANNELS):
+                    hist = aggregate.hist[index]
+                    cdf = np.cumsum(hist) / max(1, hist.sum())
+                    percentiles = [
+                        bin_upper_value(int(np.searchsorted(cdf, q)), self.bins, dtype) for q in (0.01, 0.5, 0.99)
+                    ]
+                    otsu = bin_upper_value(threshold_model.otsu_threshold(hist), self.bins, dtype)
+                    writer.writerow([
+                        dtype, channel, aggregate.images, aggregate.count,
+                        f"{aggregate.mean[index]:.6g}", f"{std[index]:.6g}",
+                        f"{aggregate.min[index]:g}", f"{aggregate.max[index]:g}",
+                        *(f"{value:g}" for value in percentiles), f"{otsu:g}",
+                    ])
@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from models.model import Model
+
+# Buffers do Model controlados pelo gerenciador, na ordem em que são enviados para o disco
+SPILLABLE_BUFFERS = ("equalized_image", "original", "image")
+
+def _buffer(model, name):
+    """Buffer do Model sem desempacotar a imagem atual (Model.image reconstrói packed_image)"""
+    if name == "image" and model.packed_image is not None:
+        return None
+    return getattr(model, name, None)
+
+class Document:
+    """Um documento aberto (aba): um Model com nome e estado próprios"""
+
+    def __init__(self, doc_id, name, model=None):
+        self.id = doc_id
+        self.name = name
+        self.model = model or Model()
+        # Valores dos sliders de brilho/contraste deste documento
+        self.adjustments = (0, 1.0)
+        # Buffers enviados para o disco: nome -> (caminho, memmap)
+        self.spilled = {}
+
+class DocumentManager:
+    """
+    Mantém vários documentos abertos sob um orçamento global de memória.
+    Quando o total de bytes em RAM passa do orçamento, a imagem binária de um documento
+    inativo é primeiro empacotada em bits (Model.pack_image, 24x menor e sem ir ao disco);
+    depois os buffers dos documentos inativos (e, se preciso, a original do ativo) são
+    gravados em disco e trocados por np.memmap somente leitura. Ao ativar um documento,
+    seus buffers voltam para a RAM
+    """
+
+    def __init__(self, budget_bytes=2 * 1024 ** 3, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.documents = []
+        self.active = None
+        self._next_id = 1
+        # Ordem de uso (o último é o mais recente)
+        self._usage = []
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="pdi_studio_spill_")
+
+    # ========== Documentos ==========
+    def new_document(self, name, model=None):
+        """Cria um documento (ainda não ativo); model: Model já carregado (None = vazio)"""
+        document = Document(self._next_id, name, model)
+        self._next_id += 1
+        self.documents.append(document)
+        return document
+
+    def activate(self, document):
+        """Torna o documento ativo, trazendo seus buffers de volta para a RAM"""
+        self.active = document
+        if document in self._usage:
+            self._usage.remove(document)
+        self._usage.append(document)
+        self._reload(document)
+        document.model.unpack_image()
+        self.enforce_budget()
+        return document
+
+    def close(self, document):
+        """Fecha o documento e remove seus arquivos temporários. Retorna o próximo ativo (ou None)"""
+        self._release(document)
+        index = self.documents.index(document)
+        self.documents.remove(document)
+        if document in self._usage:
+            self._usage.remove(document)
+        if self.active is document:
+            self.active = None
+            if self.documents:
+                return self.activate(self.documents[min(index, len(self.documents) - 1)])
+        return self.active
+
+    def shutdown(self):
+        """Remove todos os arquivos temporários"""
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    # ========== Memória ==========
+    def enforce_budget(self):
+        """Envia buffers para o disco até que a memória em RAM caiba no orçamento"""
+        for document in self.documents:
+            self._forget_stale(document)
+
+        # Primeiro os documentos inativos, do menos recente para o mais recente
+        candidates = [d for d in self._usage if d is not self.active]
+        candidates += [d for d in self.documents if d not in self._usage and d is not self.active]
+        for document in candidates:
+            if self.resident_bytes() <= self.budget_bytes:
+                return
+            document.model.pack_image()
+            for name in SPILLABLE_BUFFERS:
+                if self.resident_bytes() <= self.budget_bytes:
+                    return
+                self._spill(document, name)
+
+        # Por último, os buffers auxiliares do ativo (a imagem atual fica sempre em RAM)
+        if self.active is not None:
+            for name in SPILLABLE_BUFFERS[:-1]:
+                if self.resident_bytes() <= self.budget_bytes:
+                    return
+                self._spill(self.active, name)
+
+    def resident_bytes(self):
+        """Total de bytes dos buffers mantidos em RAM"""
+        return sum(self._document_bytes(d)[0] for d in self.documents)
+
+    def memory_usage(self):
+        """
+        Resumo do uso de memória
+        Retorna um dicionário com 'resident', 'spilled', 'budget' e 'documents'
+        (lista de (nome, bytes em RAM, bytes em disco))
+        """
+        per_document = []
+        resident = spilled = 0
+        for document in self.documents:
+            self._forget_stale(document)
+            in_ram, on_disk = self._document_bytes(document)
+            resident += in_ram
+            spilled += on_disk
+            per_document.append((document.name, in_ram, on_disk))
+        return {
+            "resident": resident,
+            "spilled": spilled,
+            "budget": self.budget_bytes,
+            "documents": per_document,
+        }
+
+    def _document_bytes(self, document):
+        """(bytes em RAM, bytes em disco) dos buffers do documento"""
+        in_ram = on_disk = 0
+        seen = set()
+        mapped_ids = {id(mapped) for _, mapped in document.spilled.values()}
+        for name in SPILLABLE_BUFFERS:
+            array = _buffer(document.model, name)
+            # Buffers que apontam para o mesmo array só contam uma vez
+            if array is None or id(array) in seen:
+                continue
+            seen.add(id(array))
+            # Buffers mapeados (spill ou sessão aberta) só ocupam RAM nas páginas lidas
+            if id(array) in mapped_ids or isinstance(array, np.memmap):
+                on_disk += array.nbytes
+            else:
+                in_ram += array.nbytes
+        if document.model.packed_image is not None:
+            in_ram += document.model.packed_image[0].nbytes
+        return in_ram, on_disk
+
+    def _spill(self, document, name):
+        """Grava um buffer em disco e o substitui por um memmap somente leitura"""
+        array = _buffer(document.model, name)
+        if array is None or (name in document.spilled and document.spilled[name][1] is array):
+            return
+        # Já mapeado de um arquivo de sessão: não há o que enviar para o disco
+        if isinstance(array, np.memmap):
+            return
+        path = os.path.join(self.spill_dir, f"doc{document.id}_{name}.npy")
+        np.save(path, array)
+        mapped = np.load(path, mmap_mode="r")
+        setattr(document.model, name, mapped)
+        document.spilled[name] = (path, mapped)
+
+    def _reload(self, document):
+        """Traz de volta para a RAM todos os buffers do documento que estão em disco"""
+        for name, (path, mapped) in list(document.spilled.items()):
+            if _buffer(document.model, name) is mapped:
+                setattr(document.model, name, np.array(mapped))
+            del document.spilled[name]
+            del mapped
+            self._remove_file(path)
+
+    def _forget_stale(self, document):
+        """Remove arquivos de buffers que já foram substituídos por uma operação"""
+        for name, (path, mapped) in list(document.spilled.items()):
+            if _buffer(document.model, name) is not mapped:
+                del document.spilled[name]
+                self._remove_file(path)
+
+    def _release(self, document):
+        """Descarta os buffers em disco do documento"""
+        for name, (path, _) in list(document.spilled.items()):
+            setattr(document.model, name, None)
+            del document.spilled[name]
+            self._remove_file(path)
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            # No Windows o arquivo pode continuar mapeado; fica para o shutdown()
+            pass
@@ -0,0 +1,261 @@
+import cv2
+import numpy as np
+from models.utils import convert_depth, dtype_max, to_gray
+
+# Tolerância relativa (segundo valor singular / primeiro) para considerar um kernel separável
+SEPARABLE_TOLERANCE = 1e-6
+# Lado mínimo a partir do qual a convolução é feita pela DFT da imagem inteira (medido com
+# benchmarks/filter_benchmark.py, de 512x512 a 2000x2000). O cv2.filter2D já troca sozinho
+# para uma DFT por blocos acima de ~11x11, mas o custo dos blocos cresce com o kernel;
+# o da DFT da imagem praticamente não depende dele
+DFT_MIN_KERNEL_SIZE = 101
+# Kernels separáveis custam (altura + largura) por pixel e vão para a DFT mais tarde
+DFT_MIN_SEPARABLE_SIZE = 151
+# Maior lado da DFT; imagens maiores são processadas em blocos (overlap-save)
+DFT_MAX_TILE = 4096
+
+def separate_kernel(kernel, tolerance=SEPARABLE_TOLERANCE):
+    """
+    Decompõe o kernel em dois kernels 1D se ele tem posto 1 (kernel = coluna x linha)
+    Retorna (coluna, linha) em float32 ou None se o kernel não é separável
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    if kernel.ndim != 2 or min(kernel.shape) < 2:
+        return None
+    u, s, vt = np.linalg.svd(kernel)
+    if s[0] == 0 or s[1] > tolerance * s[0]:
+        return None
+    scale = np.sqrt(s[0])
+    column = (u[:, 0] * scale).astype(np.float32)
+    row = (vt[0] * scale).astype(np.float32)
+    return column, row
+
+def gaussian_kernel_size(sigma):
+    """Tamanho ímpar do kernel gaussiano que cobre ±3 sigma"""
+    return max(3, 2 * int(np.ceil(3 * sigma)) + 1)
+
+def saturate(image, dtype):
+    """Arredonda e satura um resultado float para o tipo da imagem (como o OpenCV faz)"""
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.integer):
+        return image.astype(dtype, copy=False)
+    return np.clip(np.rint(image), 0, dtype_max(dtype)).astype(dtype)
+
+def dft_correlate(image, kernel, max_tile=DFT_MAX_TILE):
+    """
+    Correlação 2D (mesma definição e borda do cv2.filter2D) pela DFT
+    A imagem é completada com BORDER_REFLECT_101 até o tamanho da DFT e multiplicada pelo
+    espectro do kernel, calculado uma vez para todos os canais. Imagens maiores que
+    max_tile são processadas em blocos (overlap-save)
+    image: imagem 2D ou com canais (qualquer tipo); kernel: 2D
+    Retorna o resultado em float32, com os mesmos canais
+    """
+    kernel = np.asarray(kernel, dtype=np.float32)
+    kernel_h, kernel_w = kernel.shape
+    anchor_y, anchor_x = kernel_h // 2, kernel_w // 2
+    height, width = image.shape[:2]
+
+    # Tamanho da DFT: a imagem inteira, se couber; senão blocos de até max_tile
+    dft_h = cv2.getOptimalDFTSize(min(height + kernel_h - 1, max(max_tile, 2 * kernel_h)))
+    dft_w = cv2.getOptimalDFTSize(min(width + kernel_w - 1, max(max_tile, 2 * kernel_w)))
+    # Cada bloco produz dft - (kernel - 1) linhas/colunas válidas (sem o efeito circular)
+    step_h, step_w = dft_h - kernel_h + 1, dft_w - kernel_w + 1
+    tiles_y, tiles_x = -(-height // step_h), -(-width // step_w)
+
+    # Correlação = convolução com o kernel invertido
+    kernel_block = np.zeros((dft_h, dft_w), dtype=np.float32)
+    kernel_block[:kernel_h, :kernel_w] = kernel[::-1, ::-1]
+    kernel_spectrum = cv2.dft(kernel_block)
+
+    channels = [image] if image.ndim == 2 else cv2.split(image)
+    results = []
+    for channel in channels:
+        # A borda cobre todos os blocos inteiros; o que passa da borda do kernel só
+        # alimenta saídas descartadas
+        padded = cv2.copyMakeBorder(
+            channel.astype(np.float32, copy=False),
+            anchor_y, (tiles_y - 1) * step_h + dft_h - height - anchor_y,
+            anchor_x, (tiles_x - 1) * step_w + dft_w - width - anchor_x,
+            cv2.BORDER_REFLECT_101
+        )
+        result = np.empty((height, width), dtype=np.float32)
+        for y in range(0, height, step_h):
+            for x in range(0, width, step_w):
+                spectrum = cv2.dft(padded[y:y + dft_h, x:x + dft_w])
+                product = cv2.mulSpectrums(spectrum, kernel_spectrum, 0)
+                filtered = cv2.idft(product, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+                rows, columns = min(step_h, height - y), min(step_w, width - x)
+                result[y:y + rows, x:x + columns] = filtered[kernel_h - 1:kernel_h - 1 + rows,
+                                                             kernel_w - 1:kernel_w - 1 + columns]
+        results.append(result)
+    return results[0] if image.ndim == 2 else cv2.merge(results)
+
+class FilterModel:
+    """
+    Filtros espaciais: suavização (gaussiano, média, mediana, bilateral), nitidez (unsharp
+    mask), bordas (Sobel, Laplaciano) e kernels personalizados. Os kernels personalizados
+    passam por um motor que escolhe o caminho mais barato: duas passadas 1D para kernels
+    separáveis, convolução direta para kernels pequenos e DFT para kernels grandes.
+    Todos os filtros preservam a profundidade (8/16 bits ou float) e usam BORDER_REFLECT_101
+    """
+
+    # Filtros disponíveis em apply e seus parâmetros padrão
+    METHODS = {
+        "gaussian": {"sigma": 2.0},
+        "box": {"size": 5},
+        "median": {"size": 5},
+        "bilateral": {"diameter": 9, "sigma_color": 50.0, "sigma_space": 5.0},
+        "unsharp": {"sigma": 2.0, "amount": 1.0, "threshold": 0},
+        "sobel": {"ksize": 3},
+        "laplacian": {"ksize": 3},
+        "custom": {"kernel": [[0, -1, 0], [-1, 5, -1], [0, -1, 0]], "normalize": False},
+    }
+
+    def __init__(self, dft_min_size=DFT_MIN_KERNEL_SIZE, dft_min_separable_size=DFT_MIN_SEPARABLE_SIZE,
+                 dft_max_tile=DFT_MAX_TILE):
+        self.dft_min_size = dft_min_size
+        self.dft_min_separable_size = dft_min_separable_size
+        self.dft_max_tile = dft_max_tile
+        # Caminho usado na última convolução ('separable', 'direct' ou 'dft')
+        self.last_path = None
+
+    def apply(self, image, method, **params):
+        """
+        Aplica um dos filtros de METHODS em uma imagem BGR
+        params: parâmetros do filtro (os ausentes usam o padrão de METHODS)
+        Retorna a imagem filtrada, na mesma profundidade
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Filtro desconhecido: {method}")
+        options = dict(self.METHODS[method])
+        options.update(params)
+        return getattr(self, method)(image, **options)
+
+    # ========== Motor de convolução ==========
+    def choose_path(self, kernel):
+        """Caminho mais barato para o kernel: 'separable', 'direct' ou 'dft'"""
+        kernel = np.asarray(kernel)
+        side = max(kernel.shape)
+        if separate_kernel(kernel) is not None:
+            return "dft" if side >= self.dft_min_separable_size else "separable"
+        return "dft" if side >= self.dft_min_size else "direct"
+
+    def convolve(self, image, kernel, path=None):
+        """
+        Correlação com um kernel 2D (mesma definição do cv2.filter2D), em todos os canais
+        path: força 'separable', 'direct' ou 'dft' (None = choose_path)
+        Retorna a imagem filtrada, na mesma profundidade
+        """
+        kernel = np.asarray(kernel, dtype=np.float32)
+        if kernel.ndim != 2 or kernel.size == 0:
+            raise ValueError("O kernel deve ser uma matriz 2D")
+        path = path or self.choose_path(kernel)
+        self.last_path = path
+
+        if path == "separable":
+            factors = separate_kernel(kernel)
+            if factors is None:
+                raise ValueError("O kernel não é separável")
+            column, row = factors
+            return cv2.sepFilter2D(image, -1, row, column, borderType=cv2.BORDER_REFLECT_101)
+        if path == "direct":
+            return cv2.filter2D(image, -1, kernel, borderType=cv2.BORDER_REFLECT_101)
+        if path == "dft":
+            return saturate(dft_correlate(image, kernel, self.dft_max_tile), image.dtype)
+        raise ValueError(f"Caminho de convolução desconhecido: {path}")
+
+    def separable(self, image, column, row):
+        """Duas passadas 1D (linhas e colunas) com kernels já separados"""
+        self.last_path = "separable"
+        column = np.asarray(column, dtype=np.float32)
+        row = np.asarray(row, dtype=np.float32)
+        return cv2.sepFilter2D(image, -1, row, column, borderType=cv2.BORDER_REFLECT_101)
+
+    # ========== Suavização ==========
+    def gaussian(self, image, sigma=2.0, ksize=None):
+        """Desfoque gaussiano (sempre separável); ksize ímpar, padrão ±3 sigma"""
+        sigma = float(sigma)
+        if sigma <= 0:
+            raise ValueError("Sigma deve ser positivo")
+        ksize = int(ksize) if ksize else gaussian_kernel_size(sigma)
+        ksize += 1 - ksize % 2
+        kernel = cv2.getGaussianKernel(ksize, sigma, cv2.CV_32F)
+        if ksize >= self.dft_min_separable_size:
+            return self.convolve(image, kernel @ kernel.T, path="dft")
+        return self.separable(image, kernel, kernel)
+
+    def box(self, image, size=5):
+        """Média em uma janela size x size (somas acumuladas: custo independente da janela)"""
+        size = max(1, int(size))
+        self.last_path = "separable"
+        return cv2.blur(image, (size, size), borderType=cv2.BORDER_REFLECT_101)
+
+    def median(self, image, size=5):
+        """Mediana em uma janela size x size (ímpar); 16 bits e float só aceitam 3 ou 5"""
+        size = max(3, int(size))
+        size += 1 - size % 2
+        if image.dtype != np.uint8 and size > 5:
+            raise ValueError("A mediana em 16 bits ou float aceita só janelas 3 ou 5")
+        self.last_path = "direct"
+        return cv2.medianBlur(image, size)
+
+    def bilateral(self, image, diameter=9, sigma_color=50.0, sigma_space=5.0):
+        """
+        Suavização que preserva bordas
+        sigma_color: diferença de intensidade em níveis de 8 bits (reescalada em 16 bits/float)
+        """
+        self.last_path = "direct"
+        diameter = int(diameter)
+        if image.dtype == np.uint8:
+            return cv2.bilateralFilter(image, diameter, float(sigma_color), float(sigma_space))
+        # O OpenCV só aceita 8 bits ou float: 16 bits passa por float em [0, 1]
+        as_float = convert_depth(image, np.float32).astype(np.float32, copy=False)
+        filtered = cv2.bilateralFilter(as_float, diameter, float(sigma_color) / 255.0, float(sigma_space))
+        return convert_depth(filtered, image.dtype)
+
+    # ========== Nitidez ==========
+    def unsharp(self, image, sigma=2.0, amount=1.0, threshold=0):
+        """
+        Unsharp mask: imagem + amount * (imagem - desfocada)
+        threshold: diferenças menores que isso (em unidades da imagem) não são realçadas
+        """
+        blurred = self.gaussian(image, sigma)
+        amount = float(amount)
+        sharpened = cv2.addWeighted(image, 1.0 + amount, blurred, -amount, 0)
+        if threshold:
+            difference = cv2.absdiff(image, blurred)
+            np.copyto(sharpened, image, where=difference < threshold)
+        return sharpened
+
+    # ========== Bordas ==========
+    def sobel(self, image, ksize=3):
+        """Magnitude do gradiente de Sobel em tons de cinza (saturada no máximo do tipo)"""
+        gray = to_gray(image).astype(np.float32, copy=False)
+        ksize = int(ksize)
+        self.last_path = "separable"
+        gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=ksize, borderType=cv2.BORDER_REFLECT_101)
+        gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=ksize, borderType=cv2.BORDER_REFLECT_101)
+        magnitude = saturate(np.minimum(cv2.magnitude(gx, gy), dtype_max(image.dtype)), image.dtype)
+        return cv2.cvtColor(magnitude, cv2.COLOR_GRAY2BGR)
+
+    def laplacian(self, image, ksize=3):
+        """Valor absoluto do Laplaciano em tons de cinza (saturado no máximo do tipo)"""
+        gray = to_gray(image).astype(np.float32, copy=False)
+        self.last_path = "direct"
+        response = np.abs(cv2.Laplacian(gray, cv2.CV_32F, ksize=int(ksize), borderType=cv2.BORDER_REFLECT_101))
+        edges = saturate(np.minimum(response, dtype_max(image.dtype)), image.dtype)
+        return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+
+    # ========== Kernel personalizado ==========
+    def custom(self, image, kernel, normalize=False):
+        """
+        Kernel definido pelo usuário (lista de linhas); normalize divide pela soma
+        O caminho (separável, direto ou DFT) é escolhido automaticamente
+        """
+        kernel = np.asarray(kernel, dtype=np.float32)
+        if normalize:
+            total = kernel.sum()
+            if total == 0:
+                raise ValueError("O kernel tem soma zero e não pode ser normalizado")
+            kernel = kernel / total
+        return self.convolve(image, kernel)
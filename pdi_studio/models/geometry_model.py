@@ -0,0 +1,144 @@
+import math
+import cv2
+import numpy as np
+
+# Interpolações aceitas em resize_image e rotate_image
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+# Espelhamentos (código do cv2.flip)
+FLIPS = {
+    "horizontal": 1,
+    "vertical": 0,
+    "both": -1,
+}
+# Rotações exatas (ângulo anti-horário, como em cv2.getRotationMatrix2D)
+ROTATIONS_90 = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+# Pixels de saída por faixa na reamostragem: imagens maiores são geradas faixa por faixa,
+# lendo só a parte da origem que cada faixa usa
+STRIP_PIXELS = 16_000_000
+
+def crop(image, x, y, width, height):
+    """
+    Recorte como view (sem cópia), limitado aos limites da imagem
+    Retorna (view, (x, y, largura, altura) efetivamente recortados)
+    """
+    x0, y0 = max(0, int(x)), max(0, int(y))
+    x1 = min(image.shape[1], int(x) + int(width))
+    y1 = min(image.shape[0], int(y) + int(height))
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError("O recorte está fora da imagem")
+    return image[y0:y1, x0:x1], (x0, y0, x1 - x0, y1 - y0)
+
+def flip(image, axis):
+    """Espelhamento: 'horizontal', 'vertical' ou 'both'"""
+    if axis not in FLIPS:
+        raise ValueError(f"Espelhamento desconhecido: {axis}")
+    return cv2.flip(image, FLIPS[axis])
+
+def rotate(image, angle, interpolation="linear", expand=True, border_value=0):
+    """
+    Rotação anti-horária em graus em torno do centro
+    Múltiplos de 90° usam cv2.rotate (exato, sem interpolação); os demais ângulos, um único
+    warpAffine: em faixas o resultado mudaria com o tamanho da faixa (o warpAffine arredonda
+    as coordenadas em ponto fixo a partir da matriz, que seria deslocada em cada faixa)
+    expand: aumenta a tela para caber a imagem inteira (False mantém o tamanho e corta os cantos)
+    border_value: valor dos cantos fora da imagem original
+    """
+    angle = float(angle) % 360
+    if angle == 0:
+        return image.copy()
+    if angle in ROTATIONS_90 and (expand or angle == 180):
+        return cv2.rotate(image, ROTATIONS_90[int(angle)])
+    height, width = image.shape[:2]
+    center = ((width - 1) / 2, (height - 1) / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    if expand:
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        # Arredonda para baixo resíduos de ponto flutuante (ex.: 1000.0000000001)
+        new_width = max(1, math.ceil(width * cos + height * sin - 1e-6))
+        new_height = max(1, math.ceil(width * sin + height * cos - 1e-6))
+        matrix[0, 2] += (new_width - 1) / 2 - center[0]
+        matrix[1, 2] += (new_height - 1) / 2 - center[1]
+        width, height = new_width, new_height
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Interpolação desconhecida: {interpolation}")
+    border = (border_value,) * 4 if np.isscalar(border_value) else tuple(border_value)
+    return cv2.warpAffine(image, matrix, (width, height), flags=INTERPOLATIONS[interpolation],
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border)
+
+def resize(image, width, height, interpolation=None, strip_pixels=STRIP_PIXELS):
+    """
+    Redimensiona para largura x altura
+    interpolation: uma das INTERPOLATIONS (None = 'area' para reduzir, 'cubic' para ampliar)
+    Saídas maiores que strip_pixels no vizinho mais próximo e na redução por área são geradas
+    em faixas; o resultado é sempre o mesmo do cv2.resize
+    """
+    width, height = int(width), int(height)
+    if width < 1 or height < 1:
+        raise ValueError("O novo tamanho deve ser positivo")
+    interpolation = interpolation or default_interpolation(image.shape, (width, height))
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Interpolação desconhecida: {interpolation}")
+    if width * height <= strip_pixels:
+        return cv2.resize(image, (width, height), interpolation=INTERPOLATIONS[interpolation])
+
+    source_height, source_width = image.shape[:2]
+    if interpolation == "nearest":
+        return _resize_nearest_strips(image, width, height, strip_pixels)
+    if interpolation == "area" and height <= source_height and width <= source_width:
+        return _resize_area_strips(image, width, height, strip_pixels)
+    # Nas demais interpolações o OpenCV calcula os pesos em float32 a partir da linha absoluta
+    # do destino, o que faixas não reproduzem; cv2.resize já trabalha em blocos de linhas e só
+    # aloca a saída, então roda na imagem inteira (resultado igual ao de imagens pequenas)
+    return cv2.resize(image, (width, height), interpolation=INTERPOLATIONS[interpolation])
+
+def default_interpolation(shape, size):
+    """'area' quando a imagem diminui, 'cubic' quando aumenta"""
+    return "area" if size[0] * size[1] <= shape[0] * shape[1] else "cubic"
+
+def _resize_area_strips(image, width, height, strip_pixels):
+    """
+    Redução INTER_AREA em faixas com o mesmo resultado da imagem inteira: as fronteiras
+    das faixas caem em linhas de destino que correspondem a linhas inteiras da origem
+    """
+    source_height = image.shape[0]
+    # A linha de destino y começa na linha de origem y * source_height / height: é inteira
+    # a cada `step` linhas de destino
+    step = height // math.gcd(source_height, height)
+    rows = max(step, strip_pixels // width // step * step)
+    output = np.empty((height, width) + image.shape[2:], dtype=image.dtype)
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        source = image[y0 * source_height // height:y1 * source_height // height]
+        cv2.resize(source, (width, y1 - y0), dst=output[y0:y1], interpolation=cv2.INTER_AREA)
+    return output
+
+def _resize_nearest_strips(image, width, height, strip_pixels):
+    """
+    Vizinho mais próximo em faixas, com os mesmos índices do cv2.resize:
+    origem = floor(destino * origem / destino), limitado à última linha/coluna
+    """
+    source_height, source_width = image.shape[:2]
+    columns = _nearest_indices(source_width, width)
+    source_rows = _nearest_indices(source_height, height)
+    output = np.empty((height, width) + image.shape[2:], dtype=image.dtype)
+    rows = max(1, strip_pixels // width)
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        np.take(image[source_rows[y0:y1]], columns, axis=1, out=output[y0:y1])
+    return output
+
+def _nearest_indices(source_size, size):
+    """Índices da origem de cada posição do destino (mesma conta em double do OpenCV)"""
+    scale = 1.0 / (size / source_size)
+    indices = np.floor(np.arange(size) * scale).astype(np.intp)
+    return np.minimum(indices, source_size - 1)
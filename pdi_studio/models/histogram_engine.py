@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+from models.utils import convert_depth, default_histogram_bins, to_gray
+
+# Espaços de cor suportados: (conversão a partir de BGR, nomes dos canais)
+COLOR_SPACES = {
+    "bgr": (None, ("b", "g", "r")),
+    "rgb": (cv2.COLOR_BGR2RGB, ("r", "g", "b")),
+    "hsv": (cv2.COLOR_BGR2HSV, ("h", "s", "v")),
+    "lab": (cv2.COLOR_BGR2Lab, ("l", "a", "b")),
+    "ycrcb": (cv2.COLOR_BGR2YCrCb, ("y", "cr", "cb")),
+    "gray": (None, ("gray",)),
+}
+
+# Histogramas 2D usados por padrão em cada espaço (ex.: Matiz x Saturação para segmentar cor)
+DEFAULT_JOINT = {
+    "hsv": ("h", "s"),
+    "lab": ("a", "b"),
+    "ycrcb": ("cr", "cb"),
+}
+
+def channel_ranges(color_space, dtype):
+    """
+    Faixa [min, max) de cada canal depois da conversão, de acordo com o tipo convertido
+    (8 bits: H em [0, 180); float: H em [0, 360), L em [0, 100], a/b em [-128, 128))
+    """
+    names = COLOR_SPACES[color_space][1]
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        full = (0.0, float(np.iinfo(dtype).max) + 1)
+        ranges = {name: full for name in names}
+        if color_space == "hsv":
+            ranges["h"] = (0.0, 180.0)
+        return ranges
+    # float: o limite superior é incluído (ex.: branco com S/V = 1.0)
+    top = lambda value: float(np.nextafter(np.float32(value), np.float32(np.inf)))
+    ranges = {name: (0.0, top(1.0)) for name in names}
+    if color_space == "hsv":
+        ranges["h"] = (0.0, 360.0)
+    elif color_space == "lab":
+        ranges.update({"l": (0.0, top(100.0)), "a": (-128.0, 128.0), "b": (-128.0, 128.0)})
+    return ranges
+
+def _default_bins(color_space, dtype, name):
+    """Um bin por nível em canais inteiros (180 para o H de 8 bits); 256 nos demais"""
+    dtype = np.dtype(dtype)
+    if color_space == "hsv" and name == "h" and dtype == np.uint8:
+        return 180
+    if dtype in (np.uint8, np.uint16):
+        return default_histogram_bins(dtype)
+    return 256
+
+def _convert_strip(strip, color_space):
+    """Converte uma faixa BGR para o espaço de cor (16 bits passam por float32 fora de BGR/RGB)"""
+    code = COLOR_SPACES[color_space][0]
+    if color_space == "gray":
+        return to_gray(strip)
+    if code is None:
+        return strip
+    if converted_dtype(color_space, strip.dtype) != strip.dtype:
+        # HSV/Lab/YCrCb do OpenCV só existem em 8 bits ou float
+        strip = convert_depth(strip, np.float32)
+    return cv2.cvtColor(strip, code)
+
+def converted_dtype(color_space, dtype):
+    """Tipo dos canais depois da conversão para o espaço de cor"""
+    dtype = np.dtype(dtype)
+    if dtype == np.uint16 and color_space not in ("bgr", "rgb", "gray"):
+        return np.dtype(np.float32)
+    return dtype
+
+def sampling_step(shape, max_samples):
+    """Passo da grade regular para amostrar no máximo max_samples pixels (1 = todos)"""
+    if not max_samples:
+        return 1
+    height, width = shape[:2]
+    return max(1, int(np.ceil(np.sqrt(height * width / max_samples))))
+
+def color_histograms(image, color_space="bgr", bins=None, joint=None, joint_bins=(64, 64),
+                     max_samples=None, strip_height=512):
+    """
+    Histogramas de todos os canais de um espaço de cor e histogramas 2D conjuntos,
+    em uma única passada pela imagem: cada faixa de linhas é convertida uma vez e todos os
+    histogramas são acumulados enquanto ela está no cache (a imagem convertida inteira
+    nunca existe na memória)
+    image: imagem BGR (uint8, uint16 ou float32); imagens 2D são tratadas como cinza
+    color_space: chave de COLOR_SPACES
+    bins: bins dos histogramas 1D (None = padrão de cada canal; int = o mesmo para todos)
+    joint: lista de pares de canais para os histogramas 2D (ex.: [('h', 's')])
+    joint_bins: bins (primeiro canal, segundo canal) dos histogramas 2D
+    max_samples: usa uma grade regular com no máximo esse número de pixels (None = todos)
+    Retorna um dicionário com 'color_space', 'channels' (nome -> histograma float32),
+    'ranges' (nome -> faixa), 'joint' ((a, b) -> matriz bins_a x bins_b) e 'step' (amostragem)
+    """
+    if color_space not in COLOR_SPACES:
+        raise ValueError(f"Espaço de cor desconhecido: {color_space}")
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+    names = COLOR_SPACES[color_space][1]
+    dtype = converted_dtype(color_space, image.dtype)
+    ranges = channel_ranges(color_space, dtype)
+    channel_bins = {
+        name: int(bins) if bins else _default_bins(color_space, dtype, name) for name in names
+    }
+    pairs = [tuple(pair) for pair in (joint or [])]
+    for pair in pairs:
+        for name in pair:
+            if name not in names:
+                raise ValueError(f"Canal '{name}' não existe no espaço {color_space}")
+
+    step = sampling_step(image.shape, max_samples)
+    sampled = image[::step, ::step] if step > 1 else image
+    hists = {name: np.zeros(channel_bins[name], dtype=np.float64) for name in names}
+    joints = {pair: np.zeros(tuple(joint_bins), dtype=np.float64) for pair in pairs}
+    index = {name: i for i, name in enumerate(names)}
+
+    for y0 in range(0, sampled.shape[0], strip_height):
+        # Faixas amostradas não são contíguas; a cópia tem só o tamanho da faixa
+        strip = _convert_strip(np.ascontiguousarray(sampled[y0:y0 + strip_height]), color_space)
+        for name in names:
+            low, high = ranges[name]
+            hists[name] += cv2.calcHist([strip], [index[name]], None, [channel_bins[name]], [low, high]).ravel()
+        for a, b in pairs:
+            hist_range = list(ranges[a]) + list(ranges[b])
+            joints[(a, b)] += cv2.calcHist([strip], [index[a], index[b]], None, list(joint_bins), hist_range)
+
+    return {
+        "color_space": color_space,
+        "channels": {name: hist.astype(np.float32) for name, hist in hists.items()},
+        "ranges": ranges,
+        "joint": {pair: hist.astype(np.float32) for pair, hist in joints.items()},
+        "step": step,
+    }
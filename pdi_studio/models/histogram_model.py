@@ -1,58 +1,143 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
-matplotlib.use('TkAgg')
+from models.utils import compute_histogram, convert_depth, dtype_max, to_gray
+
+# Espaços de cor em que apenas o canal de luminância (canal 0) é equalizado
+LUMINANCE_SPACES = {
+    "ycrcb": (cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2BGR),
+    "lab": (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR),
+}
+
+def equalization_lut(hist, dtype):
+    """
+    LUT de equalização global a partir do histograma (um bin por nível do tipo)
+    Mesma fórmula do cv2.equalizeHist; se todos os pixels têm o mesmo nível, retorna a identidade
+    """
+    hist = np.asarray(hist, dtype=np.float64).ravel()
+    cdf = np.cumsum(hist)
+    nonzero = np.nonzero(hist)[0]
+    if len(nonzero) == 0 or cdf[-1] == hist[nonzero[0]]:
+        return np.arange(len(hist)).astype(dtype)
+    cdf_min = hist[nonzero[0]]
+    max_value = dtype_max(dtype)
+    lut = np.rint((cdf - cdf_min) * (max_value / (cdf[-1] - cdf_min)))
+    return np.clip(lut, 0, max_value).astype(dtype)
 
 class HistogramModel:
     def __init__(self):
         self.original_histogram = None
         self.equalized_histogram = None
-        
-    def calculate_histograms(self, original_image, equalized_image):
+
+    # ========== Equalização ==========
+    def equalize(self, image, method="global", color_space=None, clip_limit=2.0, tile_grid=(8, 8),
+                 mask=None):
+        """
+        Equaliza o histograma de uma imagem BGR
+        method: 'global' (equalizeHist) ou 'clahe' (adaptativa por blocos)
+        color_space: None converte para cinza; 'ycrcb' ou 'lab' equaliza só a luminância e preserva a cor
+        clip_limit: limite de contraste do CLAHE (evita amplificar ruído em regiões planas)
+        tile_grid: grade de blocos do CLAHE (colunas, linhas)
+        mask: máscara booleana (ROI poligonal); a equalização global usa só o histograma desses pixels
+        Retorna a imagem equalizada em BGR
+        """
+        if image is None:
+            return None
+
+        if color_space is None:
+            equalized = self._equalize_channel(to_gray(image), method, clip_limit, tile_grid, mask)
+            return cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR)
+
+        if color_space not in LUMINANCE_SPACES:
+            raise ValueError(f"Espaço de cor não suportado: {color_space}")
+
+        forward, backward = LUMINANCE_SPACES[color_space]
+        source = image
+        luminance_scale = 1.0
+        if color_space == "lab" and image.dtype != np.uint8:
+            # O OpenCV só converte para Lab em 8 bits ou float, com L em [0, 100]
+            source = convert_depth(image, np.float32)
+            luminance_scale = 100.0
+
+        channels = list(cv2.split(cv2.cvtColor(source, forward)))
+        if luminance_scale == 1.0:
+            channels[0] = self._equalize_channel(channels[0], method, clip_limit, tile_grid, mask)
+        else:
+            luminance = channels[0] / luminance_scale
+            channels[0] = self._equalize_channel(luminance, method, clip_limit, tile_grid, mask) * luminance_scale
+        result = cv2.cvtColor(cv2.merge(channels), backward)
+        return convert_depth(result, image.dtype)
+
+    def _equalize_channel(self, channel, method, clip_limit, tile_grid, mask=None):
+        """Equaliza um único canal com o método escolhido"""
+        if channel.dtype == np.float32:
+            # Imagens float são equalizadas na grade de 16 bits e convertidas de volta
+            quantized = convert_depth(np.clip(channel, 0.0, 1.0), np.uint16)
+            equalized = self._equalize_channel(quantized, method, clip_limit, tile_grid, mask)
+            return convert_depth(equalized, np.float32)
+        if method == "global":
+            if channel.dtype == np.uint8 and mask is None:
+                return cv2.equalizeHist(channel)
+            return self._equalize_with_lut(channel, mask)
+        if method == "clahe":
+            return self.apply_clahe(channel, clip_limit, tile_grid)
+        raise ValueError(f"Método de equalização desconhecido: {method}")
+
+    def _equalize_with_lut(self, channel, mask=None):
+        """
+        Equalização global por LUT construída a partir da CDF (65.536 entradas em 16 bits)
+        mask: se dada, o histograma conta só os pixels da máscara
+        """
+        pixels = channel if mask is None else channel[mask][None, :]
+        return equalization_lut(compute_histogram(pixels), channel.dtype)[channel]
+
+    def apply_clahe(self, channel, clip_limit=2.0, tile_grid=(8, 8)):
+        """
+        Aplica CLAHE em um canal. O OpenCV já paraleliza internamente o cálculo das tabelas
+        e a interpolação; dividir em faixas mudaria o resultado (a posição de cada linha
+        entre os blocos é calculada em float32 a partir da linha absoluta)
+        """
+        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(int(tile_grid[0]), int(tile_grid[1])))
+        return clahe.apply(channel)
+
+    def calculate_histograms(self, original_image, equalized_image, bins=None):
         """Calcula os histogramas das imagens original e equalizada"""
         if original_image is None or equalized_image is None:
             return None, None
             
         # Converter para escala de cinza se necessário
-        if len(original_image.shape) == 3:
-            original_gray = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
-        else:
-            original_gray = original_image
-            
-        if len(equalized_image.shape) == 3:
-            equalized_gray = cv2.cvtColor(equalized_image, cv2.COLOR_BGR2GRAY)
-        else:
-            equalized_gray = equalized_image
+        original_gray = to_gray(original_image)
+        equalized_gray = to_gray(equalized_image)
         
-        # Calcular histogramas
-        self.original_histogram = cv2.calcHist([original_gray], [0], None, [256], [0, 256])
-        self.equalized_histogram = cv2.calcHist([equalized_gray], [0], None, [256], [0, 256])
+        # Calcular histogramas (bins configuráveis, até 65.536 níveis em 16 bits)
+        self.original_histogram = compute_histogram(original_gray, bins)
+        self.equalized_histogram = compute_histogram(equalized_gray, bins)
         
         return self.original_histogram, self.equalized_histogram
     
     def create_histogram_plot(self, original_hist, equalized_hist):
         """Cria um gráfico com os histogramas lado a lado"""
+        # Importado aqui: o Model usa este módulo para equalização e não deve carregar o matplotlib
+        import matplotlib.pyplot as plt
+
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
         
         # histograma em sua forma original
         ax1.plot(original_hist, color='blue', alpha=0.7)
-        ax1.fill_between(range(256), original_hist.flatten(), alpha=0.3, color='blue')
+        ax1.fill_between(range(len(original_hist)), original_hist.flatten(), alpha=0.3, color='blue')
         ax1.set_title('Histograma Original', fontsize=12, fontweight='bold')
         ax1.set_xlabel('Intensidade de Pixel')
         ax1.set_ylabel('Frequência')
         ax1.grid(True, alpha=0.3)
-        ax1.set_xlim(0, 255)
+        ax1.set_xlim(0, len(original_hist) - 1)
         
         # histograma em sua forma equalizado
         ax2.plot(equalized_hist, color='red', alpha=0.7)
-        ax2.fill_between(range(256), equalized_hist.flatten(), alpha=0.3, color='red')
+        ax2.fill_between(range(len(equalized_hist)), equalized_hist.flatten(), alpha=0.3, color='red')
         ax2.set_title('Histograma Equalizado', fontsize=12, fontweight='bold')
         ax2.set_xlabel('Intensidade de Pixel')
         ax2.set_ylabel('Frequência')
         ax2.grid(True, alpha=0.3)
-        ax2.set_xlim(0, 255)
+        ax2.set_xlim(0, len(equalized_hist) - 1)
         
         #fazer ajuste de layout
         plt.tight_layout()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from models.utils import convert_depth, match_file_mode
+
+# Profundidades que cada formato de arquivo consegue gravar sem conversão
+FORMAT_DEPTHS = {
+    ".png": (np.uint8, np.uint16),
+    ".tif": (np.uint8, np.uint16, np.float32),
+    ".tiff": (np.uint8, np.uint16, np.float32),
+}
+
+# Opções padrão de codificação por formato
+DEFAULT_OPTIONS = {
+    ".png": {"compression": 3},
+    ".jpg": {"quality": 95, "progressive": False, "optimize": False},
+    ".jpeg": {"quality": 95, "progressive": False, "optimize": False},
+    ".webp": {"quality": 90},
+    ".tif": {"compression": "lzw"},
+    ".tiff": {"compression": "lzw"},
+    ".bmp": {},
+}
+
+# Códigos de compressão TIFF aceitos pelo OpenCV (libtiff)
+TIFF_COMPRESSION = {
+    "none": 1,
+    "lzw": 5,
+    "jpeg": 7,
+    "deflate": 8,
+}
+
+def get_extension(path):
+    """Extensão do arquivo em minúsculas (com o ponto)"""
+    return os.path.splitext(path)[1].lower()
+
+def build_encoder_params(extension, options=None):
+    """
+    Monta a lista de parâmetros do cv2.imencode para o formato
+    options: dicionário com as opções do formato (ver DEFAULT_OPTIONS)
+    """
+    merged = dict(DEFAULT_OPTIONS.get(extension, {}))
+    merged.update(options or {})
+
+    params = []
+    if extension == ".png":
+        params += [cv2.IMWRITE_PNG_COMPRESSION, int(merged["compression"])]
+    elif extension in (".jpg", ".jpeg"):
+        params += [cv2.IMWRITE_JPEG_QUALITY, int(merged["quality"])]
+        params += [cv2.IMWRITE_JPEG_PROGRESSIVE, int(bool(merged["progressive"]))]
+        params += [cv2.IMWRITE_JPEG_OPTIMIZE, int(bool(merged["optimize"]))]
+    elif extension == ".webp":
+        # Qualidade acima de 100 gera WebP sem perdas
+        params += [cv2.IMWRITE_WEBP_QUALITY, int(merged["quality"])]
+    elif extension in (".tif", ".tiff"):
+        params += [cv2.IMWRITE_TIFF_COMPRESSION, TIFF_COMPRESSION[merged["compression"]]]
+    return params
+
+def prepare_for_format(image, extension):
+    """Converte a profundidade da imagem quando o formato de destino não a suporta"""
+    depths = FORMAT_DEPTHS.get(extension, (np.uint8,))
+    if image.dtype in depths:
+        return image
+    # Preferir 16 bits quando o formato aceita, senão 8 bits
+    target = np.uint16 if np.uint16 in depths else np.uint8
+    return convert_depth(image, target)
+
+def resize_to_fit(image, max_size):
+    """Reduz a imagem para que o maior lado tenha no máximo max_size pixels"""
+    if not max_size:
+        return image
+    height, width = image.shape[:2]
+    ratio = max_size / max(height, width)
+    if ratio >= 1.0:
+        return image
+    size = (max(1, int(round(width * ratio))), max(1, int(round(height * ratio))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+def encode_image(image, extension, options=None, max_size=None):
+    """
+    Codifica a imagem em memória no formato da extensão (ex.: '.png')
+    Retorna o array uint8 com os bytes do arquivo
+    """
+    image = prepare_for_format(resize_to_fit(image, max_size), extension)
+    ok, encoded = cv2.imencode(extension, image, build_encoder_params(extension, options))
+    if not ok:
+        raise IOError(f"Não foi possível codificar a imagem como {extension}")
+    return encoded
+
+def write_image(image, path, options=None, max_size=None):
+    """
+    Codifica e grava a imagem de forma atômica: escreve em um arquivo temporário
+    no mesmo diretório e o renomeia para o destino final
+    Retorna o caminho gravado
+    """
+    extension = get_extension(path)
+    encoded = encode_image(image, extension, options, max_size)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".pdi_", suffix=extension + ".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(encoded.tobytes())
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+            match_file_mode(temp_file.fileno(), path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+class ImageWriter:
+    """Grava imagens em segundo plano, em vários formatos/tamanhos em paralelo"""
+
+    def __init__(self, max_workers=None):
+        # A codificação do OpenCV libera o GIL, então threads usam vários núcleos
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1))
+
+    def save_async(self, image, path, options=None, max_size=None):
+        """
+        Agenda a gravação de uma imagem e retorna um Future com o caminho gravado.
+        O Model substitui self.image a cada operação (não altera o array no lugar),
+        então o array recebido aqui não muda durante a gravação
+        """
+        return self.executor.submit(write_image, image, path, options, max_size)
+
+    def save_many_async(self, image, targets):
+        """
+        Agenda várias gravações da mesma imagem em paralelo
+        targets: lista de dicionários com 'path' e, opcionalmente, 'options' e 'max_size'
+        Retorna a lista de Futures
+        """
+        return [
+            self.save_async(image, target["path"], target.get("options"), target.get("max_size"))
+            for target in targets
+        ]
+
+    def shutdown(self, wait=True):
+        """Finaliza o pool, aguardando as gravações pendentes"""
+        self.executor.shutdown(wait=wait)
@@ -1,88 +1,609 @@
+import functools
+import weakref
 import cv2
 from PIL import Image, ImageTk
 import numpy as np
+from models.binary_image import BinaryImage
+from models.component_model import find_components
+from models.threshold_model import ThresholdModel
+from models.filter_model import FilterModel
+from models import geometry_model
+from models.histogram_model import HistogramModel
+from models.histogram_engine import DEFAULT_JOINT, color_histograms
+from models.image_writer import write_image
+from models.quality_metrics import QualityMetrics
+from models.roi import Roi
+from models.session_file import read_session, write_session
+from models.pipeline import (
+    PointPipeline, apply_lut, is_point_operation, merge_reports, multithreshold_lut, threshold_lut
+)
+from models.shared_pool import get_default_pool
+from models.utils import (
+    compute_histogram, convert_depth, default_histogram_bins, display_window, dtype_max,
+    make_display_proxy, normalize_loaded_image, to_display_8bit, to_gray
+)
+
+# Operações não pontuais que o Model registra no histórico (op_log) e que apply_steps
+# reexecuta pelo nome do método; as pontuais são as de pipeline.EAGER_PASSES
+RECORDED_OPERATIONS = (
+    "reset_image", "apply_in_roi", "equalize_histogram", "apply_adaptive_threshold", "apply_filter",
+    "apply_morphology", "crop_image", "flip_image", "rotate_image", "resize_image",
+    "convert_to_rgb", "convert_to_rgba", "convert_to_hsv", "convert_to_cmyk", "convert_to_lab",
+)
+
+class _ExportedImage:
+    """
+    Dono dos arrays entregues por Model.export_image: o array e qualquer view dele têm este
+    objeto como base, então um weakref para ele indica se alguém ainda guarda a imagem
+    """
+
+    def __init__(self, image):
+        self.image = image
+        interface = dict(image.__array_interface__)
+        # Somente leitura: quem recebe a imagem não altera o estado do Model
+        interface["data"] = (interface["data"][0], True)
+        self.__array_interface__ = interface
+
+def roi_operation(method):
+    """
+    Faz uma operação respeitar a ROI do Model (self.roi): a operação roda sobre uma view
+    do retângulo (sem copiar a imagem inteira) e o resultado é colado de volta, só nos
+    pixels da máscara quando a ROI é um polígono. Fora de uma ROI, a operação roda normalmente
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.roi is None or self._roi_active or self.image is None:
+            before = self.image
+            result = method(self, *args, **kwargs)
+            if not self._roi_active and self.image is not before and self._is_private(self.image):
+                self._private_image = weakref.ref(self.image)
+            return result
+        return self._run_in_roi(method, args, kwargs)
+    return wrapper
 
 class Model:
     def __init__(self):
         self.image = None
         self.original = None
         self.equalized_image = None  # Armazenar imagem equalizada
+        self.threshold_model = ThresholdModel()
+        self.histogram_model = HistogramModel()
+        self.filter_model = FilterModel()
+        # Número de bins dos histogramas (None = um por nível: 256 em 8 bits, 65.536 em 16 bits)
+        self.histogram_bins = None
+        # Tamanho máximo do proxy de exibição de imagens com mais de 8 bits
+        self.display_proxy_size = (1200, 1200)
+        # Janela (min, max) do mapeamento 16→8 bits; None = automática por percentis
+        self.display_window = None
+        # Pool de processos com memória compartilhada (None = pool padrão) e tamanho
+        # mínimo de imagem a partir do qual ele é usado
+        self.process_pool = None
+        self.parallel_min_pixels = 8_000_000
+        # Histórico das operações aplicadas desde a original: lista de (nome, parâmetros).
+        # Operações pontuais usam os nomes de pipeline.EAGER_PASSES; as demais, o nome do método
+        self.op_log = []
+        self._recording = True
+        # Limiares encontrados pela última limiarização automática (Otsu multinível)
+        self.last_thresholds = None
+        # MSE/PSNR/SSIM entre original e imagem atual, guardados por versão das imagens
+        self.quality_metrics = QualityMetrics()
+        # Reduções da original usadas nas prévias interativas (por escala)
+        self._preview_original = None
+        self._preview_sources = {}
+        # Redução em tons de cinza usada pelo slider de limiar: (weakref da imagem, tamanho, cinza,
+        # valores, redução colorida)
+        self._threshold_source = None
+        # Região de interesse (models/roi.py); None = imagem inteira
+        self.roi = None
+        # Durante uma operação na ROI: self.image é a view do retângulo e _roi_mask a máscara
+        self._roi_active = False
+        self._roi_mask = None
+        # Imagem atual criada pelo próprio Model e ainda não entregue a ninguém (weakref):
+        # só ela pode receber o resultado de uma ROI no lugar, sem copiar a imagem inteira
+        self._private_image = None
+        # Exportações vivas da imagem (export_image): enquanto existirem, a ROI copia
+        self._exports = weakref.WeakSet()
+        # Imagem atual conhecida como binária (limiarização/morfologia): (weakref, BinaryImage
+        # ou None se ainda não empacotada). O empacotamento é feito sob demanda
+        self._binary = None
+        # Imagem atual trocada pela forma empacotada (pack_image): (BinaryImage, dtype)
+        self.packed_image = None
+        # Última análise de componentes conectados (ComponentTable) e a imagem analisada (weakref)
+        self.components = None
+        self._components_source = None
+
+    @property
+    def image(self):
+        """Imagem atual (BGR); a forma empacotada (packed_image) é reconstruída no primeiro acesso"""
+        if self._image is None and self.packed_image is not None:
+            self.unpack_image()
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        self._image = value
+
+    def load_image(self, path, keep_depth=True):
+        """
+        Carrega uma imagem do disco
+        keep_depth: se True, usa IMREAD_UNCHANGED e preserva 16 bits/float (TIFFs de scanner e microscopia)
+        Retorna o array BGR carregado (como todas as operações, que retornam self.image)
+        """
+        flags = cv2.IMREAD_UNCHANGED if keep_depth else cv2.IMREAD_COLOR
+        image = normalize_loaded_image(cv2.imread(path, flags))
+        if image is None:
+            raise ValueError(f"Não foi possível ler a imagem: {path}")
+        return self.set_original(image)
 
-    def load_image(self, path):
-        self.image = cv2.imread(path)
-        self.original = self.image.copy()
+    def set_original(self, image):
+        """
+        Usa o array como nova original (a imagem atual parte de uma cópia e o histórico recomeça)
+        Retorna a imagem atual
+        """
+        self._reset_image_state()
+        self.image = image
+        self.original = image.copy()
         self.equalized_image = None  # Reset equalized image
-        return self.to_pil_image(self.image)
+        self.op_log = []
+        return self.image
 
-    def save_image(self, path):
+    def _reset_image_state(self):
+        """Descarta o estado ligado à imagem anterior: ROI, componentes, forma binária/empacotada"""
+        self.roi = None
+        self.components = None
+        self._components_source = None
+        self._private_image = None
+        self._binary = None
+        self.packed_image = None
+
+    def save_image(self, path, options=None):
+        """
+        Grava a imagem atual (de forma síncrona e atômica)
+        options: opções do codificador do formato (ver image_writer.DEFAULT_OPTIONS)
+        """
         if self.image is not None:
-            cv2.imwrite(path, self.image)
+            write_image(self.image, path, options)
 
+    def save_session(self, path):
+        """
+        Grava a sessão (original, imagem atual, equalizada, histogramas e histórico) em um
+        arquivo sem compressão que reabre mapeado em memória (ver session_file)
+        Uma imagem atual binária é gravada empacotada (1 bit por pixel)
+        """
+        if self._image is None and self.packed_image is None:
+            return None
+        packed = dtype = None
+        if self.packed_image is not None:
+            # Ainda empacotada (sessão binária reaberta, documento inativo): grava os bits direto
+            packed, dtype = self.packed_image
+        elif self.is_binary() and self.image is not self.original:
+            packed, dtype = self.binary_image(), self.image.dtype
+        arrays = {
+            "original": self.original,
+            "image": self.image if packed is None else None,
+            "image_packed": packed.packed if packed is not None else None,
+            "equalized_image": self.equalized_image,
+            "original_histogram": self.histogram_model.original_histogram,
+            "equalized_histogram": self.histogram_model.equalized_histogram,
+        }
+        metadata = {
+            "op_log": [[name, params] for name, params in self.op_log],
+            "histogram_bins": self.histogram_bins,
+            "display_window": self.display_window,
+        }
+        if packed is not None:
+            metadata["image_packed"] = {"width": packed.width, "dtype": np.dtype(dtype).str}
+        return write_session(path, arrays, metadata)
+
+    def load_session(self, path):
+        """
+        Reabre uma sessão gravada por save_session. Os buffers são np.memmap (cópia na
+        escrita): nada é decodificado e as páginas só são lidas quando usadas. Uma imagem
+        atual binária fica empacotada (packed_image) até o primeiro acesso a self.image
+        """
+        arrays, metadata = read_session(path)
+        self._reset_image_state()
+        self.original = arrays.get("original")
+        self.image = arrays.get("image")
+        if "image_packed" in arrays:
+            # Imagem binária: os bits continuam mapeados e o BGR só é reconstruído quando usado
+            info = metadata["image_packed"]
+            self.packed_image = (BinaryImage(arrays["image_packed"], info["width"]), np.dtype(info["dtype"]))
+        self.equalized_image = arrays.get("equalized_image")
+        self.histogram_model.original_histogram = arrays.get("original_histogram")
+        self.histogram_model.equalized_histogram = arrays.get("equalized_histogram")
+        self.op_log = [(name, params) for name, params in metadata.get("op_log", [])]
+        self.histogram_bins = metadata.get("histogram_bins")
+        window = metadata.get("display_window")
+        self.display_window = tuple(window) if window is not None else None
+
+    def _use_process_pool(self):
+        """Indica se a imagem atual é grande o suficiente para usar o pool de processos"""
+        if self.image is None or self.image.shape[0] * self.image.shape[1] < self.parallel_min_pixels:
+            return False
+        # Com um único núcleo o pool só acrescentaria custo
+        return self._get_process_pool().max_workers > 1
+
+    def _get_process_pool(self):
+        return self.process_pool or get_default_pool()
+
+    def get_max_value(self):
+        """Valor máximo de intensidade da imagem atual (255, 65535 ou 1.0)"""
+        if self.image is None:
+            return 255.0
+        return dtype_max(self.image.dtype)
+
+    def get_histogram_bins(self, image=None):
+        """Número de bins usado nos histogramas da imagem"""
+        if self.histogram_bins is not None:
+            return self.histogram_bins
+        image = self.original if image is None else image
+        if image is None:
+            return 256
+        return default_histogram_bins(image.dtype)
+
+    @roi_operation
     def reset_image(self):
         if self.original is not None:
             self.image = self.original.copy()
             self.equalized_image = None  # Reset equalized image
-            return self.to_pil_image(self.image)
+            self.op_log = []
+            if self._roi_active:
+                # Na ROI a volta à original é uma operação da região
+                self._record("reset_image")
+            return self.image
+
+    def _record(self, name, **params):
+        """Registra uma operação no histórico (desligado durante a reexecução)"""
+        if self._recording:
+            self.op_log.append((name, params))
+
+    # ========== Região de interesse ==========
+    def set_roi(self, roi):
+        """
+        Define a ROI das operações seguintes (Roi, parâmetros de Roi.to_params ou None)
+        Histogramas das operações (equalização, Otsu) passam a contar só os pixels da ROI
+        """
+        if roi is not None and not isinstance(roi, Roi):
+            roi = Roi.from_params(roi)
+        self.roi = roi
+        return roi
+
+    def clear_roi(self):
+        self.roi = None
+
+    def share_image(self):
+        """
+        Retorna a imagem atual para uso fora do Model (gravação em outra thread, Session...)
+        A partir daí, uma operação na ROI copia a imagem em vez de alterá-la no lugar
+        """
+        self._private_image = None
+        return self.image
+
+    def export_image(self):
+        """
+        View somente leitura da imagem atual para uso fora do Model (Session). Diferente de
+        share_image, a imagem só deixa de receber ROIs no lugar enquanto o array entregue
+        (ou algo derivado dele) existir
+        """
+        exported = _ExportedImage(self.image)
+        self._exports.add(exported)
+        return np.asarray(exported)
+
+    def _is_exported(self, image):
+        return any(exported.image is image for exported in self._exports)
+
+    def _is_private(self, image):
+        """Array novo, gravável e não compartilhado com a original/equalizada"""
+        return (type(image) is np.ndarray and image.base is None and image.flags.writeable
+                and image is not self.original and image is not self.equalized_image)
+
+    def _writable_image(self):
+        """
+        Imagem que recebe o resultado de uma ROI: a memória da atual, se privada, ou uma cópia
+        É sempre um objeto novo, para que os caches por identidade (métricas, prévias) sejam refeitos
+        """
+        if self._private_image is not None and self._private_image() is self.image \
+                and not self._is_exported(self.image):
+            return self.image.view()
+        return np.array(self.image, copy=True)
+
+    def _run_in_roi(self, method, args, kwargs):
+        """
+        Executa a operação na view da ROI e cola o resultado na imagem inteira
+        O histórico recebe uma única entrada ('apply_in_roi', {'roi', 'steps'})
+        """
+        full, original = self.image, self.original
+        roi = self.roi.clip(full.shape)
+        if roi is None:
+            raise ValueError("A ROI está fora da imagem")
+        saved_log, saved_equalized = self.op_log, self.equalized_image
+        self.image = roi.view(full)
+        same_size = original is not None and original.shape[:2] == full.shape[:2]
+        self.original = roi.view(original) if same_size else None
+        self.op_log = []
+        self._roi_active = True
+        self._roi_mask = roi.mask()
+        try:
+            result = method(self, *args, **kwargs)
+            region, steps = self.image, self.op_log
+            equalized = self.equalized_image is not saved_equalized
+        finally:
+            self.image, self.original, self.op_log = full, original, saved_log
+            self.equalized_image = saved_equalized
+            self._roi_active = False
+            self._roi_mask = None
+
+        target = self._writable_image()
+        # O resultado da região volta para a profundidade da imagem inteira
+        # (ex.: limiar de uma ROI em 16 bits fica 0/65535)
+        region = convert_depth(region, target.dtype)
+        destination = roi.view(target)
+        mask = roi.mask()
+        if mask is None:
+            destination[...] = region
+        else:
+            np.copyto(destination, region, where=mask[:, :, None])
+        self.image = target
+        self._private_image = weakref.ref(target)
+        if equalized:
+            # A equalizada passa a ser a imagem inteira com a ROI equalizada
+            self.equalized_image = target
+            self._private_image = None
+        if steps and self._recording:
+            params = {"roi": roi.to_params(), "steps": steps}
+            previous = self.op_log[-1] if self.op_log else None
+            if steps[0][0] == "reset_image" and previous is not None \
+                    and previous[0] == "apply_in_roi" and previous[1]["roi"] == params["roi"]:
+                # A mesma região volta à original: a entrada anterior nela deixa de valer
+                # (evita acumular uma entrada por movimento do slider de brilho/contraste)
+                self.op_log.pop()
+            self._record("apply_in_roi", **params)
+
+        if isinstance(result, tuple):
+            return (self.image,) + result[1:]
+        return self.image if result is not None else None
+
+    def apply_in_roi(self, roi, steps):
+        """
+        Aplica operações no formato do histórico dentro de uma ROI (Roi ou parâmetros de
+        Roi.to_params). É a forma como operações feitas na ROI são registradas e reexecutadas
+        Retorna a imagem BGR
+        """
+        saved = self.roi
+        self.set_roi(roi)
+        try:
+            return self.apply_steps(steps)[0]
+        finally:
+            self.roi = saved
+
+    def _statistics_histogram(self, gray, bins=None):
+        """Histograma usado por operações automáticas: só os pixels da máscara dentro de uma ROI"""
+        if self._roi_mask is None:
+            return compute_histogram(gray, bins)
+        return compute_histogram(gray[self._roi_mask][None, :], bins)
+
+    # ========== Pipeline de operações pontuais ==========
+    @roi_operation
+    def apply_point_pipeline(self, pipeline):
+        """
+        Aplica um PointPipeline na imagem atual (8 ou 16 bits) em uma única passada de LUT
+        Retorna (imagem BGR, relatório com as passadas economizadas)
+        """
+        if self.image is None:
+            return None, None
+        self.image, report = pipeline.run(self.image, self._roi_mask)
+        for name, params in pipeline.operations:
+            self._record(name, **params)
+        return self.image, report
+
+    @roi_operation
+    def apply_steps(self, steps):
+        """
+        Aplica uma lista de operações no formato do histórico (nome, parâmetros) à imagem
+        atual, fundindo cada sequência de operações pontuais consecutivas em uma única LUT
+        (as demais operações rodam normalmente). As operações entram no histórico
+        Retorna (imagem BGR, relatório somado dos pipelines)
+        """
+        if self.image is None:
+            return None, None
+        steps = list(steps)
+        reports = []
+        pending = PointPipeline()
+        recording, self._recording = self._recording, False
+        try:
+            for name, params in steps:
+                if is_point_operation(name):
+                    pending.add(name, **params)
+                    continue
+                if pending.operations:
+                    reports.append(self._run_point_steps(pending))
+                    pending = PointPipeline()
+                getattr(self, name)(**params)
+            if pending.operations:
+                reports.append(self._run_point_steps(pending))
+        finally:
+            self._recording = recording
+        if recording:
+            self.op_log.extend(steps)
+        return self.image, merge_reports(reports)
+
+    def replay_fused(self):
+        """
+        Reexecuta o histórico a partir da original com apply_steps (as operações feitas
+        em ROIs já guardam a própria região, então a ROI atual não é usada)
+        Retorna (imagem BGR, relatório somado dos pipelines)
+        """
+        if self.original is None:
+            return None, None
+        history = list(self.op_log)
+        roi, self.roi = self.roi, None
+        # Histórico que começa recortando: o recorte é uma view da original, sem copiar a imagem inteira
+        starts_with_crop = history and history[0][0] == "crop_image"
+        # Estado da imagem atual, restaurado se a reexecução falhar no meio
+        saved = (self.image, self.equalized_image, self._binary, self.packed_image, self._private_image)
+        self.image = self.original if starts_with_crop else self.original.copy()
+        self.op_log = []
+        try:
+            return self.apply_steps(history)
+        except BaseException:
+            self.image, self.equalized_image, self._binary, self.packed_image, self._private_image = saved
+            self.op_log = history
+            raise
+        finally:
+            self.roi = roi
+
+    def _run_point_steps(self, pipeline):
+        """
+        Executa as operações pontuais pendentes de apply_steps: em uma LUT (8 ou 16 bits) ou,
+        em imagens float (sem LUT possível), uma a uma pelos métodos do Model
+        Retorna o relatório do pipeline
+        """
+        if self.image.dtype in (np.uint8, np.uint16):
+            self.image, report = pipeline.run(self.image, self._roi_mask)
+            return report
+        for name, params in pipeline.operations:
+            self._apply_point_operation(name, params)
+        eager = pipeline.eager_passes()
+        return {"operations": len(pipeline.operations), "eager_passes": eager, "fused_passes": eager,
+                "saved": 0, "stages": [f"{len(pipeline.operations)} operações sem LUT (float)"]}
+
+    def _apply_point_operation(self, name, params):
+        """Executa uma operação pontual do histórico pelo método do Model correspondente"""
+        if name == "gray":
+            self.convert_to_gray()
+        elif name == "brightness_contrast":
+            self.image = cv2.addWeighted(self.image, params["alpha"], self.image, 0, params["beta"])
+        elif name == "threshold":
+            self.apply_global_threshold(params["threshold"])
+        elif name == "multithreshold":
+            self._apply_levels(params["levels"], params["thresholds"])
+        elif name == "equalize":
+            self.equalize_histogram()
+        elif name == "otsu":
+            self.apply_otsu_threshold()
+        else:
+            raise ValueError(f"A operação '{name}' só se aplica a imagens de 8 ou 16 bits")
 
     # ========== Operações de PDI ==========
+    @roi_operation
     def convert_to_gray(self):
         if self.image is None:
             return None
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        gray = to_gray(self.image)
         self.image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-        return self.to_pil_image(self.image)
+        self._record("gray")
+        return self.image
 
-    def equalize_histogram(self):
+    @roi_operation
+    def equalize_histogram(self, method="global", color_space=None, clip_limit=2.0, tile_grid=(8, 8)):
+        """
+        Equaliza o histograma da imagem
+        method: 'global' ou 'clahe' (adaptativa por blocos)
+        color_space: None (tons de cinza), 'ycrcb' ou 'lab' (equaliza só a luminância, mantendo a cor)
+        clip_limit / tile_grid: parâmetros do CLAHE
+        """
         if self.image is None:
             return None
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-        equalized = cv2.equalizeHist(gray)
-        self.image = cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR)
+        self.image = self.histogram_model.equalize(
+            self.image, method=method, color_space=color_space, clip_limit=clip_limit, tile_grid=tile_grid,
+            mask=self._roi_mask
+        )
         self.equalized_image = self.image.copy()  # Salvar imagem equalizada
-        return self.to_pil_image(self.image)
+        if method == "global" and color_space is None:
+            self._record("equalize")
+        else:
+            self._record("equalize_histogram", method=method, color_space=color_space,
+                         clip_limit=clip_limit, tile_grid=tile_grid)
+        return self.image
 
     # ========== Operações de Limiarização ==========
+    @roi_operation
     def apply_global_threshold(self, threshold_value=127):
         """
         Aplica limiarização global com valor fixo ou ajustável
-        threshold_value: valor do limiar (0-255)
+        threshold_value: valor do limiar (0-255 em 8 bits, 0-65535 em 16 bits, 0-1 em float)
         """
         if self.image is None:
             return None
         
-        # Validar e converter valor do limiar
-        try:
-            threshold_value = int(float(threshold_value))
-            threshold_value = max(0, min(255, threshold_value))  # Garantir que está entre 0 e 255
-        except (ValueError, TypeError):
-            threshold_value = 127  # Valor padrão se houver erro
+        threshold_value = self._normalize_threshold(threshold_value)
         
         # Converter para escala de cinza
-        # A imagem geralmente vem em BGR (3 canais)
-        if len(self.image.shape) == 3 and self.image.shape[2] == 3:
-            # Imagem colorida BGR
-            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-        elif len(self.image.shape) == 3 and self.image.shape[2] == 1:
-            # Imagem já em escala de cinza mas com 1 canal extra
-            gray = self.image[:, :, 0]
-        elif len(self.image.shape) == 2:
-            # Imagem já em escala de cinza
-            gray = self.image.copy()
-        else:
-            # Formato não suportado, tentar converter para BGR primeiro
-            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        gray = to_gray(self.image)
         
-        # Aplicar limiarização
-        _, thresholded = cv2.threshold(gray.astype(np.uint8), threshold_value, 255, cv2.THRESH_BINARY)
+        # Aplicar limiarização (resultado binário em 8 bits)
+        binary = np.where(gray > threshold_value, 255, 0).astype(np.uint8)
         
         # Converter de volta para BGR (3 canais) para manter consistência
-        if len(thresholded.shape) == 2:
-            self.image = cv2.cvtColor(thresholded, cv2.COLOR_GRAY2BGR)
-        else:
-            self.image = thresholded
+        self.image = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+        self._mark_binary()
+        self._record("threshold", threshold=threshold_value)
         
-        return self.to_pil_image(self.image)
+        return self.image
+
+    def _normalize_threshold(self, threshold_value):
+        """Valida o limiar e o limita à faixa do tipo da imagem atual"""
+        max_value = self.get_max_value()
+        try:
+            threshold_value = float(threshold_value)
+            if np.issubdtype(self.image.dtype, np.integer):
+                threshold_value = int(threshold_value)
+            threshold_value = max(0, min(max_value, threshold_value))  # Garantir que está na faixa do tipo
+        except (ValueError, TypeError):
+            threshold_value = max_value / 2  # Valor padrão se houver erro
+        return threshold_value
+
+    def get_threshold_preview_source(self, max_width, max_height):
+        """
+        Tons de cinza da imagem atual reduzidos ao tamanho de exibição, para a prévia do
+        slider de limiar. Guardados até a imagem atual (ou o tamanho) mudar
+        """
+        if self.image is None:
+            return None
+        key = (max_width, max_height)
+        if self._threshold_source is None or self._threshold_source[0]() is not self.image \
+                or self._threshold_source[1] != key:
+            proxy = make_display_proxy(self.image, max_width, max_height)
+            if proxy is self.image:
+                # Já cabe na tela: copia (é pequena) para o cache não segurar a imagem
+                # (nem a original inteira, quando a atual é uma view de recorte)
+                proxy = proxy.copy()
+            gray = to_gray(proxy)
+            # Valores de entrada das LUTs binárias (tipos inteiros)
+            values = np.arange(int(dtype_max(gray.dtype)) + 1) if gray.dtype in (np.uint8, np.uint16) else None
+            self._threshold_source = (weakref.ref(self.image), key, gray, values, proxy)
+        return self._threshold_source[2]
+
+    def preview_global_threshold(self, threshold_value, max_width, max_height):
+        """
+        Prévia da limiarização global no tamanho de exibição; não altera a imagem atual
+        Em 8/16 bits é uma LUT binária aplicada à redução em tons de cinza
+        Com uma ROI, só a região é limiarizada e o restante mostra a imagem atual
+        Retorna a prévia BGR (uint8, 0 ou 255; na profundidade da imagem com ROI)
+        """
+        gray = self.get_threshold_preview_source(max_width, max_height)
+        if gray is None:
+            return None
+        threshold_value = self._normalize_threshold(threshold_value)
+        values = self._threshold_source[3]
+        if values is not None:
+            binary = apply_lut(gray, threshold_lut(values, threshold_value))
+        else:
+            binary = np.where(gray > threshold_value, 255, 0).astype(np.uint8)
+        preview = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+        if self.roi is not None:
+            proxy = self._threshold_source[4]
+            scale = np.array([proxy.shape[1] / self.image.shape[1], proxy.shape[0] / self.image.shape[0]])
+            outline = np.round((np.asarray(self.roi.outline(), dtype=np.float64) + 0.5) * scale - 0.5)
+            inside = np.zeros(proxy.shape[:2], dtype=np.uint8)
+            cv2.fillPoly(inside, [outline.astype(np.int32)], 1)
+            composed = proxy.copy()
+            np.copyto(composed, convert_depth(preview, proxy.dtype), where=inside.astype(bool)[:, :, None])
+            return composed
+        return preview
 
+    @roi_operation
     def apply_multithreshold(self, num_tones):
         """
         Aplica limiarização multissegmentada
@@ -90,30 +611,86 @@ class Model:
         """
         if self.image is None:
             return None
-        # Converter para escala de cinza
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        max_value = self.get_max_value()
+        is_integer = np.issubdtype(self.image.dtype, np.integer)
         
-        # Calcular os valores de nível (dividir o range 0-255 em num_tones níveis)
-        step = 255.0 / (num_tones - 1) if num_tones > 1 else 255.0
-        levels = [int(i * step) for i in range(num_tones)]
+        # Calcular os valores de nível (dividir a faixa do tipo em num_tones níveis)
+        step = max_value / (num_tones - 1) if num_tones > 1 else max_value
+        if is_integer:
+            levels = [int(i * step) for i in range(num_tones)]
+        else:
+            levels = [i * step for i in range(num_tones)]
+
+        # Calcular limiares (meio do caminho entre níveis adjacentes)
+        thresholds = []
+        for i in range(num_tones - 1):
+            thresholds.append((levels[i] + levels[i+1]) // 2 if is_integer else (levels[i] + levels[i+1]) / 2)
+
+        return self._apply_levels(levels, thresholds)
+
+    @roi_operation
+    def apply_multi_otsu(self, num_thresholds=2):
+        """
+        Limiarização multinível de Otsu: os limiares são buscados no histograma de 256 bins
+        (ver ThresholdModel.multi_otsu_thresholds) e aplicados em 8/16 bits em uma única passada
+        de LUT sobre os tons de cinza já calculados, em qualquer tamanho de imagem
+        num_thresholds: número de limiares (2 a 5); a saída tem num_thresholds + 1 tons
+        """
+        if self.image is None:
+            return None
+        gray = to_gray(self.image)
+        max_value = self.get_max_value()
+        bins = 256
+        indices = self.threshold_model.multi_otsu_thresholds(self._statistics_histogram(gray, bins), num_thresholds)
+
+        # Limiar = primeiro valor do bin seguinte (valores >= limiar vão para a classe de cima)
+        if np.issubdtype(gray.dtype, np.integer):
+            levels_count = int(max_value) + 1
+            self.last_thresholds = [(index + 1) * levels_count // bins for index in indices]
+            step = max_value / num_thresholds
+            levels = [int(round(i * step)) for i in range(num_thresholds + 1)]
+        else:
+            self.last_thresholds = [(index + 1) * max_value / bins for index in indices]
+            levels = [i * max_value / num_thresholds for i in range(num_thresholds + 1)]
+        return self._apply_levels(levels, self.last_thresholds, gray)
+
+    def _apply_levels(self, levels, thresholds, gray=None):
+        """
+        Atribui a cada pixel o nível do seu intervalo (limiares crescentes; valores iguais ao
+        limiar vão para o intervalo de cima) e registra a operação como 'multithreshold'
+        gray: tons de cinza da imagem atual, se já calculados
+        """
+        max_value = self.get_max_value()
+        is_integer = np.issubdtype(self.image.dtype, np.integer)
+
+        if is_integer:
+            # 8/16 bits: uma única LUT com o nível de cada intensidade (mais rápida que o pool)
+            if gray is None:
+                gray = to_gray(self.image)
+            values = np.arange(int(max_value) + 1)
+            result = apply_lut(gray, multithreshold_lut(values, levels, thresholds, gray.dtype))
+            self.image = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+            self._record("multithreshold", levels=levels, thresholds=thresholds)
+            return self.image
+
+        # Imagens float grandes: faixas processadas no pool de processos, em memória compartilhada
+        if self._use_process_pool():
+            self.image = self._get_process_pool().run(
+                "multithreshold", self.image, params={"levels": levels, "thresholds": thresholds}
+            )
+            self._record("multithreshold", levels=levels, thresholds=thresholds)
+            return self.image
+
+        # Converter para escala de cinza
+        if gray is None:
+            gray = to_gray(self.image)
         
         # Criar imagem resultado
         result = np.zeros_like(gray)
         
-        # Calcular limiares (meio do caminho entre níveis adjacentes)
-        if num_tones == 1:
+        if not thresholds:
             result.fill(levels[0])
-        elif num_tones == 2:
-            # Apenas um limiar no meio
-            threshold = 127
-            result[gray < threshold] = levels[0]
-            result[gray >= threshold] = levels[1]
         else:
-            # Múltiplos limiares
-            thresholds = []
-            for i in range(num_tones - 1):
-                thresholds.append((levels[i] + levels[i+1]) // 2)
-            
             # Aplicar limiarização por segmento
             result[gray < thresholds[0]] = levels[0]
             for i in range(len(thresholds) - 1):
@@ -123,8 +700,10 @@ class Model:
         
         # Converter de volta para BGR
         self.image = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        return self.to_pil_image(self.image)
+        self._record("multithreshold", levels=levels, thresholds=thresholds)
+        return self.image
 
+    @roi_operation
     def apply_otsu_threshold(self):
         """
         Aplica o método de Otsu para determinar automaticamente o melhor valor de limiar
@@ -132,36 +711,319 @@ class Model:
         if self.image is None:
             return None
         # Converter para escala de cinza
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        gray = to_gray(self.image)
         # Aplicar método de Otsu
-        _, thresholded = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if gray.dtype == np.uint8 and self._roi_mask is None:
+            _, thresholded = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        else:
+            # 16 bits/float (ou ROI poligonal): limiar buscado no histograma com os bins configurados
+            bins = self.get_histogram_bins(gray)
+            hist = self._statistics_histogram(gray, bins)
+            index = self.threshold_model.otsu_threshold(hist)
+            threshold = (index + 1) * self.get_max_value() / bins
+            thresholded = np.where(gray >= threshold, 255, 0).astype(np.uint8)
         # Converter de volta para BGR
         self.image = cv2.cvtColor(thresholded, cv2.COLOR_GRAY2BGR)
-        return self.to_pil_image(self.image)
+        self._mark_binary()
+        self._record("otsu")
+        return self.image
+
+    @roi_operation
+    def apply_adaptive_threshold(self, method="sauvola", window_size=25, k=None):
+        """
+        Aplica limiarização adaptativa (local), indicada para iluminação irregular
+        method: 'mean', 'niblack' ou 'sauvola'
+        window_size: lado da janela local em pixels (ímpar)
+        k: fator de sensibilidade (usa o padrão do método se None)
+        """
+        if self.image is None:
+            return None
+        # Converter para escala de cinza
+        gray = to_gray(self.image)
+        # Limiar local calculado a partir de imagens integrais
+        thresholded = self.threshold_model.adaptive_threshold(gray, method=method, window_size=window_size, k=k)
+        # Converter de volta para BGR
+        self.image = cv2.cvtColor(thresholded, cv2.COLOR_GRAY2BGR)
+        self._mark_binary()
+        self._record("apply_adaptive_threshold", method=method, window_size=window_size, k=k)
+        return self.image
+
+    # ========== Filtros espaciais ==========
+    @roi_operation
+    def apply_filter(self, method="gaussian", **params):
+        """
+        Aplica um filtro espacial (ver FilterModel.METHODS)
+        method: 'gaussian', 'box', 'median', 'bilateral', 'unsharp', 'sobel', 'laplacian' ou 'custom'
+        params: parâmetros do filtro, ex.: sigma=2.0; kernel=[[...], ...] no 'custom'
+        """
+        if self.image is None:
+            return None
+        if "kernel" in params:
+            # O histórico (e o arquivo de sessão) guarda o kernel como listas
+            params["kernel"] = np.asarray(params["kernel"], dtype=np.float64).tolist()
+        self.image = self.filter_model.apply(self.image, method, **params)
+        self._record("apply_filter", method=method, **params)
+        return self.image
+
+    # ========== Operações geométricas ==========
+    def _geometric(self, name, result, params, keeps_binary=False):
+        """
+        Troca a imagem pelo resultado de uma operação geométrica. A ROI deixa de valer
+        (as coordenadas mudaram); recorte, espelhamento e rotações de 90° mantêm a imagem binária
+        """
+        binary = keeps_binary and self.is_binary()
+        self.image = result
+        self.roi = None
+        # Resultados novos (não o recorte, que é uma view) podem receber operações de ROI no lugar
+        self._private_image = weakref.ref(result) if self._is_private(result) else None
+        if binary:
+            self._mark_binary()
+        self._record(name, **params)
+        return self.image
+
+    def _require_whole_image(self):
+        if self._roi_active:
+            raise ValueError("Operações geométricas mudam o tamanho da imagem e não rodam dentro de uma ROI")
+
+    def crop_image(self, x, y, width, height):
+        """
+        Recorta a imagem atual. O recorte é uma view (sem cópia) até a próxima operação gerar
+        um array novo, e todas as operações seguintes processam só a região recortada: recortar
+        cedo reduz o trabalho de todo o resto do histórico
+        """
+        if self.image is None:
+            return None
+        self._require_whole_image()
+        view, (x, y, width, height) = geometry_model.crop(self.image, x, y, width, height)
+        return self._geometric("crop_image", view, {"x": x, "y": y, "width": width, "height": height},
+                               keeps_binary=True)
+
+    def crop_to_roi(self):
+        """Recorta a imagem atual no retângulo da ROI (a ROI é descartada)"""
+        if self.roi is None:
+            raise ValueError("Nenhuma ROI selecionada")
+        return self.crop_image(self.roi.x, self.roi.y, self.roi.width, self.roi.height)
+
+    def flip_image(self, axis="horizontal"):
+        """Espelhamento: 'horizontal', 'vertical' ou 'both'"""
+        if self.image is None:
+            return None
+        self._require_whole_image()
+        return self._geometric("flip_image", geometry_model.flip(self.image, axis), {"axis": axis},
+                               keeps_binary=True)
+
+    def rotate_image(self, angle=90, interpolation="linear", expand=True):
+        """
+        Rotação anti-horária em graus (negativo = horário). Múltiplos de 90° são exatos (cv2.rotate)
+        interpolation: uma das geometry_model.INTERPOLATIONS (ângulos arbitrários)
+        expand: aumenta a tela para caber a imagem inteira; False mantém o tamanho
+        """
+        if self.image is None:
+            return None
+        self._require_whole_image()
+        result = geometry_model.rotate(self.image, angle, interpolation, expand)
+        exact = float(angle) % 90 == 0
+        return self._geometric("rotate_image", result,
+                               {"angle": angle, "interpolation": interpolation, "expand": expand},
+                               keeps_binary=exact)
+
+    def resize_image(self, width=None, height=None, scale=None, interpolation=None):
+        """
+        Redimensiona para largura x altura, ou pela escala (um dos lados None mantém a proporção)
+        interpolation: uma das geometry_model.INTERPOLATIONS (None = 'area' para reduzir,
+        'cubic' para ampliar). Saídas grandes são geradas em faixas
+        """
+        if self.image is None:
+            return None
+        self._require_whole_image()
+        source_height, source_width = self.image.shape[:2]
+        if scale is not None:
+            width, height = source_width * scale, source_height * scale
+        elif width is None and height is None:
+            raise ValueError("Informe a largura, a altura ou a escala")
+        elif width is None:
+            width = source_width * height / source_height
+        elif height is None:
+            height = source_height * width / source_width
+        width, height = max(1, round(width)), max(1, round(height))
+        interpolation = interpolation or geometry_model.default_interpolation(self.image.shape, (width, height))
+        result = geometry_model.resize(self.image, width, height, interpolation)
+        return self._geometric("resize_image", result,
+                               {"width": width, "height": height, "interpolation": interpolation},
+                               keeps_binary=interpolation == "nearest")
+
+    # ========== Imagens binárias ==========
+    def _mark_binary(self):
+        """Marca a imagem atual como binária (0 e o máximo, canais iguais)"""
+        self._binary = (weakref.ref(self.image), None)
+
+    def is_binary(self):
+        """Indica se a imagem atual saiu de uma limiarização binária ou da morfologia"""
+        return self.image is not None and self._binary is not None and self._binary[0]() is self.image
+
+    def binary_image(self):
+        """
+        Imagem atual como BinaryImage (empacotada uma vez por versão da imagem)
+        Imagens que não são binárias são binarizadas na metade do valor máximo
+        """
+        if self.image is None:
+            return None
+        if self.is_binary():
+            binary = self._binary[1]
+            if binary is None:
+                # Os três canais são iguais: basta empacotar um
+                binary = BinaryImage.from_mask(self.image[:, :, 0])
+        else:
+            binary = BinaryImage.from_image(self.image)
+        self._binary = (weakref.ref(self.image), binary)
+        return binary
+
+    @roi_operation
+    def apply_morphology(self, operation="close", size=3, shape="rect"):
+        """
+        Morfologia binária sobre a imagem empacotada em bits (ver BinaryImage)
+        operation: 'erode', 'dilate', 'open', 'close' ou 'fill_holes'
+        size / shape: lado e forma do elemento estruturante ('rect', 'ellipse' ou 'cross')
+        """
+        if self.image is None:
+            return None
+        binary = self.binary_image().morphology(operation, size, shape)
+        self.image = binary.to_image(self.image.dtype)
+        self._binary = (weakref.ref(self.image), binary)
+        self._record("apply_morphology", operation=operation, size=size, shape=shape)
+        return self.image
+
+    def pack_image(self):
+        """
+        Troca a imagem atual, se binária, pela forma empacotada (1 bit por pixel em vez de
+        3 bytes). Usado nos documentos inativos; unpack_image desfaz
+        Retorna os bytes liberados
+        """
+        if self.packed_image is not None or not self.is_binary():
+            return 0
+        if self.image is self.original or self.image is self.equalized_image:
+            return 0
+        binary = self.binary_image()
+        freed = self.image.nbytes - binary.nbytes
+        self.packed_image = (binary, self.image.dtype)
+        self.image = None
+        self._private_image = None
+        return freed
+
+    def unpack_image(self):
+        """Reconstrói a imagem BGR trocada por pack_image"""
+        if self.packed_image is None:
+            return self._image
+        binary, dtype = self.packed_image
+        self._image = binary.to_image(dtype)
+        self.packed_image = None
+        self._binary = (weakref.ref(self._image), binary)
+        return self._image
 
-    def get_histograms(self):
-        """Retorna os histogramas das imagens original e equalizada"""
+    # ========== Componentes conectados ==========
+    def analyze_components(self, connectivity=8, min_area=1):
+        """
+        Conta os componentes conectados da imagem binária atual, com área, caixa envolvente e
+        centroide de cada um (ver component_model). Dentro de uma ROI só a região é analisada
+        Não altera a imagem. Retorna um ComponentTable, guardado em self.components
+        """
+        if self.image is None:
+            return None
+        if self.roi is None:
+            source, origin = self.binary_image(), (0, 0)
+        else:
+            roi = self.roi.clip(self.image.shape)
+            if roi is None:
+                raise ValueError("A ROI está fora da imagem")
+            region = roi.view(self.image)
+            if self.is_binary():
+                source = region[:, :, 0] > 0
+            else:
+                source = to_gray(region) > self.get_max_value() / 2
+            if roi.mask() is not None:
+                source &= roi.mask()
+            origin = (roi.x, roi.y)
+        self.components = find_components(source, connectivity, min_area, origin)
+        self._components_source = weakref.ref(self.image)
+        return self.components
+
+    def current_components(self):
+        """Última análise de componentes, se ainda for da imagem atual (None se não)"""
+        if self.components is None or self._components_source() is not self.image:
+            return None
+        return self.components
+
+    def get_quality_metrics(self):
+        """
+        MSE, PSNR e SSIM entre a original e a imagem atual
+        Retorna um dicionário com 'mse', 'psnr' e 'ssim' (ou None); repetir a chamada
+        sem novas operações não recalcula
+        """
+        return self.quality_metrics.compute(self.original, self.image)
+
+    def get_histograms(self, bins=None):
+        """
+        Retorna os histogramas das imagens original e equalizada
+        bins: número de bins (usa self.histogram_bins / padrão do tipo se None)
+        """
         if self.original is None:
             return None, None
+
+        if bins is None:
+            bins = self.get_histogram_bins()
             
         # Converter para escala de cinza
-        original_gray = cv2.cvtColor(self.original, cv2.COLOR_BGR2GRAY)
+        original_gray = to_gray(self.original)
         
         if self.equalized_image is not None:
-            equalized_gray = cv2.cvtColor(self.equalized_image, cv2.COLOR_BGR2GRAY)
+            equalized_gray = to_gray(self.equalized_image)
         else:
             # Se não há imagem equalizada, usar a imagem atual
             if self.image is not None:
-                equalized_gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+                equalized_gray = to_gray(self.image)
             else:
                 return None, None
         
         # Calcular histogramas
-        original_hist = cv2.calcHist([original_gray], [0], None, [256], [0, 256])
-        equalized_hist = cv2.calcHist([equalized_gray], [0], None, [256], [0, 256])
+        original_hist = compute_histogram(original_gray, bins)
+        equalized_hist = compute_histogram(equalized_gray, bins)
         
         return original_hist, equalized_hist
 
+    def get_channel_histograms(self, bins=256, max_samples=1_000_000):
+        """
+        Histogramas por canal (B, G, R) e de luminância da imagem atual, para o painel ao vivo
+        Imagens grandes são amostradas em uma grade regular com até max_samples pixels
+        Retorna um dicionário com 'b', 'g', 'r' e 'gray'
+        """
+        if self.image is None:
+            return None
+        height, width = self.image.shape[:2]
+        step = max(1, int(np.ceil(np.sqrt(height * width / max_samples))))
+        sample = self.image[::step, ::step]
+        hists = {
+            name: compute_histogram(np.ascontiguousarray(sample[:, :, index]), bins)
+            for index, name in enumerate(("b", "g", "r"))
+        }
+        hists["gray"] = compute_histogram(to_gray(np.ascontiguousarray(sample)), bins)
+        return hists
+
+    def get_color_histograms(self, color_space="hsv", bins=None, joint=None, joint_bins=(64, 64),
+                             max_samples=4_000_000):
+        """
+        Histogramas de todos os canais de um espaço de cor e histogramas 2D (uma passada)
+        joint: pares de canais (None = par padrão do espaço, ex.: H x S no HSV)
+        max_samples: limite de pixels amostrados em imagens grandes (None = todos)
+        Ver histogram_engine.color_histograms para o formato do resultado
+        """
+        if self.image is None:
+            return None
+        if joint is None:
+            joint = [DEFAULT_JOINT[color_space]] if color_space in DEFAULT_JOINT else []
+        return color_histograms(self.image, color_space, bins=bins, joint=joint,
+                                joint_bins=joint_bins, max_samples=max_samples)
+
+    @roi_operation
     def adjust_brightness_contrast(self, brightness=0, contrast=1.0, apply_to_current=False):
         """
         Ajusta o brilho e contraste da imagem
@@ -174,70 +1036,133 @@ class Model:
         
         if source_image is None:
             return None
-        
+
+        adjusted, beta = self._brightness_contrast(source_image, brightness, contrast)
+
+        # Tornar o ajuste persistente na imagem atual
+        self.image = adjusted
+        if source_image is self.original:
+            # O ajuste parte da original: as operações anteriores deixam de valer
+            self.op_log = []
+            if self._roi_active:
+                self._record("reset_image")
+        self._record("brightness_contrast", alpha=contrast, beta=beta)
+
+        return self.image
+
+    def _brightness_contrast(self, source_image, brightness, contrast):
+        """Aplica alpha * pixel + beta na imagem dada. Retorna (imagem ajustada, beta)"""
         # Converter brilho para o range correto (beta)
-        # brightness vai de -100 a 100, precisamos converter para -127 a 127
-        beta = int(brightness * 127 / 100)
+        # brightness vai de -100 a 100, precisamos converter para -127 a 127 (em 8 bits)
+        beta = brightness * 127 / 100 * dtype_max(source_image.dtype) / 255
         
         # Aplicar a fórmula: new_pixel = alpha * pixel + beta
         # onde alpha = contrast
-        adjusted = cv2.convertScaleAbs(source_image, alpha=contrast, beta=beta)
+        if source_image.dtype == np.uint8:
+            beta = int(beta)
+            return cv2.convertScaleAbs(source_image, alpha=contrast, beta=beta), beta
+        # addWeighted mantém a profundidade (satura em 16 bits)
+        return cv2.addWeighted(source_image, contrast, source_image, 0, beta), beta
 
-        # Tornar o ajuste persistente na imagem atual
-        self.image = adjusted
+    # ========== Prévias interativas ==========
+    def get_preview_source(self, scale):
+        """
+        Original reduzida (INTER_AREA) na escala dada, para prévias dos sliders.
+        As reduções ficam guardadas até a original mudar
+        """
+        if self.original is None:
+            return None
+        if scale >= 1.0:
+            return self.original
+        if self._preview_original is not self.original:
+            self._preview_original = self.original
+            self._preview_sources = {}
+        if scale not in self._preview_sources:
+            height, width = self.original.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            self._preview_sources[scale] = cv2.resize(self.original, size, interpolation=cv2.INTER_AREA)
+        return self._preview_sources[scale]
 
-        return self.to_pil_image(self.image)
+    def preview_brightness_contrast(self, brightness=0, contrast=1.0, scale=1.0):
+        """Prévia do brilho/contraste sobre a original reduzida; não altera a imagem atual"""
+        source = self.get_preview_source(scale)
+        if source is None:
+            return None
+        return self._brightness_contrast(source, brightness, contrast)[0]
 
     # ========== Conversão de Espaços de Cores ==========
+    @roi_operation
     def convert_to_rgb(self):
         """Converte a imagem para RGB"""
         if self.image is None:
             return None
+        self._record("convert_to_rgb")
         # OpenCV usa BGR, então converter para RGB
         rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
         # Converter de volta para BGR para manter consistência interna
         self.image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
-        return self.to_pil_image(self.image)
+        return self.image
 
+    @roi_operation
     def convert_to_rgba(self):
         """Converte a imagem para RGBA (adiciona canal alpha)"""
         if self.image is None:
             return None
+        self._record("convert_to_rgba")
         # Adicionar canal alpha (255 = totalmente opaco)
         bgra_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2BGRA)
-        # Criar imagem PIL com RGBA
-        rgba_array = cv2.cvtColor(bgra_image, cv2.COLOR_BGRA2RGBA)
-        pil_image = Image.fromarray(rgba_array)
-        # Armazenar como BGR para manter consistência (sem alpha)
+        # Armazenar como BGR para manter consistência (sem alpha; o canal é opaco)
         self.image = cv2.cvtColor(bgra_image, cv2.COLOR_BGRA2BGR)
-        return pil_image
+        return self.image
 
+    @roi_operation
     def convert_to_l(self):
         """Converte a imagem para L (tons de cinza)"""
         if self.image is None:
             return None
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        self._record("gray")
+        gray = to_gray(self.image)
         # Armazenar como BGR para manter consistência
         self.image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-        # Retornar imagem em tons de cinza
-        return Image.fromarray(gray, mode='L')
+        return self.image
 
+    @roi_operation
     def convert_to_hsv(self):
         """Converte a imagem para HSV"""
         if self.image is None:
             return None
+        self._record("convert_to_hsv")
+        if self.image.dtype != np.uint8:
+            # O OpenCV só converte HSV em 8 bits ou float
+            self.image = self._float_roundtrip(self.image, cv2.COLOR_BGR2HSV, cv2.COLOR_HSV2BGR)
+            return self.image
         hsv_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
         # Converter HSV para RGB para visualização (HSV usa range 0-179 para H, 0-255 para S e V)
         # Para visualizar melhor, vamos normalizar para RGB
         hsv_rgb = cv2.cvtColor(hsv_image, cv2.COLOR_HSV2RGB)
         # Armazenar como BGR para manter consistência
         self.image = cv2.cvtColor(hsv_rgb, cv2.COLOR_RGB2BGR)
-        return Image.fromarray(hsv_rgb)
+        return self.image
 
+    @roi_operation
     def convert_to_cmyk(self):
         """Converte a imagem para CMYK"""
         if self.image is None:
             return None
+        self._record("convert_to_cmyk")
+        if self._use_process_pool():
+            # Imagens grandes: mesmas fórmulas do PIL, por faixas no pool de processos
+            self.image = self._get_process_pool().run(
+                "cmyk_roundtrip", self.image, params={"max_value": self.get_max_value()}
+            )
+            return self.image
+        if self.image.dtype != np.uint8:
+            # O PIL só converte CMYK em 8 bits: mesmas fórmulas em float
+            # (C=1-R, M=1-G, Y=1-B, K=0 e, na volta, R=1-min(1, C+K))
+            cmy = 1.0 - convert_depth(self.image, np.float32)
+            restored = 1.0 - np.minimum(1.0, cmy)
+            self.image = convert_depth(restored, self.image.dtype)
+            return self.image
         # OpenCV não tem conversão direta para CMYK
         # Converter BGR para RGB primeiro
         rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
@@ -250,28 +1175,54 @@ class Model:
         rgb_result = np.array(pil_rgb_result)
         # Armazenar como BGR para manter consistência
         self.image = cv2.cvtColor(rgb_result, cv2.COLOR_RGB2BGR)
-        return pil_rgb_result
+        return self.image
 
+    @roi_operation
     def convert_to_lab(self):
         """Converte a imagem para LAB"""
         if self.image is None:
             return None
+        self._record("convert_to_lab")
+        if self.image.dtype != np.uint8:
+            # O OpenCV só converte LAB em 8 bits ou float
+            self.image = self._float_roundtrip(self.image, cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR)
+            return self.image
         lab_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2LAB)
         # LAB usa valores diferentes de RGB, então precisamos converter para RGB para visualização
         # Normalizar os canais para visualização
         lab_rgb = cv2.cvtColor(lab_image, cv2.COLOR_LAB2RGB)
         # Armazenar como BGR para manter consistência
         self.image = cv2.cvtColor(lab_rgb, cv2.COLOR_RGB2BGR)
-        return Image.fromarray(lab_rgb)
+        return self.image
+
+    def _float_roundtrip(self, image, forward, backward):
+        """Converte ida e volta entre espaços de cor em float32, preservando a profundidade original"""
+        as_float = convert_depth(image, np.float32)
+        converted = cv2.cvtColor(cv2.cvtColor(as_float, forward), backward)
+        return convert_depth(converted, image.dtype)
 
     # ========== Conversão ==========
+    def to_display_array(self, cv_image):
+        """
+        Retorna um array BGR de 8 bits para exibição. Imagens de 16 bits/float são
+        primeiro reduzidas para o proxy de exibição e só então mapeadas para 8 bits
+        """
+        if cv_image.dtype == np.uint8:
+            return cv_image
+        proxy = make_display_proxy(cv_image, *self.display_proxy_size)
+        window = self.display_window or display_window(proxy)
+        return to_display_8bit(proxy, window)
+
     def to_pil_image(self, cv_image):
-        """Converte imagem OpenCV para PIL Image"""
-        rgb = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
+        """
+        Converte imagem OpenCV para PIL Image no tamanho original (exportação e uso externo).
+        A tela não passa por aqui: as operações retornam o array BGR e o ImagePanel
+        o reduz antes de converter (ver views/display_buffer.py)
+        """
+        rgb = cv2.cvtColor(self.to_display_array(cv_image), cv2.COLOR_BGR2RGB)
         return Image.fromarray(rgb)
 
     def to_tk_image(self, cv_image):
         """Converte imagem OpenCV para PhotoImage (mantido para compatibilidade)"""
-        rgb = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb)
+        img = self.to_pil_image(cv_image)
         return ImageTk.PhotoImage(img)
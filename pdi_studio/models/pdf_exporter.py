@@ -1,8 +1,74 @@
+import math
 import cv2
 import numpy as np
-from matplotlib.backends.backend_pdf import PdfPages
-from matplotlib import pyplot as plt
-from PIL import Image
+from models.histogram_engine import DEFAULT_JOINT, color_histograms
+from models.quality_metrics import format_metrics
+from models.utils import compute_histogram, default_histogram_bins, display_window, to_display_8bit, to_gray
+
+# Opções padrão da exportação em PDF
+DEFAULT_PDF_OPTIONS = {
+    "dpi": 100,               # resolução das páginas e das imagens incorporadas (padrão do matplotlib)
+    "max_pixels": 4_000_000,  # limite de pixels de cada imagem incorporada
+    "compression": "flate",   # 'flate' (sem perdas) ou 'jpeg'
+    "jpeg_quality": 85,
+    "color_space": "hsv",      # página com os canais e o histograma 2D desse espaço (None = sem)
+    "joint_bins": 64,          # bins de cada eixo do histograma 2D
+    "histogram_samples": 4_000_000,  # limite de pixels amostrados para essa página
+}
+
+# Componentes conectados desenhados (caixas) e listados (tabela) na página de componentes
+PDF_COMPONENT_BOXES = 5000
+PDF_COMPONENT_ROWS = 30
+
+# Área (em polegadas) ocupada por cada imagem na página 11 x 8.5 com duas imagens empilhadas
+IMAGE_SLOT_INCHES = (11.0, 4.25)
+
+def embedded_size(width, height, dpi, max_pixels):
+    """
+    Tamanho (largura, altura) da imagem incorporada: cabe na área da página na DPI pedida
+    e não passa de max_pixels; nunca amplia
+    """
+    slot_width, slot_height = IMAGE_SLOT_INCHES
+    ratio = min(1.0, slot_width * dpi / width, slot_height * dpi / height)
+    if max_pixels:
+        ratio = min(ratio, math.sqrt(max_pixels / (width * height)))
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+def _enable_jpeg_images(pdf, quality):
+    """
+    Faz o PdfPages gravar as imagens RGB como JPEG (DCTDecode). O backend PDF do matplotlib
+    só grava Flate, então o método que escreve as imagens é trocado nesta instância;
+    máscaras e imagens de um canal continuam em Flate
+    Retorna False (e mantém Flate) se a API interna do backend não for a esperada
+    """
+    pdf_file = getattr(pdf, "_file", None)
+    if pdf_file is None or not all(hasattr(pdf_file, name) for name in ("_writeImg", "recordXref", "write")):
+        return False
+    from matplotlib.backends.backend_pdf import Name, pdfRepr
+    write_flate = pdf_file._writeImg
+
+    def write_image(data, id, smask=None):
+        if data.shape[-1] != 3:
+            return write_flate(data, id, smask)
+        ok, encoded = cv2.imencode(".jpg", cv2.cvtColor(data, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok:
+            return write_flate(data, id, smask)
+        payload = encoded.tobytes()
+        height, width = data.shape[:2]
+        obj = {'Type': Name('XObject'), 'Subtype': Name('Image'),
+               'Width': width, 'Height': height,
+               'ColorSpace': Name('DeviceRGB'), 'BitsPerComponent': 8,
+               'Filter': Name('DCTDecode'), 'Length': len(payload)}
+        if smask:
+            obj['SMask'] = smask
+        pdf_file.recordXref(id)
+        pdf_file.write(b"%d 0 obj\n" % id + pdfRepr(obj) + b"\nstream\n")
+        pdf_file.write(payload)
+        pdf_file.write(b"\nendstream\nendobj\n")
+
+    pdf_file._writeImg = write_image
+    return True
 
 class PDFExporter:
     """Classe para exportar imagens e histogramas para PDF"""
@@ -11,7 +77,8 @@ class PDFExporter:
         pass
     
     def export_to_pdf(self, original_image, processed_image, original_hist=None, processed_hist=None, 
-                     equalized_image=None, equalized_hist=None, output_path=None):
+                     equalized_image=None, equalized_hist=None, output_path=None, bins=None, options=None,
+                     metrics=None, components=None):
         """
         Exporta imagens e histogramas para um arquivo PDF
         
@@ -23,24 +90,30 @@ class PDFExporter:
             equalized_image: Imagem equalizada (opcional)
             equalized_hist: Histograma da imagem equalizada (opcional)
             output_path: Caminho do arquivo PDF de saída
+            bins: Número de bins dos histogramas calculados aqui (padrão: um por nível)
+            options: DPI, limite de pixels e compressão das imagens (ver DEFAULT_PDF_OPTIONS)
+            metrics: MSE/PSNR/SSIM entre original e processada (Model.get_quality_metrics), opcional
+            components: componentes conectados da imagem processada (ComponentTable), opcional
             
         Returns:
             bool: True se a exportação foi bem-sucedida, False caso contrário
         """
         if original_image is None or processed_image is None:
             return False
+
+        # Importados só na primeira exportação para não atrasar a abertura da janela
+        from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib import pyplot as plt
+
+        merged = dict(DEFAULT_PDF_OPTIONS)
+        merged.update(options or {})
+        dpi = merged["dpi"]
         
         try:
-            # Converter imagens OpenCV para PIL se necessário
-            if isinstance(original_image, np.ndarray):
-                original_pil = self._cv2_to_pil(original_image)
-            else:
-                original_pil = original_image
-                
-            if isinstance(processed_image, np.ndarray):
-                processed_pil = self._cv2_to_pil(processed_image)
-            else:
-                processed_pil = processed_image
+            # Imagens reduzidas uma única vez; páginas com a mesma imagem reaproveitam o resultado
+            embedded = {}
+            original_rgb = self._embedded_image(original_image, merged, embedded)
+            processed_rgb = self._embedded_image(processed_image, merged, embedded)
             
             # Criar PDF
             with PdfPages(output_path) as pdf:
@@ -50,30 +123,42 @@ class PDFExporter:
                 # Título
                 fig.suptitle('PDI Studio - Relatório de Processamento de Imagem', 
                            fontsize=16, fontweight='bold', y=0.98)
+                if metrics is not None:
+                    fig.text(0.5, 0.935, format_metrics(metrics), ha='center', fontsize=11)
                 
                 # Imagem Original
                 ax1 = plt.subplot(2, 1, 1)
-                ax1.imshow(original_pil)
+                # interpolation='none' incorpora os pixels já reduzidos, sem reamostrar de novo
+                ax1.imshow(original_rgb, interpolation='none')
                 ax1.set_title('Imagem Original', fontsize=12, fontweight='bold')
                 ax1.axis('off')
                 
                 # Imagem Processada
                 ax2 = plt.subplot(2, 1, 2)
-                ax2.imshow(processed_pil)
+                ax2.imshow(processed_rgb, interpolation='none')
                 ax2.set_title('Imagem Processada', fontsize=12, fontweight='bold')
                 ax2.axis('off')
                 
-                plt.tight_layout(rect=[0, 0, 1, 0.96])
-                pdf.savefig(fig, bbox_inches='tight')
+                # Espaço extra no topo para a linha das métricas
+                plt.tight_layout(rect=[0, 0, 1, 0.96 if metrics is None else 0.92])
+                pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                 plt.close(fig)
+
+                # O arquivo interno só existe após o primeiro savefig; as imagens são gravadas ao fechar
+                if merged["compression"] == "jpeg":
+                    _enable_jpeg_images(pdf, merged["jpeg_quality"])
+
+                # Página 1b: componentes conectados (caixas sobre a imagem e tabela dos maiores)
+                if components is not None:
+                    self._components_page(pdf, plt, processed_image, processed_rgb, components, dpi)
                 
                 # Calcular histogramas se não fornecidos
                 if original_hist is None:
-                    original_hist = self.calculate_histogram_if_needed(original_image)
+                    original_hist = self.calculate_histogram_if_needed(original_image, bins)
                 if processed_hist is None:
-                    processed_hist = self.calculate_histogram_if_needed(processed_image)
+                    processed_hist = self.calculate_histogram_if_needed(processed_image, bins)
                 if equalized_hist is None and equalized_image is not None:
-                    equalized_hist = self.calculate_histogram_if_needed(equalized_image)
+                    equalized_hist = self.calculate_histogram_if_needed(equalized_image, bins)
                 
                 # Página 2: Histogramas Comparativos (Original vs Processado)
                 if original_hist is not None and processed_hist is not None:
@@ -84,27 +169,27 @@ class PDFExporter:
                     # Histograma Original
                     ax1 = plt.subplot(2, 1, 1)
                     ax1.plot(original_hist, color='blue', alpha=0.7, linewidth=1.5, label='Original')
-                    ax1.fill_between(range(256), original_hist.flatten(), alpha=0.3, color='blue')
+                    ax1.fill_between(range(len(original_hist)), original_hist.flatten(), alpha=0.3, color='blue')
                     ax1.set_title('Histograma da Imagem Original', fontsize=12, fontweight='bold')
                     ax1.set_xlabel('Intensidade de Pixel', fontsize=10)
                     ax1.set_ylabel('Frequência', fontsize=10)
                     ax1.grid(True, alpha=0.3)
-                    ax1.set_xlim(0, 255)
+                    ax1.set_xlim(0, len(original_hist) - 1)
                     ax1.legend()
                     
                     # Histograma Processado
                     ax2 = plt.subplot(2, 1, 2)
                     ax2.plot(processed_hist, color='red', alpha=0.7, linewidth=1.5, label='Processado')
-                    ax2.fill_between(range(256), processed_hist.flatten(), alpha=0.3, color='red')
+                    ax2.fill_between(range(len(processed_hist)), processed_hist.flatten(), alpha=0.3, color='red')
                     ax2.set_title('Histograma da Imagem Processada', fontsize=12, fontweight='bold')
                     ax2.set_xlabel('Intensidade de Pixel', fontsize=10)
                     ax2.set_ylabel('Frequência', fontsize=10)
                     ax2.grid(True, alpha=0.3)
-                    ax2.set_xlim(0, 255)
+                    ax2.set_xlim(0, len(processed_hist) - 1)
                     ax2.legend()
                     
                     plt.tight_layout(rect=[0, 0, 1, 0.96])
-                    pdf.savefig(fig, bbox_inches='tight')
+                    pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                     plt.close(fig)
                 
                 # Página 3: Histograma Equalizado (se disponível)
@@ -114,16 +199,16 @@ class PDFExporter:
                     
                     ax = plt.subplot(1, 1, 1)
                     ax.plot(equalized_hist, color='green', alpha=0.7, linewidth=2, label='Equalizado')
-                    ax.fill_between(range(256), equalized_hist.flatten(), alpha=0.3, color='green')
+                    ax.fill_between(range(len(equalized_hist)), equalized_hist.flatten(), alpha=0.3, color='green')
                     ax.set_title('Histograma da Imagem Equalizada', fontsize=12, fontweight='bold')
                     ax.set_xlabel('Intensidade de Pixel', fontsize=10)
                     ax.set_ylabel('Frequência', fontsize=10)
                     ax.grid(True, alpha=0.3)
-                    ax.set_xlim(0, 255)
+                    ax.set_xlim(0, len(equalized_hist) - 1)
                     ax.legend()
                     
                     plt.tight_layout(rect=[0, 0, 1, 0.96])
-                    pdf.savefig(fig, bbox_inches='tight')
+                    pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                     plt.close(fig)
                     
                     # Comparação Original vs Equalizado
@@ -141,11 +226,11 @@ class PDFExporter:
                         ax.set_xlabel('Intensidade de Pixel', fontsize=10)
                         ax.set_ylabel('Frequência', fontsize=10)
                         ax.grid(True, alpha=0.3)
-                        ax.set_xlim(0, 255)
+                        ax.set_xlim(0, len(equalized_hist) - 1)
                         ax.legend(loc='upper right')
                         
                         plt.tight_layout(rect=[0, 0, 1, 0.96])
-                        pdf.savefig(fig, bbox_inches='tight')
+                        pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                         plt.close(fig)
                 
                 # Página 4: Histogramas RGB (se imagem colorida)
@@ -154,7 +239,7 @@ class PDFExporter:
                     fig.suptitle('Histogramas por Canal RGB - Imagem Original', 
                                fontsize=16, fontweight='bold', y=0.98)
                     
-                    rgb_hists = self._calculate_rgb_histograms(original_image)
+                    rgb_hists = self._calculate_rgb_histograms(original_image, bins)
                     if rgb_hists:
                         ax = plt.subplot(1, 1, 1)
                         ax.plot(rgb_hists['r'], color='red', alpha=0.7, linewidth=1.5, label='Canal R')
@@ -164,13 +249,18 @@ class PDFExporter:
                         ax.set_xlabel('Intensidade de Pixel', fontsize=10)
                         ax.set_ylabel('Frequência', fontsize=10)
                         ax.grid(True, alpha=0.3)
-                        ax.set_xlim(0, 255)
+                        ax.set_xlim(0, len(rgb_hists['r']) - 1)
                         ax.legend()
                         
                         plt.tight_layout(rect=[0, 0, 1, 0.96])
-                        pdf.savefig(fig, bbox_inches='tight')
+                        pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                         plt.close(fig)
                 
+                # Página 4b: canais de outro espaço de cor e histograma 2D (ex.: Matiz x Saturação)
+                if merged["color_space"] and isinstance(original_image, np.ndarray) \
+                        and self._is_color_image(original_image):
+                    self._color_space_page(pdf, plt, original_image, merged)
+                
                 # Página 5: Função de Distribuição Cumulativa (CDF)
                 if original_hist is not None and processed_hist is not None:
                     fig = plt.figure(figsize=(11, 8.5))
@@ -181,12 +271,12 @@ class PDFExporter:
                     ax1 = plt.subplot(2, 1, 1)
                     cdf_original = np.cumsum(original_hist.flatten())
                     cdf_original = cdf_original / cdf_original[-1]  # Normalizar
-                    ax1.plot(range(256), cdf_original, color='blue', linewidth=2, label='Original')
+                    ax1.plot(range(len(cdf_original)), cdf_original, color='blue', linewidth=2, label='Original')
                     ax1.set_title('CDF da Imagem Original', fontsize=12, fontweight='bold')
                     ax1.set_xlabel('Intensidade de Pixel', fontsize=10)
                     ax1.set_ylabel('Probabilidade Cumulativa', fontsize=10)
                     ax1.grid(True, alpha=0.3)
-                    ax1.set_xlim(0, 255)
+                    ax1.set_xlim(0, len(original_hist) - 1)
                     ax1.set_ylim(0, 1)
                     ax1.legend()
                     
@@ -194,17 +284,17 @@ class PDFExporter:
                     ax2 = plt.subplot(2, 1, 2)
                     cdf_processed = np.cumsum(processed_hist.flatten())
                     cdf_processed = cdf_processed / cdf_processed[-1]  # Normalizar
-                    ax2.plot(range(256), cdf_processed, color='red', linewidth=2, label='Processado')
+                    ax2.plot(range(len(cdf_processed)), cdf_processed, color='red', linewidth=2, label='Processado')
                     ax2.set_title('CDF da Imagem Processada', fontsize=12, fontweight='bold')
                     ax2.set_xlabel('Intensidade de Pixel', fontsize=10)
                     ax2.set_ylabel('Probabilidade Cumulativa', fontsize=10)
                     ax2.grid(True, alpha=0.3)
-                    ax2.set_xlim(0, 255)
+                    ax2.set_xlim(0, len(processed_hist) - 1)
                     ax2.set_ylim(0, 1)
                     ax2.legend()
                     
                     plt.tight_layout(rect=[0, 0, 1, 0.96])
-                    pdf.savefig(fig, bbox_inches='tight')
+                    pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                     plt.close(fig)
                 
                 # Página 6: Histogramas em Barras (Alternativa)
@@ -215,25 +305,27 @@ class PDFExporter:
                     
                     # Histograma em barras - Original
                     ax1 = plt.subplot(2, 1, 1)
-                    bins = range(0, 256, 8)  # Agrupar em bins de 8 para melhor visualização
-                    hist_bins_orig = [np.sum(original_hist[i:i+8]) for i in range(0, 256, 8)]
+                    # Agrupar em 32 barras para melhor visualização
+                    group = max(1, len(original_hist) // 32)
+                    hist_bins_orig = [np.sum(original_hist[i:i+group]) for i in range(0, len(original_hist), group)]
                     ax1.bar(range(len(hist_bins_orig)), hist_bins_orig, color='blue', alpha=0.7, width=0.8)
                     ax1.set_title('Histograma em Barras - Original', fontsize=12, fontweight='bold')
-                    ax1.set_xlabel('Intensidade de Pixel (bins de 8)', fontsize=10)
+                    ax1.set_xlabel(f'Intensidade de Pixel (bins de {group})', fontsize=10)
                     ax1.set_ylabel('Frequência', fontsize=10)
                     ax1.grid(True, alpha=0.3, axis='y')
                     
                     # Histograma em barras - Processado
                     ax2 = plt.subplot(2, 1, 2)
-                    hist_bins_proc = [np.sum(processed_hist[i:i+8]) for i in range(0, 256, 8)]
+                    group = max(1, len(processed_hist) // 32)
+                    hist_bins_proc = [np.sum(processed_hist[i:i+group]) for i in range(0, len(processed_hist), group)]
                     ax2.bar(range(len(hist_bins_proc)), hist_bins_proc, color='red', alpha=0.7, width=0.8)
                     ax2.set_title('Histograma em Barras - Processado', fontsize=12, fontweight='bold')
-                    ax2.set_xlabel('Intensidade de Pixel (bins de 8)', fontsize=10)
+                    ax2.set_xlabel(f'Intensidade de Pixel (bins de {group})', fontsize=10)
                     ax2.set_ylabel('Frequência', fontsize=10)
                     ax2.grid(True, alpha=0.3, axis='y')
                     
                     plt.tight_layout(rect=[0, 0, 1, 0.96])
-                    pdf.savefig(fig, bbox_inches='tight')
+                    pdf.savefig(fig, bbox_inches='tight', dpi=dpi)
                     plt.close(fig)
             
             return True
@@ -242,23 +334,112 @@ class PDFExporter:
             print(f"Erro ao exportar PDF: {e}")
             return False
     
-    def _cv2_to_pil(self, cv_image):
-        """Converte imagem OpenCV (BGR) para PIL Image (RGB)"""
-        if cv_image is None:
-            return None
-        
-        # Converter BGR para RGB
-        if len(cv_image.shape) == 3:
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
+    def _color_space_page(self, pdf, plt, image, options):
+        """Página com as curvas dos canais de um espaço de cor e o histograma 2D do par padrão"""
+        color_space = options["color_space"]
+        joint = [DEFAULT_JOINT[color_space]] if color_space in DEFAULT_JOINT else []
+        bins = options["joint_bins"]
+        result = color_histograms(image, color_space, joint=joint, joint_bins=(bins, bins),
+                                  max_samples=options["histogram_samples"])
+
+        fig = plt.figure(figsize=(11, 8.5))
+        fig.suptitle(f'Histogramas {color_space.upper()} - Imagem Original',
+                     fontsize=16, fontweight='bold', y=0.98)
+        columns = 2 if joint else 1
+        ax = plt.subplot(1, columns, 1)
+        for (name, hist), color in zip(result["channels"].items(), ['red', 'green', 'blue']):
+            low, high = result["ranges"][name]
+            # Eixo x de cada canal na sua própria faixa, normalizado para [0, 1]
+            ax.plot(np.linspace(0, 1, len(hist)), hist / max(float(hist.max()), 1.0), color=color,
+                    alpha=0.7, linewidth=1.5, label=f'{name.upper()} ({low:g}–{high:.4g})')
+        ax.set_title('Canais (faixa de cada canal normalizada)', fontsize=12, fontweight='bold')
+        ax.set_xlabel('Posição na faixa do canal', fontsize=10)
+        ax.set_ylabel('Frequência relativa', fontsize=10)
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+
+        for (a, b), hist in result["joint"].items():
+            ax = plt.subplot(1, columns, 2)
+            (a_low, a_high), (b_low, b_high) = result["ranges"][a], result["ranges"][b]
+            ax.imshow(np.log1p(hist).T, origin='lower', aspect='auto', cmap='viridis',
+                      extent=[a_low, a_high, b_low, b_high], interpolation='nearest')
+            ax.set_title(f'Histograma 2D {a.upper()} x {b.upper()} (escala log)', fontsize=12, fontweight='bold')
+            ax.set_xlabel(a.upper(), fontsize=10)
+            ax.set_ylabel(b.upper(), fontsize=10)
+
+        if result["step"] > 1:
+            fig.text(0.5, 0.02, f'Amostragem: 1 a cada {result["step"]}x{result["step"]} pixels',
+                     ha='center', fontsize=9)
+        plt.tight_layout(rect=[0, 0.03, 1, 0.96])
+        pdf.savefig(fig, bbox_inches='tight', dpi=options["dpi"])
+        plt.close(fig)
+
+    def _components_page(self, pdf, plt, image, rgb, components, dpi):
+        """Página com as caixas dos componentes sobre a imagem processada e a tabela dos maiores"""
+        fig = plt.figure(figsize=(11, 8.5))
+        fig.suptitle('Componentes Conectados', fontsize=16, fontweight='bold', y=0.98)
+        fig.text(0.5, 0.935, components.summary(), ha='center', fontsize=11)
+
+        ax = fig.add_axes([0.03, 0.05, 0.55, 0.83])
+        ax.imshow(rgb, interpolation='none')
+        ax.axis('off')
+        # Caixas na escala da imagem incorporada (só as dos maiores componentes)
+        scale_x = rgb.shape[1] / image.shape[1]
+        scale_y = rgb.shape[0] / image.shape[0]
+        from matplotlib.collections import PolyCollection
+        boxes = components.boxes(limit=PDF_COMPONENT_BOXES).astype(np.float64)
+        x0, y0 = boxes[:, 0] * scale_x - 0.5, boxes[:, 1] * scale_y - 0.5
+        x1, y1 = x0 + boxes[:, 2] * scale_x, y0 + boxes[:, 3] * scale_y
+        polygons = np.stack([np.stack([x0, y0], 1), np.stack([x1, y0], 1),
+                             np.stack([x1, y1], 1), np.stack([x0, y1], 1)], axis=1)
+        ax.add_collection(PolyCollection(polygons, facecolors='none', edgecolors='#ff4040', linewidths=0.6))
+
+        table_ax = fig.add_axes([0.62, 0.05, 0.36, 0.83])
+        table_ax.axis('off')
+        rows = components.rows(components.largest(PDF_COMPONENT_ROWS))
+        if rows:
+            table = table_ax.table(cellText=[list(row) for row in rows],
+                                   colLabels=['#', 'Área', 'x', 'y', 'Larg.', 'Alt.', 'cx', 'cy'],
+                                   loc='upper center', cellLoc='right')
+            table.auto_set_font_size(False)
+            table.set_fontsize(7)
+            table.scale(1, 1.1)
+            table_ax.set_title(f'{len(rows)} maiores componentes (por área)', fontsize=10, fontweight='bold')
+        pdf.savefig(fig, dpi=dpi)
+        plt.close(fig)
+
+    def _embedded_image(self, image, options, cache):
+        """
+        Imagem RGB de 8 bits a incorporar no PDF, reduzida (INTER_AREA) para a DPI e o
+        limite de pixels das opções antes de qualquer conversão
+        cache: dicionário id(imagem) -> resultado, compartilhado pelas páginas da exportação
+        """
+        if id(image) in cache:
+            return cache[id(image)]
+
+        if isinstance(image, np.ndarray):
+            bgr = image if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
         else:
-            # Imagem em escala de cinza
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_GRAY2RGB)
-        
-        return Image.fromarray(rgb_image)
+            # PIL Image
+            bgr = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+        height, width = bgr.shape[:2]
+        size = embedded_size(width, height, options["dpi"], options["max_pixels"])
+        if size != (width, height):
+            bgr = cv2.resize(bgr, size, interpolation=cv2.INTER_AREA)
+
+        # Imagens de 16 bits/float: janela calculada e aplicada já no tamanho reduzido
+        if bgr.dtype != np.uint8:
+            bgr = to_display_8bit(bgr, display_window(bgr))
+
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        cache[id(image)] = rgb
+        return rgb
     
-    def calculate_histogram_if_needed(self, image):
+    def calculate_histogram_if_needed(self, image, bins=None):
         """
         Calcula o histograma de uma imagem se necessário
+        bins: número de bins (padrão: um por nível do tipo da imagem)
         Retorna None se a imagem não estiver disponível
         """
         if image is None:
@@ -266,10 +447,7 @@ class PDFExporter:
         
         # Converter para escala de cinza se necessário
         if isinstance(image, np.ndarray):
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image
+            gray = to_gray(image)
         else:
             # PIL Image
             if image.mode != 'L':
@@ -282,7 +460,7 @@ class PDFExporter:
                 gray = np.array(image)
         
         # Calcular histograma
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+        hist = compute_histogram(gray, bins)
         return hist
     
     def _is_color_image(self, image):
@@ -296,7 +474,7 @@ class PDFExporter:
             # PIL Image
             return image.mode in ['RGB', 'RGBA', 'CMYK', 'HSV', 'LAB']
     
-    def _calculate_rgb_histograms(self, image):
+    def _calculate_rgb_histograms(self, image, bins=None):
         """
         Calcula histogramas separados para cada canal RGB
         Retorna um dicionário com 'r', 'g', 'b'
@@ -305,32 +483,19 @@ class PDFExporter:
             return None
         
         try:
-            # Converter para numpy array se necessário
+            # Converter para numpy array BGR se necessário
             if isinstance(image, np.ndarray):
-                # OpenCV usa BGR, converter para RGB
-                if len(image.shape) == 3:
-                    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                else:
+                if len(image.shape) != 3:
                     return None
             else:
                 # PIL Image
-                if image.mode == 'RGB':
-                    rgb_image = np.array(image)
-                elif image.mode == 'RGBA':
-                    rgb_image = np.array(image.convert('RGB'))
-                else:
+                if image.mode not in ('RGB', 'RGBA'):
                     return None
+                image = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
             
-            # Calcular histogramas para cada canal
-            hist_r = cv2.calcHist([rgb_image], [0], None, [256], [0, 256])
-            hist_g = cv2.calcHist([rgb_image], [1], None, [256], [0, 256])
-            hist_b = cv2.calcHist([rgb_image], [2], None, [256], [0, 256])
-            
-            return {
-                'r': hist_r,
-                'g': hist_g,
-                'b': hist_b
-            }
+            # Os três canais em uma única passada, sem converter a imagem para RGB
+            bins = bins or default_histogram_bins(image.dtype)
+            return color_histograms(image, "bgr", bins=bins)["channels"]
         except Exception as e:
             print(f"Erro ao calcular histogramas RGB: {e}")
             return None
@@ -0,0 +1,181 @@
+import cv2
+import numpy as np
+from models.histogram_model import equalization_lut
+from models.threshold_model import ThresholdModel
+from models.utils import dtype_max, to_gray
+
+# Passadas completas na imagem que cada operação custa quando executada isoladamente
+# pelo Model (incluindo as idas e voltas GRAY↔BGR)
+EAGER_PASSES = {
+    "gray": 2,                 # BGR→cinza, cinza→BGR
+    "brightness_contrast": 1,  # convertScaleAbs / addWeighted
+    "threshold": 3,            # BGR→cinza, limiar, cinza→BGR
+    "multithreshold": 3,       # BGR→cinza, segmentos, cinza→BGR
+    "equalize": 4,             # BGR→cinza, histograma, mapeamento, cinza→BGR
+    "otsu": 4,                 # BGR→cinza, histograma, limiar, cinza→BGR
+    "lut": 1,                  # LUT arbitrária aplicada em todos os canais
+}
+
+# Operações que colapsam a imagem em tons de cinza
+GRAY_OPERATIONS = {"gray", "threshold", "multithreshold", "equalize", "otsu"}
+
+# Operações cuja LUT depende do histograma da imagem naquele ponto do pipeline
+HISTOGRAM_OPERATIONS = {"equalize", "otsu"}
+
+def is_point_operation(name):
+    """Indica se a operação pode ser fundida em uma LUT"""
+    return name in EAGER_PASSES
+
+def level_count(dtype):
+    """Número de níveis de um tipo inteiro (256 ou 65.536)"""
+    return int(dtype_max(dtype)) + 1
+
+def apply_lut(image, lut):
+    """Aplica uma LUT (uma entrada por nível) em uma única passada"""
+    if image.dtype == np.uint8 and lut.dtype == np.uint8:
+        # cv2.LUT aplica a mesma tabela em todos os canais
+        return cv2.LUT(image, lut)
+    return np.take(lut, image)
+
+def brightness_contrast_lut(values, alpha, beta, dtype):
+    """
+    Tabela de brilho/contraste (alpha * x + beta) para os níveis em `values`
+    Em 8 bits segue o convertScaleAbs (valor absoluto antes de saturar); nos demais, o addWeighted
+    """
+    # O OpenCV calcula alpha * x + beta em float32 com multiplicação-adição fundida; o produto
+    # em float64 é exato e um único arredondamento para float32 reproduz os mesmos empates
+    mapped = (values * np.float64(np.float32(alpha)) + np.float64(np.float32(beta))).astype(np.float32)
+    if np.dtype(dtype) == np.uint8:
+        mapped = np.abs(mapped)
+    return np.clip(np.rint(mapped), 0, dtype_max(dtype)).astype(dtype)
+
+def threshold_lut(values, threshold):
+    """Tabela de limiarização binária: níveis acima do limiar viram 255 (saída em 8 bits)"""
+    return np.where(values > threshold, 255, 0).astype(np.uint8)
+
+def multithreshold_lut(values, levels, thresholds, dtype):
+    """Tabela da limiarização multissegmentada: cada nível recebe o valor do seu intervalo"""
+    index = np.searchsorted(np.asarray(thresholds), values, side="right")
+    return np.asarray(levels, dtype=dtype)[index]
+
+class PointPipeline:
+    """
+    Sequência de operações pontuais (mapeamentos de intensidade) compilada em LUTs.
+    Operações consecutivas são compostas em uma única tabela; as que dependem do histograma
+    (equalização, Otsu) têm a tabela calculada a partir do histograma de entrada,
+    transportado pelas tabelas anteriores, sem passadas extras na imagem
+    """
+
+    def __init__(self, operations=None):
+        # Lista de (nome, parâmetros)
+        self.operations = list(operations or [])
+        self.threshold_model = ThresholdModel()
+
+    def add(self, name, **params):
+        """Acrescenta uma operação (ver EAGER_PASSES). Retorna o próprio pipeline"""
+        if not is_point_operation(name):
+            raise ValueError(f"Operação não pontual: {name}")
+        self.operations.append((name, params))
+        return self
+
+    def eager_passes(self):
+        """Passadas na imagem se as operações fossem executadas uma a uma"""
+        return sum(EAGER_PASSES[name] for name, _ in self.operations)
+
+    def run(self, image, mask=None):
+        """
+        Executa o pipeline em uma imagem BGR de 8 ou 16 bits
+        mask: máscara booleana (ROI poligonal); equalização e Otsu usam só o histograma desses pixels
+        Retorna (imagem BGR resultante, relatório)
+        """
+        if image.dtype not in (np.uint8, np.uint16):
+            raise ValueError("O pipeline de LUTs só aceita imagens de 8 ou 16 bits")
+
+        # Até a primeira operação que colapsa para cinza, a tabela é aplicada em cada canal
+        split = next(
+            (i for i, (name, _) in enumerate(self.operations) if name in GRAY_OPERATIONS),
+            len(self.operations)
+        )
+        color_operations = self.operations[:split]
+        gray_operations = self.operations[split:]
+        stages = []
+        result = image
+
+        if color_operations:
+            lut, _ = self._compose(color_operations, image.dtype)
+            result = apply_lut(result, lut)
+            stages.append(f"LUT por canal ({len(color_operations)} operações)")
+
+        if gray_operations:
+            gray = to_gray(result)
+            stages.append("BGR→cinza")
+            hist = None
+            if any(name in HISTOGRAM_OPERATIONS for name, _ in gray_operations):
+                pixels = gray.ravel() if mask is None else gray[mask]
+                hist = np.bincount(pixels, minlength=level_count(gray.dtype))
+                stages.append("histograma")
+            lut, dtype = self._compose(gray_operations, gray.dtype, hist)
+            if dtype != gray.dtype or not np.array_equal(lut, np.arange(len(lut))):
+                gray = apply_lut(gray, lut)
+                stages.append(f"LUT ({len(gray_operations)} operações)")
+            result = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+            stages.append("cinza→BGR")
+
+        if result is image:
+            result = image.copy()
+        eager = self.eager_passes()
+        report = {
+            "operations": len(self.operations),
+            "eager_passes": eager,
+            "fused_passes": len(stages),
+            "saved": eager - len(stages),
+            "stages": stages,
+        }
+        return result, report
+
+    def _compose(self, operations, dtype, hist=None):
+        """
+        Compõe as tabelas das operações em uma LUT indexada pelos níveis de entrada
+        hist: histograma da entrada (necessário para equalização e Otsu)
+        Retorna (LUT, tipo de saída)
+        """
+        current = np.dtype(dtype)
+        mapping = np.arange(level_count(current), dtype=np.int64)
+        for name, params in operations:
+            if name == "gray":
+                continue
+            values = np.arange(level_count(current), dtype=np.int64)
+            if name in HISTOGRAM_OPERATIONS:
+                # Histograma naquele ponto: as contagens seguem a tabela composta até aqui
+                current_hist = np.bincount(mapping, weights=hist, minlength=len(values))
+            if name == "brightness_contrast":
+                table = brightness_contrast_lut(values, params["alpha"], params["beta"], current)
+            elif name == "threshold":
+                table = threshold_lut(values, params["threshold"])
+            elif name == "multithreshold":
+                table = multithreshold_lut(values, params["levels"], params["thresholds"], current)
+            elif name == "equalize":
+                table = equalization_lut(current_hist, current)
+            elif name == "otsu":
+                table = threshold_lut(values, self.threshold_model.otsu_threshold(current_hist))
+            else:
+                table = np.asarray(params["table"]).astype(current)
+            mapping = table[mapping].astype(np.int64)
+            current = table.dtype
+        return mapping.astype(current), current
+
+def merge_reports(reports):
+    """Soma os relatórios de vários pipelines executados em sequência"""
+    merged = {"operations": 0, "eager_passes": 0, "fused_passes": 0, "saved": 0, "stages": []}
+    for report in reports:
+        for key in ("operations", "eager_passes", "fused_passes", "saved"):
+            merged[key] += report[key]
+        merged["stages"] += report["stages"]
+    return merged
+
+def format_report(report):
+    """Texto curto do relatório para o log"""
+    return (
+        f"{report['operations']} operações pontuais: {report['fused_passes']} passadas "
+        f"em vez de {report['eager_passes']} ({report['saved']} economizadas)"
+    )
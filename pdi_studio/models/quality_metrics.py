@@ -0,0 +1,115 @@
+import math
+import weakref
+import cv2
+import numpy as np
+from models.utils import convert_depth, dtype_max, to_gray
+
+# Constantes do SSIM (Wang et al., 2004) para intensidades em [0, 1]
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+def mean_squared_error(reference, image, strip_height=1024):
+    """
+    MSE entre duas imagens de mesma forma, com intensidades normalizadas em [0, 1]
+    Processado em faixas de linhas para não criar cópias float32 da imagem inteira
+    """
+    total = 0.0
+    for y0 in range(0, reference.shape[0], strip_height):
+        a = convert_depth(reference[y0:y0 + strip_height], np.float32)
+        b = convert_depth(image[y0:y0 + strip_height], np.float32)
+        diff = cv2.absdiff(a, b)
+        total += float(np.sum(cv2.multiply(diff, diff), dtype=np.float64))
+    return total / reference.size
+
+def psnr_from_mse(mse):
+    """PSNR em dB para intensidades em [0, 1] (infinito se as imagens são iguais)"""
+    if mse <= 0:
+        return math.inf
+    return 10.0 * math.log10(1.0 / mse)
+
+def structural_similarity(reference, image, sigma=1.5, window_size=11, strip_height=1024):
+    """
+    SSIM médio entre duas imagens em tons de cinza (intensidades normalizadas em [0, 1])
+    As médias locais usam o filtro gaussiano separável do OpenCV em float32; a imagem é
+    processada em faixas com meia janela de contexto, então o resultado não depende do
+    tamanho da faixa
+    """
+    c1 = (SSIM_K1 * 1.0) ** 2
+    c2 = (SSIM_K2 * 1.0) ** 2
+    height = reference.shape[0]
+    margin = window_size // 2
+    ksize = (window_size, window_size)
+    total = 0.0
+
+    for y0 in range(0, height, strip_height):
+        y1 = min(height, y0 + strip_height)
+        top = max(0, y0 - margin)
+        bottom = min(height, y1 + margin)
+        a = convert_depth(reference[top:bottom], np.float32)
+        b = convert_depth(image[top:bottom], np.float32)
+
+        blur = lambda x: cv2.GaussianBlur(x, ksize, sigma, borderType=cv2.BORDER_REFLECT)
+        mu_a = blur(a)
+        mu_b = blur(b)
+        mu_a2 = mu_a * mu_a
+        mu_b2 = mu_b * mu_b
+        mu_ab = mu_a * mu_b
+        var_a = blur(a * a) - mu_a2
+        var_b = blur(b * b) - mu_b2
+        cov = blur(a * b) - mu_ab
+
+        ssim_map = ((2 * mu_ab + c1) * (2 * cov + c2)) / ((mu_a2 + mu_b2 + c1) * (var_a + var_b + c2))
+        # Só as linhas da própria faixa (o contexto pertence às faixas vizinhas)
+        total += float(np.sum(ssim_map[y0 - top:y1 - top], dtype=np.float64))
+
+    return total / (reference.shape[0] * reference.shape[1])
+
+class QualityMetrics:
+    """
+    Calcula MSE, PSNR e SSIM entre a original e a imagem processada, guardando o
+    resultado por versão das imagens. O Model sempre troca o array a cada operação,
+    então a identidade dos arrays identifica a versão
+    """
+
+    def __init__(self, strip_height=1024):
+        self.strip_height = strip_height
+        self._key = None
+        self._metrics = None
+
+    def _is_cached(self, original, image):
+        if self._key is None:
+            return False
+        cached_original, cached_image = (ref() for ref in self._key)
+        return cached_original is original and cached_image is image
+
+    def compute(self, original, image):
+        """
+        Retorna um dicionário com 'mse' (na faixa do tipo da original), 'psnr' (dB) e 'ssim',
+        ou None se as imagens não existem ou têm tamanhos diferentes
+        """
+        if original is None or image is None or original.shape[:2] != image.shape[:2]:
+            return None
+        if self._is_cached(original, image):
+            return self._metrics
+
+        # Imagens com 1 e 3 canais (ou profundidades diferentes) são comparadas normalizadas
+        reference, processed = original, image
+        if reference.shape != processed.shape:
+            reference, processed = to_gray(reference), to_gray(processed)
+        mse = mean_squared_error(reference, processed, self.strip_height)
+        metrics = {
+            "mse": mse * dtype_max(original.dtype) ** 2,
+            "psnr": psnr_from_mse(mse),
+            "ssim": structural_similarity(to_gray(original), to_gray(image), strip_height=self.strip_height),
+        }
+        # weakref: o cache não mantém vivas versões antigas das imagens
+        self._key = (weakref.ref(original), weakref.ref(image))
+        self._metrics = metrics
+        return metrics
+
+def format_metrics(metrics):
+    """Texto curto com as métricas (para o painel e o PDF)"""
+    if metrics is None:
+        return "MSE: - | PSNR: - | SSIM: -"
+    psnr = "∞" if math.isinf(metrics["psnr"]) else f"{metrics['psnr']:.2f} dB"
+    return f"MSE: {metrics['mse']:.4g} | PSNR: {psnr} | SSIM: {metrics['ssim']:.4f}"
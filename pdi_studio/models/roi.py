@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+class Roi:
+    """
+    Região de interesse: um retângulo (x, y, largura, altura) e, opcionalmente, um
+    polígono que define uma máscara dentro dele. As operações trabalham em uma view
+    (sem cópia) do retângulo e, com polígono, só alteram os pixels da máscara
+    """
+
+    def __init__(self, x, y, width, height, polygon=None):
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+        # Vértices (x, y) em coordenadas da imagem inteira
+        self.polygon = [(int(px), int(py)) for px, py in polygon] if polygon else None
+        self._mask = None
+
+    @classmethod
+    def from_points(cls, points):
+        """Retângulo a partir de dois cantos opostos [(x0, y0), (x1, y1)] (inclusivos)"""
+        (x0, y0), (x1, y1) = points
+        left, right = sorted((int(x0), int(x1)))
+        top, bottom = sorted((int(y0), int(y1)))
+        return cls(left, top, right - left + 1, bottom - top + 1)
+
+    @classmethod
+    def from_polygon(cls, polygon):
+        """ROI com máscara poligonal; o retângulo é a caixa envolvente dos vértices"""
+        points = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        x, y, width, height = cv2.boundingRect(points)
+        return cls(x, y, width, height, polygon=points.tolist())
+
+    @classmethod
+    def from_params(cls, params):
+        """Recria a ROI a partir de to_params (histórico e arquivos de sessão)"""
+        return cls(*params["rect"], polygon=params.get("polygon"))
+
+    def to_params(self):
+        """Parâmetros serializáveis em JSON"""
+        return {"rect": (self.x, self.y, self.width, self.height), "polygon": self.polygon}
+
+    def clip(self, shape):
+        """ROI recortada aos limites da imagem (None se ficar vazia)"""
+        height, width = shape[:2]
+        x0, y0 = max(0, self.x), max(0, self.y)
+        x1, y1 = min(width, self.x + self.width), min(height, self.y + self.height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        if (x0, y0, x1 - x0, y1 - y0) == (self.x, self.y, self.width, self.height):
+            return self
+        return Roi(x0, y0, x1 - x0, y1 - y0, polygon=self.polygon)
+
+    def slices(self):
+        """Fatias (linhas, colunas) do retângulo"""
+        return slice(self.y, self.y + self.height), slice(self.x, self.x + self.width)
+
+    def view(self, image):
+        """View do retângulo na imagem (não copia)"""
+        rows, columns = self.slices()
+        return image[rows, columns]
+
+    def mask(self):
+        """Máscara booleana no tamanho do retângulo (None se a ROI não tem polígono)"""
+        if self.polygon is None:
+            return None
+        if self._mask is None:
+            canvas = np.zeros((self.height, self.width), dtype=np.uint8)
+            points = np.asarray(self.polygon, dtype=np.int32) - (self.x, self.y)
+            cv2.fillPoly(canvas, [points], 1)
+            self._mask = canvas.astype(bool)
+        return self._mask
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+    def outline(self):
+        """Contorno em coordenadas da imagem (polígono ou os quatro cantos do retângulo)"""
+        if self.polygon is not None:
+            return list(self.polygon)
+        x1, y1 = self.x + self.width - 1, self.y + self.height - 1
+        return [(self.x, self.y), (x1, self.y), (x1, y1), (self.x, y1)]
+
+    def describe(self):
+        """Texto curto para o log"""
+        kind = f"polígono de {len(self.polygon)} vértices em " if self.polygon else ""
+        return f"{kind}{self.width}x{self.height} em ({self.x}, {self.y})"
@@ -0,0 +1,375 @@
+import asyncio
+import functools
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from models.image_writer import encode_image, write_image
+from models.model import Model
+from models.pdf_exporter import PDFExporter
+from models.roi import Roi
+from models.utils import normalize_loaded_image
+
+# Conversões de espaço de cor disponíveis em Session.convert
+CONVERSIONS = {
+    "rgb": "convert_to_rgb",
+    "rgba": "convert_to_rgba",
+    "l": "convert_to_l",
+    "hsv": "convert_to_hsv",
+    "cmyk": "convert_to_cmyk",
+    "lab": "convert_to_lab",
+}
+
+# O pyplot guarda estado global: exportações de PDF de sessões diferentes não podem se misturar
+_pdf_lock = threading.Lock()
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+def get_default_executor():
+    """Pool de threads compartilhado pelas variantes assíncronas (o OpenCV libera o GIL)"""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                   thread_name_prefix="pdi_session")
+        return _default_executor
+
+def shutdown_default_executor(wait=True):
+    """Encerra o pool compartilhado (um novo é criado se for usado de novo)"""
+    global _default_executor
+    with _default_executor_lock:
+        executor, _default_executor = _default_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def _locked(method):
+    """Serializa as chamadas de uma mesma sessão (sessões diferentes rodam em paralelo)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class Session:
+    """
+    Uso do PDI Studio sem interface gráfica: uma imagem (um Model) manipulada por arrays
+    NumPy e bytes, sem Tk, filedialog ou messagebox. Erros viram exceções.
+    Cada operação retorna a imagem BGR resultante. Os métodos terminados em _async rodam a
+    operação em um executor, sem bloquear o loop do asyncio; chamadas na mesma sessão são
+    executadas uma por vez, e sessões diferentes processam em paralelo
+
+        session = Session.from_bytes(data)
+        session.equalize()
+        session.multi_otsu(3)
+        png = session.to_bytes(".png")
+
+        results = await asyncio.gather(*(process(data) for data in images))
+    """
+
+    def __init__(self, image=None, executor=None):
+        """
+        image: array BGR, cinza ou BGRA (uint8, uint16 ou float32), opcional
+        executor: executor das variantes assíncronas (None = pool compartilhado)
+        """
+        self.model = Model()
+        self.pdf_exporter = PDFExporter()
+        self.executor = executor
+        self._lock = threading.RLock()
+        if image is not None:
+            self.load_array(image)
+
+    # ========== Entrada e saída ==========
+    @classmethod
+    def from_array(cls, image, executor=None):
+        return cls(image, executor=executor)
+
+    @classmethod
+    def from_bytes(cls, data, executor=None):
+        session = cls(executor=executor)
+        session.load_bytes(data)
+        return session
+
+    @classmethod
+    def from_path(cls, path, executor=None):
+        session = cls(executor=executor)
+        session.load_path(path)
+        return session
+
+    @_locked
+    def load_array(self, image):
+        """Usa um array como nova original (copiado; o histórico recomeça)"""
+        image = normalize_loaded_image(np.asarray(image))
+        if image is None:
+            raise ValueError("Imagem vazia")
+        return self.model.set_original(np.array(image, copy=True))
+
+    def load_bytes(self, data):
+        """Decodifica um arquivo de imagem em memória (PNG, JPEG, TIFF...) e o usa como original"""
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError("Não foi possível decodificar a imagem")
+        return self.load_array(image)
+
+    @_locked
+    def load_path(self, path):
+        """Carrega uma imagem do disco"""
+        # np.fromfile + imdecode também aceita caminhos com acentos no Windows
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"Não foi possível ler a imagem: {path}")
+        return self.load_array(image)
+
+    @_locked
+    def open_session(self, path):
+        """
+        Reabre um arquivo de sessão (.pdis), mapeado em memória; uma imagem atual binária só é
+        desempacotada no primeiro acesso a image
+        """
+        self.model.load_session(path)
+
+    @_locked
+    def save_session(self, path):
+        """Grava a sessão (.pdis) para reabrir sem decodificar nem reprocessar"""
+        self._require_image()
+        return self.model.save_session(path)
+
+    @_locked
+    def to_bytes(self, extension=".png", options=None, max_size=None):
+        """Codifica a imagem atual em memória; options: ver image_writer.DEFAULT_OPTIONS"""
+        self._require_image()
+        extension = extension if extension.startswith(".") else "." + extension
+        return encode_image(self.model.image, extension.lower(), options, max_size).tobytes()
+
+    @_locked
+    def save(self, path, options=None, max_size=None):
+        """Grava a imagem atual (de forma atômica). Retorna o caminho"""
+        self._require_image()
+        return write_image(self.model.image, path, options, max_size)
+
+    @_locked
+    def export_pdf(self, path=None, options=None, metrics=True):
+        """
+        Gera o relatório em PDF (mesmo conteúdo da exportação da interface)
+        path: arquivo de destino; None retorna os bytes do PDF
+        metrics: inclui MSE/PSNR/SSIM na primeira página
+        """
+        self._require_image()
+        model = self.model
+        target = io.BytesIO() if path is None else path
+        with _pdf_lock:
+            ok = self.pdf_exporter.export_to_pdf(
+                model.original, model.image,
+                equalized_image=model.equalized_image,
+                output_path=target,
+                bins=model.get_histogram_bins(),
+                options=options,
+                metrics=model.get_quality_metrics() if metrics else None,
+                components=model.current_components(),
+            )
+        if not ok:
+            raise RuntimeError("Não foi possível exportar o PDF")
+        return target.getvalue() if path is None else path
+
+    # ========== Estado ==========
+    @property
+    def image(self):
+        """Imagem atual (BGR, somente leitura)"""
+        return self.model.export_image()
+
+    @property
+    def original(self):
+        return self.model.original
+
+    @property
+    def history(self):
+        """Operações aplicadas desde a original, no formato aceito por apply_steps"""
+        return list(self.model.op_log)
+
+    def _require_image(self):
+        if self.model.image is None:
+            raise ValueError("Nenhuma imagem carregada")
+
+    def _run(self, model_method, *args, **kwargs):
+        self._require_image()
+        result = getattr(self.model, model_method)(*args, **kwargs)
+        if result is None:
+            raise RuntimeError(f"A operação {model_method} falhou")
+        # A imagem sai da sessão como view somente leitura: uma ROI seguinte só copia a
+        # imagem inteira se essa view (ou algo derivado dela) ainda existir
+        if isinstance(result, tuple):
+            return (self.model.export_image(),) + result[1:]
+        return self.model.export_image()
+
+    # ========== Operações ==========
+    @_locked
+    def reset(self):
+        """Volta para a original"""
+        return self._run("reset_image")
+
+    @_locked
+    def gray(self):
+        return self._run("convert_to_gray")
+
+    @_locked
+    def equalize(self, method="global", color_space=None, clip_limit=2.0, tile_grid=(8, 8)):
+        """Equalização global ou CLAHE (ver Model.equalize_histogram)"""
+        return self._run("equalize_histogram", method=method, color_space=color_space,
+                         clip_limit=clip_limit, tile_grid=tile_grid)
+
+    @_locked
+    def brightness_contrast(self, brightness=0, contrast=1.0, apply_to_current=True):
+        """
+        Brilho/contraste. Diferente dos sliders da interface, o padrão é aplicar sobre a
+        imagem atual (apply_to_current=False parte da original e recomeça o histórico)
+        """
+        return self._run("adjust_brightness_contrast", brightness, contrast, apply_to_current)
+
+    @_locked
+    def threshold(self, value=127):
+        """Limiarização global"""
+        return self._run("apply_global_threshold", value)
+
+    @_locked
+    def multithreshold(self, num_tones):
+        """Limiarização multissegmentada com níveis igualmente espaçados"""
+        return self._run("apply_multithreshold", num_tones)
+
+    @_locked
+    def otsu(self):
+        return self._run("apply_otsu_threshold")
+
+    @_locked
+    def multi_otsu(self, num_thresholds=2):
+        """Otsu multinível; os limiares encontrados ficam em self.model.last_thresholds"""
+        return self._run("apply_multi_otsu", num_thresholds)
+
+    @_locked
+    def adaptive_threshold(self, method="sauvola", window_size=25, k=None):
+        return self._run("apply_adaptive_threshold", method=method, window_size=window_size, k=k)
+
+    @_locked
+    def filter(self, method="gaussian", **params):
+        """Filtro espacial: suavização, nitidez, bordas ou kernel (ver FilterModel.METHODS)"""
+        return self._run("apply_filter", method, **params)
+
+    @_locked
+    def morphology(self, operation, size=3, shape="rect"):
+        """Morfologia binária: 'erode', 'dilate', 'open', 'close' ou 'fill_holes' (ver BinaryImage)"""
+        return self._run("apply_morphology", operation, size, shape)
+
+    @_locked
+    def crop(self, x, y, width, height):
+        """Recorte (view sem cópia); as operações seguintes processam só a região recortada"""
+        return self._run("crop_image", x, y, width, height)
+
+    @_locked
+    def flip(self, axis="horizontal"):
+        """Espelhamento: 'horizontal', 'vertical' ou 'both'"""
+        return self._run("flip_image", axis)
+
+    @_locked
+    def rotate(self, angle=90, interpolation="linear", expand=True):
+        """Rotação anti-horária em graus (múltiplos de 90° são exatos)"""
+        return self._run("rotate_image", angle, interpolation, expand)
+
+    @_locked
+    def resize(self, width=None, height=None, scale=None, interpolation=None):
+        """Redimensionamento por tamanho ou escala (ver Model.resize_image)"""
+        return self._run("resize_image", width, height, scale, interpolation)
+
+    @_locked
+    def convert(self, color_space):
+        """Conversão de espaço de cor: uma das chaves de CONVERSIONS"""
+        if color_space not in CONVERSIONS:
+            raise ValueError(f"Conversão desconhecida: {color_space}")
+        return self._run(CONVERSIONS[color_space])
+
+    @_locked
+    def apply_steps(self, steps):
+        """
+        Aplica operações no formato do histórico [(nome, parâmetros), ...], com as
+        operações pontuais consecutivas fundidas em uma LUT. Retorna a imagem
+        """
+        self._require_image()
+        return self._run("apply_steps", steps)[0]
+
+    @_locked
+    def set_roi(self, roi):
+        """
+        Restringe as operações seguintes a uma região: Roi, (x, y, largura, altura),
+        lista de vértices [(x, y), ...] ou None (imagem inteira)
+        """
+        if roi is not None and not isinstance(roi, Roi):
+            if len(roi) == 4 and all(np.isscalar(value) for value in roi):
+                roi = Roi(*roi)
+            else:
+                roi = Roi.from_polygon(roi)
+        return self.model.set_roi(roi)
+
+    @_locked
+    def clear_roi(self):
+        self.model.clear_roi()
+
+    # ========== Análise ==========
+    @_locked
+    def histograms(self, bins=None):
+        """(histograma da original, histograma da imagem atual ou equalizada)"""
+        return self.model.get_histograms(bins)
+
+    @_locked
+    def color_histograms(self, color_space="hsv", **kwargs):
+        """Histogramas de um espaço de cor e 2D (ver Model.get_color_histograms)"""
+        self._require_image()
+        return self.model.get_color_histograms(color_space, **kwargs)
+
+    @_locked
+    def components(self, connectivity=8, min_area=1):
+        """
+        Componentes conectados da imagem binária atual (ComponentTable: área, caixa e
+        centroide; .to_csv(caminho) grava a tabela). A análise também entra no export_pdf
+        """
+        self._require_image()
+        return self.model.analyze_components(connectivity, min_area)
+
+    @_locked
+    def metrics(self):
+        """MSE, PSNR e SSIM entre a original e a imagem atual"""
+        return self.model.get_quality_metrics()
+
+    # ========== Variantes assíncronas ==========
+    async def run_async(self, name, *args, **kwargs):
+        """Executa qualquer método público da sessão no executor: await session.run_async('otsu')"""
+        if name.startswith("_") or name.endswith("_async") or not callable(getattr(self, name, None)):
+            raise ValueError(f"Método desconhecido: {name}")
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(self, name), *args, **kwargs)
+        return await loop.run_in_executor(self.executor or get_default_executor(), call)
+
+    async def load_bytes_async(self, data):
+        return await self.run_async("load_bytes", data)
+
+    async def to_bytes_async(self, extension=".png", options=None, max_size=None):
+        return await self.run_async("to_bytes", extension, options, max_size)
+
+    async def apply_steps_async(self, steps):
+        return await self.run_async("apply_steps", steps)
+
+    async def export_pdf_async(self, path=None, options=None, metrics=True):
+        return await self.run_async("export_pdf", path, options, metrics)
+
+    async def metrics_async(self):
+        return await self.run_async("metrics")
+
+async def process_bytes_async(data, steps, extension=".png", options=None, executor=None):
+    """
+    Decodifica, aplica as operações e codifica uma imagem sem bloquear o loop
+    steps: operações no formato do histórico [(nome, parâmetros), ...]
+    Retorna os bytes do resultado. Para vários arquivos: asyncio.gather(...)
+    """
+    session = Session(executor=executor)
+    await session.load_bytes_async(data)
+    await session.apply_steps_async(steps)
+    return await session.to_bytes_async(extension, options)
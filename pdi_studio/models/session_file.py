@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import numpy as np
+from models.utils import match_file_mode
+
+# Formato do arquivo de sessão (.pdis):
+#   MAGIC (8 bytes) | tamanho do cabeçalho (uint64, little-endian) | cabeçalho JSON
+#   seguido dos arrays sem compressão, cada um começando em um múltiplo de ALIGNMENT.
+# O cabeçalho guarda dtype, forma e posição de cada array, então reabrir é só mapear o
+# arquivo (np.memmap): nada é decodificado nem recalculado e as páginas são lidas sob demanda
+SESSION_MAGIC = b"PDISESS1"
+SESSION_VERSION = 1
+SESSION_EXTENSION = ".pdis"
+# Alinhamento em páginas: cada array mapeado começa no início de uma página
+ALIGNMENT = 4096
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _encode_value(value):
+    """Converte parâmetros para JSON, marcando tuplas (ex.: tile_grid) para restaurá-las"""
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode_value(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode_value(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if set(value) == {"__tuple__"}:
+            return tuple(_decode_value(v) for v in value["__tuple__"])
+        return {k: _decode_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    return value
+
+def _build_header(arrays, metadata, data_start):
+    """
+    Cabeçalho com a posição de cada array a partir de data_start
+    Arrays repetidos (o mesmo objeto em dois nomes) são gravados uma única vez
+    """
+    entries = {}
+    blocks = []
+    written = {}
+    offset = data_start
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        if id(array) in written:
+            entries[name] = dict(entries[written[id(array)]])
+            continue
+        offset = _align(offset)
+        entries[name] = {
+            "dtype": np.dtype(array.dtype).str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        written[id(array)] = name
+        blocks.append((offset, array))
+        offset += array.nbytes
+    header = {
+        "version": SESSION_VERSION,
+        "arrays": entries,
+        "metadata": _encode_value(metadata),
+    }
+    return header, blocks
+
+def write_session(path, arrays, metadata=None):
+    """
+    Grava uma sessão de forma atômica (arquivo temporário + renomear)
+    arrays: dicionário nome -> ndarray (ou None, que não é gravado)
+    metadata: dicionário serializável em JSON (tuplas e escalares NumPy são aceitos)
+    Retorna o caminho gravado
+    """
+    metadata = metadata or {}
+    # O tamanho do cabeçalho depende das posições, que dependem do tamanho do cabeçalho:
+    # calcular uma vez e, se crescer, recalcular com o novo início dos dados
+    data_start = ALIGNMENT
+    while True:
+        header, blocks = _build_header(arrays, metadata, data_start)
+        encoded = json.dumps(header).encode("utf-8")
+        prefix = len(SESSION_MAGIC) + 8 + len(encoded)
+        if prefix <= data_start:
+            break
+        data_start = _align(prefix)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".pdi_", suffix=SESSION_EXTENSION + ".tmp")
+    try:
+        with os.fdopen(fd, "wb") as session_file:
+            session_file.write(SESSION_MAGIC)
+            session_file.write(np.uint64(len(encoded)).astype("<u8").tobytes())
+            session_file.write(encoded)
+            for offset, array in blocks:
+                session_file.seek(offset)
+                # Grava direto do buffer do array (sem cópia quando já é contíguo)
+                session_file.write(memoryview(np.ascontiguousarray(array)).cast("B"))
+            # Garante o tamanho total mesmo que o último array esteja vazio
+            session_file.truncate(max(data_start, max((o + a.nbytes for o, a in blocks), default=0)))
+            session_file.flush()
+            os.fsync(session_file.fileno())
+            match_file_mode(session_file.fileno(), path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+def read_header(path):
+    """Lê e valida o cabeçalho de uma sessão"""
+    with open(path, "rb") as session_file:
+        magic = session_file.read(len(SESSION_MAGIC))
+        if magic != SESSION_MAGIC:
+            raise ValueError(f"{path} não é um arquivo de sessão do PDI Studio")
+        length = int(np.frombuffer(session_file.read(8), dtype="<u8")[0])
+        header = json.loads(session_file.read(length).decode("utf-8"))
+    if header.get("version") != SESSION_VERSION:
+        raise ValueError(f"Versão de sessão não suportada: {header.get('version')}")
+    return header
+
+def read_session(path, mode="c"):
+    """
+    Abre uma sessão mapeando os arrays do arquivo (sem ler os pixels)
+    mode: modo do np.memmap; 'c' (cópia na escrita) deixa alterar os arrays sem mudar o arquivo
+    Retorna (dicionário nome -> memmap, metadata). Nomes gravados como o mesmo array
+    voltam como o mesmo objeto
+    """
+    header = read_header(path)
+    arrays = {}
+    by_offset = {}
+    for name, entry in header["arrays"].items():
+        key = (entry["offset"], entry["dtype"], tuple(entry["shape"]))
+        if key not in by_offset:
+            shape = tuple(entry["shape"])
+            if int(np.prod(shape)) == 0:
+                # mmap não aceita regiões vazias
+                by_offset[key] = np.empty(shape, dtype=np.dtype(entry["dtype"]))
+            else:
+                by_offset[key] = np.memmap(path, dtype=np.dtype(entry["dtype"]), mode=mode,
+                                           offset=entry["offset"], shape=shape)
+        arrays[name] = by_offset[key]
+    return arrays, _decode_value(header["metadata"])
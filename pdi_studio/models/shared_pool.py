@@ -0,0 +1,180 @@
+import os
+import sys
+import threading
+import weakref
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from models.utils import to_gray
+
+# Arrays criados em memória compartilhada: id(array) -> (weakref do array, SharedMemory)
+_shared_buffers = {}
+_shared_lock = threading.Lock()
+
+def shared_empty(shape, dtype):
+    """
+    Cria um array NumPy cujo buffer fica em multiprocessing.shared_memory.
+    O segmento é liberado automaticamente quando o array (e suas views) deixa de existir
+    """
+    dtype = np.dtype(dtype)
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    key = id(array)
+    with _shared_lock:
+        _shared_buffers[key] = (weakref.ref(array), shm)
+    weakref.finalize(array, _release_shared, key, shm)
+    return array
+
+def shared_copy(array):
+    """Copia um array para a memória compartilhada"""
+    shared = shared_empty(array.shape, array.dtype)
+    shared[...] = array
+    return shared
+
+def shared_descriptor(array):
+    """
+    Descritor (nome, forma, dtype) de um array em memória compartilhada,
+    ou None se o array não for um buffer compartilhado criado por shared_empty
+    """
+    with _shared_lock:
+        entry = _shared_buffers.get(id(array))
+    if entry is None or entry[0]() is not array:
+        return None
+    return entry[1].name, array.shape, array.dtype.str
+
+def _release_shared(key, shm):
+    with _shared_lock:
+        _shared_buffers.pop(key, None)
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+# ========== Lado do worker ==========
+def _attach(descriptor):
+    """Abre (no worker) o segmento descrito e retorna (SharedMemory, array)"""
+    name, shape, dtype = descriptor
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        # Antes do 3.13, anexar também registra o segmento no resource_tracker, que o
+        # removeria quando o worker terminasse; o dono do segmento é o processo principal
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+def _strip_gray(src, dst, params):
+    """Tons de cinza replicados nos 3 canais"""
+    dst[...] = to_gray(src)[:, :, None]
+
+def _strip_multithreshold(src, dst, params):
+    """Limiarização multissegmentada: cada pixel recebe o nível do seu intervalo"""
+    gray = to_gray(src)
+    levels = np.asarray(params["levels"], dtype=dst.dtype)
+    index = np.searchsorted(np.asarray(params["thresholds"]), gray, side="right")
+    dst[...] = levels[index][:, :, None]
+
+def _strip_cmyk_roundtrip(src, dst, params):
+    """Ida e volta RGB→CMYK→RGB com as mesmas fórmulas do PIL (K = 0)"""
+    max_value = params["max_value"]
+    cmy = max_value - src.astype(np.float32)
+    dst[...] = np.clip(max_value - np.minimum(max_value, cmy), 0, max_value).astype(dst.dtype)
+
+# Operações que podem ser executadas por faixas no pool
+STRIP_OPERATIONS = {
+    "gray": _strip_gray,
+    "multithreshold": _strip_multithreshold,
+    "cmyk_roundtrip": _strip_cmyk_roundtrip,
+}
+
+def _run_strip(operation, src_descriptor, dst_descriptor, y0, y1, params):
+    """Executa uma operação nas linhas [y0, y1), escrevendo direto no buffer de saída"""
+    src_shm, src = _attach(src_descriptor)
+    dst_shm, dst = _attach(dst_descriptor)
+    try:
+        STRIP_OPERATIONS[operation](src[y0:y1], dst[y0:y1], params)
+    finally:
+        # Soltar as views antes de fechar os segmentos
+        del src, dst
+        src_shm.close()
+        dst_shm.close()
+    return y1 - y0
+
+# ========== Lado do processo principal ==========
+class SharedMemoryPool:
+    """
+    Pool persistente de processos para operações pesadas em NumPy (que seguram o GIL).
+    Entrada e saída ficam em memória compartilhada; para os workers só vão descritores
+    (nome do segmento, forma, dtype e intervalo de linhas)
+    """
+
+    def __init__(self, max_workers=None, strip_height=512):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.strip_height = strip_height
+        self._executor = None
+
+    def _get_executor(self):
+        # Criado no primeiro uso; 'spawn' evita fork de um processo com Tk e threads ativas
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def run(self, operation, image, out_shape=None, out_dtype=None, params=None):
+        """
+        Executa uma operação registrada em STRIP_OPERATIONS, em faixas de linhas paralelas
+        image: array de entrada (se já estiver em memória compartilhada, não é copiado)
+        out_shape / out_dtype: forma e tipo da saída (padrão: os da entrada)
+        Retorna a saída, alocada em memória compartilhada (pode ser reutilizada sem cópia)
+        """
+        if operation not in STRIP_OPERATIONS:
+            raise ValueError(f"Operação desconhecida: {operation}")
+
+        source = image if shared_descriptor(image) is not None else shared_copy(np.ascontiguousarray(image))
+        output = shared_empty(out_shape or image.shape, out_dtype or image.dtype)
+        src_descriptor = shared_descriptor(source)
+        dst_descriptor = shared_descriptor(output)
+
+        height = image.shape[0]
+        # Pelo menos uma faixa por worker, sem faixas menores que strip_height
+        rows = max(self.strip_height, -(-height // self.max_workers))
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_run_strip, operation, src_descriptor, dst_descriptor,
+                            y0, min(height, y0 + rows), params or {})
+            for y0 in range(0, height, rows)
+        ]
+        for future in futures:
+            future.result()
+        return output
+
+    def shutdown(self):
+        """Encerra os processos do pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+_default_pool = None
+
+def get_default_pool():
+    """Pool compartilhado por todos os documentos (criado no primeiro uso)"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SharedMemoryPool()
+    return _default_pool
+
+def shutdown_default_pool():
+    """Encerra o pool padrão, se ele tiver sido criado"""
+    global _default_pool
+    if _default_pool is not None:
+        _default_pool.shutdown()
+        _default_pool = None
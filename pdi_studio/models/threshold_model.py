@@ -0,0 +1,190 @@
+import cv2
+import numpy as np
+from models.utils import dtype_max
+
+class ThresholdModel:
+    """Limiarização adaptativa (imagens integrais) e cálculo de limiares a partir do histograma"""
+
+    # Métodos suportados e seus valores padrão de k
+    METHODS = {
+        "mean": 0.0,
+        "niblack": -0.2,
+        "sauvola": 0.34,
+    }
+
+    def __init__(self, strip_height=1024):
+        # Altura (em linhas) de cada faixa horizontal processada por vez
+        self.strip_height = strip_height
+
+    def adaptive_threshold(self, gray, method="sauvola", window_size=25, k=None, offset=0.0, dynamic_range=None):
+        """
+        Aplica limiarização adaptativa em uma imagem em tons de cinza
+        gray: imagem em tons de cinza (2D)
+        method: 'mean', 'niblack' ou 'sauvola'
+        window_size: lado da janela local (ímpar, em pixels)
+        k: fator de sensibilidade do método (usa o padrão do método se None)
+        offset: constante subtraída do limiar (usada pelo método 'mean')
+        dynamic_range: faixa dinâmica do desvio padrão no Sauvola (metade do valor máximo se None)
+        Retorna uma imagem binária uint8 (0 ou 255)
+        """
+        if gray is None:
+            return None
+        if method not in self.METHODS:
+            raise ValueError(f"Método de limiarização desconhecido: {method}")
+
+        if k is None:
+            k = self.METHODS[method]
+        if dynamic_range is None:
+            dynamic_range = dtype_max(gray.dtype) / 2.0
+
+        window_size = self.normalize_window_size(window_size)
+        half = window_size // 2
+
+        height = gray.shape[0]
+        result = np.empty(gray.shape[:2], dtype=np.uint8)
+
+        # Processar em faixas horizontais para limitar a memória usada em imagens grandes
+        for y0 in range(0, height, self.strip_height):
+            y1 = min(height, y0 + self.strip_height)
+            mean, std = self._local_statistics(gray, y0, y1, half)
+            threshold = self._compute_threshold(method, mean, std, k, offset, dynamic_range)
+            strip = gray[y0:y1]
+            result[y0:y1] = np.where(strip > threshold, 255, 0).astype(np.uint8)
+
+        return result
+
+    def otsu_threshold(self, hist):
+        """
+        Calcula o limiar de Otsu a partir de um histograma (qualquer número de bins)
+        Retorna o índice do bin: pixels com bin > índice pertencem ao primeiro plano
+        """
+        hist = np.asarray(hist, dtype=np.float64).ravel()
+        total = hist.sum()
+        if total == 0:
+            return 0
+
+        levels = np.arange(len(hist), dtype=np.float64)
+        # Momentos cumulativos de ordem zero e um
+        weight = np.cumsum(hist)
+        moment = np.cumsum(hist * levels)
+        total_moment = moment[-1]
+
+        weight_fg = total - weight
+        valid = (weight > 0) & (weight_fg > 0)
+        if not np.any(valid):
+            return 0
+
+        # Variância entre classes para cada limiar candidato
+        between = np.zeros_like(weight)
+        mean_bg = moment[valid] / weight[valid]
+        mean_fg = (total_moment - moment[valid]) / weight_fg[valid]
+        between[valid] = weight[valid] * weight_fg[valid] * (mean_bg - mean_fg) ** 2
+        return int(np.argmax(between))
+
+    def multi_otsu_thresholds(self, hist, num_thresholds=2):
+        """
+        Otsu multinível: limiares que maximizam a variância entre classes
+        hist: histograma (qualquer número de bins, normalmente 256)
+        num_thresholds: número de limiares (num_thresholds + 1 classes)
+        Usa tabelas de momentos cumulativos (cada classe [a, b) vale S²/P, com P e S obtidos
+        por diferença das somas cumulativas) e programação dinâmica sobre os bins; o custo
+        depende só do número de bins, não do tamanho da imagem
+        Retorna a lista crescente de índices: o bin i vai para a classe k se
+        limiar[k-1] < i <= limiar[k] (mesma convenção de otsu_threshold)
+        """
+        hist = np.asarray(hist, dtype=np.float64).ravel()
+        bins = len(hist)
+        num_thresholds = int(num_thresholds)
+        if num_thresholds < 1 or num_thresholds >= bins:
+            raise ValueError(f"Número de limiares inválido: {num_thresholds}")
+
+        # Momentos cumulativos de ordem zero e um, com um zero à frente: a classe com os
+        # bins [a, b) tem peso P[b] - P[a] e momento S[b] - S[a]
+        weight = np.concatenate(([0.0], np.cumsum(hist)))
+        moment = np.concatenate(([0.0], np.cumsum(hist * np.arange(bins, dtype=np.float64))))
+        class_weight = weight[None, :] - weight[:, None]
+        class_moment = moment[None, :] - moment[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(class_weight > 0, class_moment ** 2 / class_weight, 0.0)
+        # Só classes não vazias em bins (a < b)
+        score[np.tril_indices(bins + 1)] = -np.inf
+
+        # best[b]: melhor soma para dividir os bins [0, b) em k classes
+        best = score[0].copy()
+        choices = []
+        for _ in range(num_thresholds):
+            candidates = best[:, None] + score
+            choices.append(np.argmax(candidates, axis=0))
+            best = candidates[choices[-1], np.arange(bins + 1)]
+
+        # Reconstruir os inícios das classes a partir do último bin
+        starts = []
+        end = bins
+        for choice in reversed(choices):
+            end = int(choice[end])
+            starts.append(end)
+        return [start - 1 for start in reversed(starts)]
+
+    def normalize_window_size(self, window_size):
+        """Garante que o tamanho da janela seja um inteiro ímpar >= 3"""
+        window_size = max(3, int(window_size))
+        if window_size % 2 == 0:
+            window_size += 1
+        return window_size
+
+    def _local_statistics(self, gray, y0, y1, half):
+        """
+        Calcula média e desvio padrão locais para as linhas [y0, y1)
+        usando imagens integrais (custo O(pixels), independente da janela)
+        """
+        height = gray.shape[0]
+
+        # Linhas de contexto acima e abaixo da faixa (quando existirem)
+        top = max(0, y0 - half)
+        bottom = min(height, y1 + half)
+        region = gray[top:bottom]
+
+        # Completar a borda replicando os pixels das extremidades
+        padded = cv2.copyMakeBorder(
+            region,
+            half - (y0 - top),
+            half - (bottom - y1),
+            half,
+            half,
+            cv2.BORDER_REPLICATE
+        )
+
+        # Imagens integrais da soma e da soma dos quadrados
+        integral, sq_integral = cv2.integral2(padded, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+        window = 2 * half + 1
+        rows = y1 - y0
+        cols = gray.shape[1]
+        area = float(window * window)
+
+        window_sum = self._window_sum(integral, rows, cols, window)
+        window_sq_sum = self._window_sum(sq_integral, rows, cols, window)
+
+        mean = window_sum / area
+        variance = window_sq_sum / area - mean * mean
+        np.maximum(variance, 0, out=variance)
+        return mean, np.sqrt(variance)
+
+    def _window_sum(self, integral, rows, cols, window):
+        """Soma dos pixels em cada janela a partir da imagem integral"""
+        return (
+            integral[window:window + rows, window:window + cols]
+            - integral[0:rows, window:window + cols]
+            - integral[window:window + rows, 0:cols]
+            + integral[0:rows, 0:cols]
+        )
+
+    def _compute_threshold(self, method, mean, std, k, offset, dynamic_range):
+        """Calcula o limiar local de acordo com o método escolhido"""
+        if method == "mean":
+            return mean - offset
+        if method == "niblack":
+            return mean + k * std - offset
+        # Sauvola
+        return mean * (1.0 + k * (std / dynamic_range - 1.0)) - offset
+
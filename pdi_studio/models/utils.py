@@ -0,0 +1,185 @@
+import importlib
+import os
+import shutil
+import tempfile
+import threading
+import cv2
+import numpy as np
+
+# Tipos de imagem mantidos sem conversão ao longo das operações
+SUPPORTED_DTYPES = (np.uint8, np.uint16, np.float32)
+
+# Máscara de permissões medida com um arquivo de teste, onde não há /proc (lida uma vez)
+_probed_umask = None
+
+def process_umask():
+    """
+    Máscara de permissões do processo, sem alterá-la: os.umask só permite ler trocando o
+    valor, o que afetaria arquivos criados ao mesmo tempo por outras threads
+    No Linux vem de /proc/self/status; nos demais, das permissões de um arquivo de teste
+    """
+    global _probed_umask
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    if _probed_umask is None:
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "umask")
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o777))
+            _probed_umask = 0o777 & ~os.stat(path).st_mode
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return _probed_umask
+
+def match_file_mode(fd, path):
+    """
+    Ajusta as permissões de um temporário de gravação atômica (mkstemp cria com 0600) antes
+    do os.replace: as do arquivo substituído, se existir, ou as de um arquivo novo (umask)
+    """
+    if not hasattr(os, "fchmod"):
+        return
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~process_umask()
+    os.fchmod(fd, mode)
+
+def dtype_max(dtype):
+    """Valor máximo da faixa de intensidades para o tipo (imagens float usam [0, 1])"""
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return float(np.iinfo(dtype).max)
+    return 1.0
+
+def default_histogram_bins(dtype):
+    """Número padrão de bins: um por nível em 8 e 16 bits, 4096 para float"""
+    dtype = np.dtype(dtype)
+    if dtype == np.uint8:
+        return 256
+    if dtype == np.uint16:
+        return 65536
+    return 4096
+
+def normalize_loaded_image(image):
+    """
+    Padroniza uma imagem lida com IMREAD_UNCHANGED para BGR de 3 canais,
+    preservando a profundidade (uint8, uint16 ou float32)
+    """
+    if image is None:
+        return None
+
+    # Tipos fora dos suportados viram float32 normalizado
+    if image.dtype not in SUPPORTED_DTYPES:
+        if np.issubdtype(image.dtype, np.integer):
+            image = image.astype(np.float32) / float(np.iinfo(image.dtype).max)
+        else:
+            image = image.astype(np.float32)
+
+    if len(image.shape) == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 1:
+        return cv2.cvtColor(image[:, :, 0], cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    return image
+
+def to_gray(image):
+    """Converte BGR para tons de cinza (mantém imagens que já são 2D)"""
+    if len(image.shape) == 2:
+        return image
+    if image.shape[2] == 1:
+        return image[:, :, 0]
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def compute_histogram(gray, bins=None, value_range=None):
+    """
+    Calcula o histograma de um canal
+    gray: imagem 2D (uint8, uint16 ou float32)
+    bins: número de bins (padrão: um por nível em tipos inteiros)
+    value_range: faixa (min, max) para imagens float (padrão: [0, 1])
+    Retorna um array float32 com `bins` posições
+    """
+    if bins is None:
+        bins = default_histogram_bins(gray.dtype)
+
+    if gray.dtype in (np.uint8, np.uint16):
+        # np.bincount conta todos os níveis em uma passada, sem ordenar
+        levels = int(np.iinfo(gray.dtype).max) + 1
+        counts = np.bincount(gray.ravel(), minlength=levels)
+        if bins != levels:
+            # Reagrupar níveis consecutivos em bins de mesma largura
+            edges = (np.arange(bins, dtype=np.int64) * levels) // bins
+            counts = np.add.reduceat(counts, edges)
+        return counts.astype(np.float32)
+
+    low, high = value_range if value_range is not None else (0.0, 1.0)
+    gray = gray.astype(np.float32, copy=False)
+    hist = cv2.calcHist([gray], [0], None, [bins], [low, high]).ravel()
+    # O limite superior do calcHist é exclusivo: pixels saturados (== high) vão para o último bin
+    hist[-1] += np.count_nonzero(gray >= high)
+    return hist
+
+def make_display_proxy(image, max_width, max_height):
+    """Reduz a imagem (INTER_AREA) para caber em max_width x max_height; não amplia"""
+    height, width = image.shape[:2]
+    ratio = min(max_width / width, max_height / height, 1.0)
+    if ratio >= 1.0:
+        return image
+    size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+def display_window(image, low_percentile=0.5, high_percentile=99.5):
+    """Calcula a janela (min, max) de exibição a partir dos percentis da imagem"""
+    low, high = np.percentile(image, (low_percentile, high_percentile))
+    if high <= low:
+        high = low + 1e-6
+    return float(low), float(high)
+
+def to_display_8bit(image, window=None):
+    """
+    Mapeia uma imagem de 16 bits ou float para 8 bits usando uma janela (min, max).
+    Deve ser chamada apenas no proxy de exibição, que é pequeno
+    """
+    if image.dtype == np.uint8:
+        return image
+    if window is None:
+        window = display_window(image)
+    low, high = window
+    scale = 255.0 / (high - low)
+    # convertScaleAbs satura em [0, 255]; valores abaixo da janela são cortados antes
+    shifted = np.maximum(image.astype(np.float32, copy=False), low)
+    return cv2.convertScaleAbs(shifted, alpha=scale, beta=-low * scale)
+
+def convert_depth(image, dtype):
+    """Converte a imagem para outra profundidade reescalando a faixa de intensidades"""
+    dtype = np.dtype(dtype)
+    if image.dtype == dtype:
+        return image
+    scale = dtype_max(dtype) / dtype_max(image.dtype)
+    if np.issubdtype(dtype, np.integer):
+        scaled = np.clip(image.astype(np.float32) * scale, 0, dtype_max(dtype))
+        return np.rint(scaled).astype(dtype)
+    return image.astype(dtype) * scale
+
+def prewarm_modules(module_names):
+    """
+    Importa módulos pesados em uma thread em segundo plano, para que o primeiro
+    uso (histograma, exportação de PDF) não pague o custo de importação
+    Retorna a thread iniciada
+    """
+    def load():
+        for name in module_names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                # O módulo será importado (e o erro reportado) no primeiro uso real
+                pass
+
+    thread = threading.Thread(target=load, name="prewarm-imports", daemon=True)
+    thread.start()
+    return thread
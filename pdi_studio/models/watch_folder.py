@@ -0,0 +1,470 @@
+import collections
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from models.dataset_stats import IMAGE_EXTENSIONS
+from models.model import RECORDED_OPERATIONS
+from models.pipeline import is_point_operation
+from models.session import Session
+from models.session_file import SESSION_EXTENSION, read_session
+from models.utils import match_file_mode
+
+# Diário das imagens processadas (JSON Lines, na pasta de saída)
+JOURNAL_FILE = "journal.jsonl"
+# Tempo (s) sem mudança de tamanho e data de modificação para considerar o arquivo completo
+DEFAULT_SETTLE_SECONDS = 2.0
+# Intervalo (s) entre varreduras da pasta quando o inotify não está disponível
+DEFAULT_POLL_INTERVAL = 1.0
+# Latências guardadas para os percentis do relatório
+LATENCY_WINDOW = 1000
+
+# Eventos do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+def load_steps(path):
+    """
+    Lê as operações a aplicar, no formato do histórico [(nome, parâmetros), ...]:
+    de um JSON ([["otsu", {}], ...]) ou do histórico de um arquivo de sessão (.pdis)
+    """
+    if path.lower().endswith(SESSION_EXTENSION):
+        _, metadata = read_session(path)
+        steps = metadata.get("op_log", [])
+    else:
+        with open(path, encoding="utf-8") as steps_file:
+            steps = json.load(steps_file)
+    steps = [(name, dict(params or {})) for name, params in steps]
+    _validate_steps(steps)
+    return steps
+
+def _validate_steps(steps):
+    """
+    Aceita só operações de processamento (as que o histórico registra): nomes arbitrários
+    chamariam qualquer método do Model, inclusive os que gravam arquivos
+    """
+    for name, params in steps:
+        if not is_point_operation(name) and name not in RECORDED_OPERATIONS:
+            raise ValueError(f"Operação desconhecida: {name}")
+        if name == "apply_in_roi":
+            _validate_steps(params.get("steps", []))
+
+def is_candidate(name):
+    """Imagens com extensão conhecida; ignora ocultos e temporários (.tmp, .part)"""
+    if name.startswith(".") or name.endswith((".tmp", ".part")):
+        return False
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+class ProcessingJournal:
+    """
+    Diário durável das imagens: uma linha JSON por evento ('started', 'done' ou 'failed'),
+    gravada com fsync antes de seguir. Cada arquivo é identificado por nome, tamanho e data
+    de modificação: ao reiniciar, o que terminou (com ou sem erro) não é refeito, o que só
+    começou volta para a fila, e um arquivo substituído depois de processado é processado de novo
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.finished = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Lê o diário existente, compacta (uma linha por arquivo concluído) e abre para acréscimo"""
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Linha incompleta de uma execução interrompida no meio da gravação
+                        continue
+                    if entry.get("event") in ("done", "failed"):
+                        self.finished[entry["name"]] = entry
+        self._compact()
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def _compact(self):
+        """Regrava o diário só com o último evento concluído de cada arquivo (de forma atômica)"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".pdi_", suffix=".jsonl.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as journal:
+                for entry in self.finished.values():
+                    journal.write(json.dumps(entry) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+                match_file_mode(journal.fileno(), self.path)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def is_finished(self, name, signature):
+        """Indica se esta versão do arquivo (tamanho, data de modificação) já foi concluída"""
+        entry = self.finished.get(name)
+        return entry is not None and (entry["size"], entry["mtime_ns"]) == tuple(signature)
+
+    def record(self, event, name, signature, **fields):
+        """Acrescenta um evento e só retorna depois de gravado em disco"""
+        entry = {"event": event, "name": name, "size": signature[0], "mtime_ns": signature[1],
+                 "time": time.time(), **fields}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if event in ("done", "failed"):
+                self.finished[name] = entry
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class PollingWatcher:
+    """Observa a pasta listando o conteúdo a cada intervalo (funciona em qualquer sistema)"""
+
+    method = "varredura"
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._wake = threading.Event()
+        self._last_scan = float("-inf")
+
+    def wait(self, timeout):
+        """
+        Espera até timeout segundos ou até wake(); retorna None (= varrer a pasta inteira)
+        quando o intervalo de varredura venceu, senão um conjunto vazio
+        """
+        deadline = self._last_scan + self.interval
+        self._wake.wait(max(0.0, min(timeout, deadline - time.monotonic())))
+        self._wake.clear()
+        if time.monotonic() < deadline:
+            return set()
+        self._last_scan = time.monotonic()
+        return None
+
+    def wake(self):
+        """Interrompe a espera (chamado de outra thread quando um processamento termina)"""
+        self._wake.set()
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """
+    Observa a pasta com o inotify do Linux (via ctypes, sem dependências): a espera termina
+    assim que um arquivo é criado, alterado, fechado após escrita ou movido para a pasta
+    """
+
+    method = "inotify"
+
+    def __init__(self, directory, libc):
+        self.directory = directory
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch falhou: {directory}")
+        # Pipe observado junto com o inotify: wake() escreve nele para encerrar a espera
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self._wake_write, False)
+
+    def wait(self, timeout):
+        """
+        Espera eventos por até timeout segundos (ou até wake())
+        Retorna os nomes alterados, ou None se a fila do kernel transbordou (varrer tudo)
+        """
+        ready, _, _ = select.select([self.fd, self._wake_read], [], [], timeout)
+        names = set()
+        if self._wake_read in ready:
+            try:
+                while os.read(self._wake_read, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+        if self.fd not in ready:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].split(b"\0", 1)[0]
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def wake(self):
+        """Interrompe a espera (chamado de outra thread quando um processamento termina)"""
+        try:
+            os.write(self._wake_write, b"\0")
+        except BlockingIOError:
+            # Pipe cheio: a espera já vai terminar
+            pass
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+def create_watcher(directory, polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """inotify quando disponível (Linux); caso contrário, varredura periódica"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            return InotifyWatcher(directory, libc)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, poll_interval)
+
+def process_file(path, steps, output_path, pdf_path=None, options=None):
+    """Abre a imagem, aplica as operações (pontuais fundidas em LUT) e grava o resultado e o PDF"""
+    session = Session.from_path(path)
+    session.apply_steps(steps)
+    session.save(output_path, options)
+    if pdf_path is not None:
+        session.export_pdf(pdf_path)
+
+def _timed_process(*args):
+    """process_file medido na própria thread de trabalho. Retorna (início, fim) em time.monotonic"""
+    started = time.monotonic()
+    process_file(*args)
+    return started, time.monotonic()
+
+class WatchFolder:
+    """
+    Processa as imagens que chegam a uma pasta, sem interface gráfica.
+    Um arquivo só entra na fila depois de ficar settle segundos sem mudar de tamanho nem
+    de data de modificação (o scanner terminou de escrever). No máximo `workers` imagens
+    são processadas ao mesmo tempo; as demais esperam na fila. Cada resultado vai para a
+    pasta de saída com o nome de origem mais a extensão do resultado (ex.: scan.tif.png, e
+    scan.tif.pdf se o relatório for pedido), e o diário (ProcessingJournal) registra o
+    início e o fim de cada arquivo
+    """
+
+    def __init__(self, input_dir, output_dir, steps, workers=2, extension=".png", options=None,
+                 pdf=False, settle=DEFAULT_SETTLE_SECONDS, polling=False,
+                 poll_interval=DEFAULT_POLL_INTERVAL, report=None, report_interval=10.0):
+        """
+        steps: operações no formato do histórico (ver load_steps)
+        extension / options: formato e opções do codificador dos resultados (image_writer)
+        pdf: grava também o relatório PDF de cada imagem
+        polling: força a varredura periódica mesmo com inotify disponível
+        report: função que recebe as linhas de progresso (None = print)
+        """
+        self.input_dir = os.path.abspath(input_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        if os.path.realpath(self.input_dir) == os.path.realpath(self.output_dir):
+            raise ValueError("A pasta de saída deve ser diferente da pasta observada")
+        self.steps = list(steps)
+        self.workers = max(1, int(workers))
+        self.extension = extension if extension.startswith(".") else "." + extension
+        self.options = options
+        self.pdf = pdf
+        self.settle = settle
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.report = report or print
+        self.report_interval = report_interval
+
+        # Arquivos ainda sendo escritos: nome -> (assinatura, instante da última mudança, detecção)
+        self._settling = {}
+        # Prontos, esperando um worker: (nome, assinatura, detecção, entrada na fila)
+        self._queue = collections.deque()
+        # Em processamento: future -> (nome, assinatura, detecção, entrada na fila, saída)
+        self._running = {}
+        # Versão de cada arquivo já enfileirada nesta execução (evita enfileirar de novo)
+        self._queued = {}
+        self.processed = 0
+        self.failed = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._processing_times = collections.deque(maxlen=LATENCY_WINDOW)
+        self.watcher = None
+        self.journal = None
+
+    # ========== Laço principal ==========
+    def run(self, stop_event=None):
+        """
+        Observa a pasta até stop_event ser sinalizado (Ctrl+C também encerra). As imagens em
+        processamento terminam antes de retornar; as da fila ficam para a próxima execução
+        """
+        stop_event = stop_event or threading.Event()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.journal = ProcessingJournal(os.path.join(self.output_dir, JOURNAL_FILE)).open()
+        self.watcher = create_watcher(self.input_dir, self.polling, self.poll_interval)
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdi_watch")
+        self.report(f"Observando {self.input_dir} ({self.watcher.method}); "
+                    f"{len(self.journal.finished)} arquivos já concluídos no diário")
+        last_report = time.monotonic()
+        try:
+            # Arquivos que chegaram com o serviço parado
+            self._scan(None)
+            while not stop_event.is_set():
+                # Com arquivos estabilizando, a espera não passa do tempo de estabilização
+                timeout = min(self.settle / 2, 1.0) if self._settling else 1.0
+                self._scan(self.watcher.wait(timeout))
+                self._promote_settled()
+                # Primeiro libera os workers que terminaram, depois os ocupa de novo
+                self._collect(timeout=0)
+                self._dispatch(executor)
+                if time.monotonic() - last_report >= self.report_interval:
+                    self.report(self.format_metrics())
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._collect(timeout=None)
+            executor.shutdown(wait=True)
+            self.watcher.close()
+            self.journal.close()
+            self.report(self.format_metrics())
+
+    def _signature(self, name):
+        """(tamanho, data de modificação em ns) do arquivo, ou None se ele sumiu"""
+        try:
+            stat = os.stat(os.path.join(self.input_dir, name))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _scan(self, names):
+        """Registra arquivos novos ou alterados (names=None: lista a pasta inteira)"""
+        if names is None:
+            try:
+                names = [entry.name for entry in os.scandir(self.input_dir) if entry.is_file()]
+            except OSError:
+                return
+        now = time.monotonic()
+        for name in names:
+            if not is_candidate(name):
+                continue
+            signature = self._signature(name)
+            if signature is None:
+                self._settling.pop(name, None)
+                continue
+            if self._queued.get(name) == signature or self.journal.is_finished(name, signature):
+                continue
+            previous = self._settling.get(name)
+            if previous is None:
+                self._settling[name] = (signature, now, now)
+            elif previous[0] != signature:
+                # Ainda sendo escrito: recomeça a contagem, mantendo a detecção
+                self._settling[name] = (signature, now, previous[2])
+
+    def _promote_settled(self):
+        """Move para a fila os arquivos que ficaram `settle` segundos sem mudar"""
+        now = time.monotonic()
+        for name, (signature, changed, detected) in list(self._settling.items()):
+            current = self._signature(name)
+            if current is None:
+                del self._settling[name]
+            elif current != signature:
+                self._settling[name] = (current, now, detected)
+            elif now - changed >= self.settle:
+                del self._settling[name]
+                self._queued[name] = signature
+                self._queue.append((name, signature, detected, now))
+
+    def _dispatch(self, executor):
+        """Envia arquivos da fila enquanto houver workers livres"""
+        while self._queue and len(self._running) < self.workers:
+            name, signature, detected, queued = self._queue.popleft()
+            # O nome inteiro (com a extensão de origem) evita que scan.png e scan.tif gravem no mesmo arquivo
+            output_path = os.path.join(self.output_dir, name + self.extension)
+            pdf_path = os.path.join(self.output_dir, name + ".pdf") if self.pdf else None
+            self.journal.record("started", name, signature)
+            future = executor.submit(_timed_process, os.path.join(self.input_dir, name), self.steps,
+                                     output_path, pdf_path, self.options)
+            # Cada término acorda o laço principal, que entrega o próximo arquivo ao worker livre
+            future.add_done_callback(lambda _: self.watcher.wake())
+            self._running[future] = (name, signature, detected, queued, output_path)
+
+    def _collect(self, timeout):
+        """Registra no diário os arquivos concluídos (timeout=None espera todos)"""
+        if not self._running:
+            return
+        done, _ = wait(list(self._running), timeout=timeout)
+        for future in done:
+            name, signature, detected, queued, output_path = self._running.pop(future)
+            if self._queued.get(name) == signature:
+                # Daqui em diante o diário é que evita o reprocessamento
+                del self._queued[name]
+            error = future.exception()
+            if error is None:
+                # Instantes medidos no worker: não dependem de quando o laço recolhe o resultado
+                started, finished = future.result()
+                latency = finished - detected
+                processing = finished - started
+                self.processed += 1
+                self._latencies.append(latency)
+                self._processing_times.append(processing)
+                self.journal.record("done", name, signature, output=output_path,
+                                    latency=round(latency, 3), processing=round(processing, 3),
+                                    queue_wait=round(started - queued, 3))
+                self.report(f"{name}: {processing * 1000:.0f} ms de processamento, "
+                            f"{latency:.1f} s desde a chegada")
+            else:
+                self.failed += 1
+                self.journal.record("failed", name, signature, error=str(error))
+                self.report(f"{name}: falhou ({error})")
+
+    # ========== Métricas ==========
+    def metrics(self):
+        """
+        Estado atual: 'queued' (prontos esperando worker), 'running', 'settling' (ainda sendo
+        escritos), 'processed', 'failed' e percentis de latência (chegada → resultado) e de
+        processamento, em segundos, das últimas LATENCY_WINDOW imagens
+        """
+        return {
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "settling": len(self._settling),
+            "processed": self.processed,
+            "failed": self.failed,
+            "latency_p50": _percentile(self._latencies, 50),
+            "latency_p95": _percentile(self._latencies, 95),
+            "processing_p50": _percentile(self._processing_times, 50),
+            "processing_p95": _percentile(self._processing_times, 95),
+        }
+
+    def format_metrics(self):
+        """Linha de progresso para o relatório periódico"""
+        m = self.metrics()
+        latency = "-" if m["latency_p50"] is None else f"{m['latency_p50']:.1f}/{m['latency_p95']:.1f} s"
+        return (f"fila: {m['queued']} | processando: {m['running']}/{self.workers} | "
+                f"estabilizando: {m['settling']} | concluídas: {m['processed']} | falhas: {m['failed']} | "
+                f"latência p50/p95: {latency}")
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
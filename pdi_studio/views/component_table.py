@@ -0,0 +1,79 @@
+import tkinter as tk
+from tkinter import ttk
+from models.component_model import COLUMNS
+
+# Linhas mostradas na janela (o CSV sempre tem todas)
+MAX_TABLE_ROWS = 2000
+
+# Títulos das colunas na janela
+COLUMN_TITLES = {
+    "label": "#",
+    "area": "Área (px)",
+    "x": "x",
+    "y": "y",
+    "width": "Largura",
+    "height": "Altura",
+    "centroid_x": "Centroide x",
+    "centroid_y": "Centroide y",
+}
+
+class ComponentTableWindow:
+    """Janela com a tabela de componentes conectados (ComponentTable), ordenável por coluna"""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.window = None
+        self.tree = None
+        self.components = None
+
+    def show(self, components, on_export=None):
+        """
+        Mostra a tabela; com muitos componentes, só os MAX_TABLE_ROWS maiores
+        on_export: chamado pelo botão "Exportar CSV..."
+        """
+        if self.window is not None:
+            self.window.destroy()
+        self.components = components
+
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Componentes Conectados")
+        self.window.geometry("760x480")
+
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        ttk.Label(main_frame, text=components.summary()).pack(anchor="w")
+
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill="both", expand=True, pady=5)
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show="headings")
+        for column in COLUMNS:
+            self.tree.heading(column, text=COLUMN_TITLES[column], command=lambda c=column: self._sort(c))
+            self.tree.column(column, width=80, anchor="e")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        if len(components) > MAX_TABLE_ROWS:
+            indices = components.largest(MAX_TABLE_ROWS)
+            ttk.Label(main_frame, text=f"Mostrando os {MAX_TABLE_ROWS} maiores de {len(components)} "
+                                       f"componentes; o CSV tem todos").pack(anchor="w")
+        else:
+            indices = None
+        for row in components.rows(indices):
+            self.tree.insert("", "end", values=row)
+
+        buttons = ttk.Frame(main_frame)
+        buttons.pack(pady=5)
+        if on_export is not None:
+            ttk.Button(buttons, text="Exportar CSV...", command=on_export).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Fechar", command=self.window.destroy).pack(side="left", padx=5)
+        self.window.transient(self.parent)
+
+    def _sort(self, column):
+        """Ordena as linhas pela coluna (decrescente na área, crescente nas demais)"""
+        items = list(self.tree.get_children(""))
+        index = COLUMNS.index(column)
+        items.sort(key=lambda item: float(self.tree.item(item, "values")[index]), reverse=column == "area")
+        for position, item in enumerate(items):
+            self.tree.move(item, "", position)
@@ -1,5 +1,9 @@
 import tkinter as tk
 from tkinter import scrolledtext
+from views.histogram_renderer import HistogramRenderer
+
+# Cores dos canais no histograma do painel
+CHANNEL_COLORS = {"gray": "#dddddd", "r": "#ff5555", "g": "#55dd55", "b": "#5599ff"}
 
 class ControlPanel:
     def __init__(self, root, controller=None):
@@ -58,7 +62,34 @@ class ControlPanel:
         )
         reset_btn.pack(pady=10, fill="x")
 
-        # (Limiarização removida a pedido do usuário)
+        # Resolução da última prévia dos sliders (escolhida pelo orçamento por quadro)
+        self.preview_label = tk.Label(adjustments_frame, text="Prévia: -", fg="#aaa", bg="#333")
+        self.preview_label.pack(anchor="w")
+
+        # Seção de Limiarização: prévia instantânea no tamanho de exibição, aplicada ao confirmar
+        threshold_frame = tk.LabelFrame(self.frame, text="Limiar", bg="#333", fg="white", padx=10, pady=5)
+        threshold_frame.pack(padx=5, pady=5, fill="x")
+        self.threshold_var = tk.DoubleVar(value=127)
+        self.threshold_scale = tk.Scale(
+            threshold_frame,
+            from_=0,
+            to=255,
+            orient=tk.HORIZONTAL,
+            variable=self.threshold_var,
+            bg="#333",
+            fg="white",
+            highlightbackground="#333",
+            command=self.on_threshold_change
+        )
+        self.threshold_scale.pack(fill="x")
+        threshold_buttons = tk.Frame(threshold_frame, bg="#333")
+        threshold_buttons.pack(fill="x", pady=(5, 0))
+        for text, command in (("Aplicar", self.on_threshold_commit), ("Cancelar", self.on_threshold_cancel)):
+            tk.Button(threshold_buttons, text=text, bg="#555", fg="white", command=command).pack(
+                side="left", expand=True, fill="x", padx=2
+            )
+        # Posição da linha de corte no histograma (None = sem prévia de limiar)
+        self._threshold_marker = None
 
         # Seção de informações do pixel
         pixel_frame = tk.LabelFrame(self.frame, text="Pixel", bg="#333", fg="white", padx=10, pady=10)
@@ -75,6 +106,33 @@ class ControlPanel:
         self.pixel_color_canvas.pack(side="left", padx=8)
         self._pixel_color_rect = self.pixel_color_canvas.create_rectangle(2, 2, 22, 22, fill="#000000", outline="")
 
+        # Seção do histograma (sempre visível ao lado da imagem)
+        histogram_frame = tk.LabelFrame(self.frame, text="Histograma", bg="#333", fg="white", padx=5, pady=5)
+        histogram_frame.pack(padx=5, pady=5, fill="x")
+        self.histogram_canvas = tk.Canvas(histogram_frame, width=220, height=90, highlightthickness=0)
+        self.histogram_canvas.pack(fill="x")
+        self.histogram_renderer = HistogramRenderer(self.histogram_canvas)
+        self.histogram_canvas.bind("<Configure>", lambda event: self.histogram_renderer.redraw())
+        options_row = tk.Frame(histogram_frame, bg="#333")
+        options_row.pack(fill="x")
+        self.histogram_log_var = tk.BooleanVar(value=False)
+        self.histogram_rgb_var = tk.BooleanVar(value=True)
+        for text, var in (("Log", self.histogram_log_var), ("RGB", self.histogram_rgb_var)):
+            tk.Checkbutton(
+                options_row, text=text, variable=var, command=self._redraw_histograms,
+                bg="#333", fg="white", selectcolor="#555", activebackground="#333"
+            ).pack(side="left")
+        self._histograms = None
+
+        # Uso de memória dos documentos abertos
+        self.memory_label = tk.Label(self.frame, text="Memória: -", fg="#aaa", bg="#333", anchor="w", justify="left")
+        self.memory_label.pack(padx=8, fill="x")
+
+        # Métricas de qualidade (original x processada)
+        self.quality_label = tk.Label(self.frame, text="MSE: - | PSNR: - | SSIM: -", fg="#aaa", bg="#333",
+                                      anchor="w", justify="left", wraplength=230)
+        self.quality_label.pack(padx=8, fill="x")
+
         # Separador
         tk.Label(self.frame, text="", bg="#333").pack(pady=5)
 
@@ -114,14 +172,88 @@ class ControlPanel:
         """Retorna o valor atual do contraste"""
         return self.contrast_var.get()
 
-    def update_pixel_info(self, x, y, r, g, b):
-        """Atualiza a UI com a posição e valores RGB do pixel"""
+    def on_threshold_change(self, value):
+        """Callback quando o slider de limiar é alterado (só prévia)"""
+        if self.controller:
+            self.controller.preview_threshold()
+
+    def on_threshold_commit(self):
+        if self.controller:
+            self.controller.commit_threshold()
+
+    def on_threshold_cancel(self):
+        if self.controller:
+            self.controller.cancel_threshold_preview()
+
+    def get_threshold(self):
+        """Retorna o valor atual do limiar"""
+        return self.threshold_var.get()
+
+    def set_threshold_range(self, max_value):
+        """
+        Ajusta a faixa do slider de limiar ao tipo da imagem (255, 65535 ou 1.0)
+        Retorna True se a faixa mudou (o valor do slider é reescalado)
+        """
+        if float(self.threshold_scale.cget("to")) == max_value:
+            return False
+        resolution = 1 if max_value > 1 else 0.001
+        fraction = self.threshold_var.get() / float(self.threshold_scale.cget("to"))
+        self.threshold_scale.config(to=max_value, resolution=resolution)
+        self.threshold_var.set(round(fraction * max_value / resolution) * resolution)
+        return True
+
+    def show_threshold_marker(self, position):
+        """Mostra a linha de corte no histograma (posição em [0, 1]; None remove)"""
+        self._threshold_marker = position
+        self._redraw_histograms()
+
+    def update_preview_level(self, scale, seconds):
+        """Mostra a escala da prévia exibida e o tempo do quadro"""
+        level = "resolução total" if scale >= 1.0 else f"{scale * 100:g}%"
+        self.preview_label.config(text=f"Prévia: {level} ({seconds * 1000:.0f} ms)")
+
+    def update_pixel_info(self, x, y, r, g, b, max_value=255):
+        """Atualiza a UI com a posição e valores RGB do pixel (valores na faixa do tipo da imagem)"""
         self.pixel_pos_label.config(text=f"Posição: {x}, {y}")
-        self.pixel_rgb_label.config(text=f"RGB: {r}, {g}, {b}")
-        # Atualiza amostra de cor
-        hex_color = f"#{r:02x}{g:02x}{b:02x}"
+        self.pixel_rgb_label.config(text=f"RGB: {r:g}, {g:g}, {b:g}")
+        # Atualiza amostra de cor (reescalada para 8 bits)
+        r8, g8, b8 = (max(0, min(255, int(round(v * 255 / max_value)))) for v in (r, g, b))
+        hex_color = f"#{r8:02x}{g8:02x}{b8:02x}"
         self.pixel_color_canvas.itemconfig(self._pixel_color_rect, fill=hex_color)
 
+    def show_histograms(self, hists):
+        """Mostra os histogramas (dicionário com 'gray', 'r', 'g', 'b') no painel"""
+        self._histograms = hists
+        self._redraw_histograms()
+
+    def _redraw_histograms(self):
+        """Redesenha o histograma com as opções atuais (escala log, sobreposição RGB)"""
+        if not self._histograms:
+            return
+        channels = ["r", "g", "b"] if self.histogram_rgb_var.get() else ["gray"]
+        markers = [] if self._threshold_marker is None else [(self._threshold_marker, "#ffcc00")]
+        self.histogram_renderer.draw(
+            [self._histograms[name] for name in channels],
+            [CHANNEL_COLORS[name] for name in channels],
+            log_scale=self.histogram_log_var.get(),
+            markers=markers
+        )
+
+    def set_adjustments(self, brightness, contrast):
+        """Define os valores dos sliders (ex.: ao trocar de documento)"""
+        self.brightness_var.set(brightness)
+        self.contrast_var.set(contrast)
+        self.brightness_label.config(text=f"{int(brightness)}")
+        self.contrast_label.config(text=f"{contrast:.2f}")
+
+    def update_memory_usage(self, text):
+        """Atualiza a leitura de uso de memória"""
+        self.memory_label.config(text=text)
+
+    def update_quality_metrics(self, text):
+        """Atualiza a leitura de MSE/PSNR/SSIM"""
+        self.quality_label.config(text=text)
+
     def add_log(self, text):
         self.log_area.insert(tk.END, f"> {text}\n")
         self.log_area.see(tk.END)
@@ -0,0 +1,103 @@
+import weakref
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+from models.utils import display_window, to_display_8bit
+
+def fit_size(width, height, max_width, max_height):
+    """Tamanho que cabe em max_width x max_height mantendo a proporção"""
+    ratio = min(max_width / width, max_height / height)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+# Cor (RGB) do contorno da ROI desenhado sobre a imagem exibida
+OUTLINE_COLOR = (255, 204, 0)
+# Cor (RGB) das caixas dos componentes conectados
+COMPONENT_COLOR = (255, 64, 64)
+
+class DisplayBuffer:
+    """
+    Leva um array BGR do Model até um PhotoImage sem cópias no tamanho da imagem:
+    a redução (INTER_AREA) é feita direto no array de origem, e a troca de canais e o
+    PhotoImage só existem no tamanho de exibição. Buffers e PhotoImage são reaproveitados
+    enquanto o tamanho exibido não muda
+    """
+
+    def __init__(self):
+        self.photo = None
+        self._buffers = {}
+        # Último quadro convertido: (weakref da imagem, tamanho, janela). Redesenhar só o
+        # contorno (ex.: arrastando a seleção da ROI) não reduz a imagem de novo
+        self._rendered = None
+
+    def _buffer(self, name, shape, dtype):
+        """Buffer preservado entre redesenhos (recriado só quando a forma muda)"""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def to_rgb(self, image, size, window=None):
+        """
+        Array RGB de 8 bits no tamanho `size` (largura, altura), escrito em um buffer reutilizado
+        window: janela (min, max) para imagens de 16 bits/float (None = percentis da imagem reduzida)
+        """
+        width, height = size
+        resized = image
+        if image.shape[1] != width or image.shape[0] != height:
+            # INTER_AREA para reduzir; ampliação (imagens pequenas) com Lanczos
+            interpolation = cv2.INTER_AREA if width < image.shape[1] else cv2.INTER_LANCZOS4
+            target = self._buffer("resized", (height, width, 3), image.dtype)
+            resized = cv2.resize(image, (width, height), dst=target, interpolation=interpolation)
+
+        if resized.dtype != np.uint8:
+            resized = to_display_8bit(resized, window or display_window(resized))
+
+        rgb = self._buffer("rgb", (height, width, 3), np.uint8)
+        return cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    def render(self, image, max_width, max_height, window=None, outline=None, boxes=None):
+        """
+        Converte o array BGR em PhotoImage cabendo em max_width x max_height
+        outline: pontos (x, y) em coordenadas da imagem de um contorno fechado a desenhar (ROI)
+        boxes: caixas (x, y, largura, altura) em coordenadas da imagem (componentes conectados)
+        Retorna (PhotoImage, (largura, altura))
+        """
+        size = fit_size(image.shape[1], image.shape[0], max_width, max_height)
+        rendered = self._rendered
+        if rendered is not None and rendered[0]() is image and rendered[1:] == (size, window):
+            rgb = self._buffers["rgb"]
+        else:
+            rgb = self.to_rgb(image, size, window)
+            self._rendered = (weakref.ref(image), size, window)
+        if outline or (boxes is not None and len(boxes)):
+            rgb = self._draw_overlay(rgb, outline, boxes, image.shape, size)
+        # frombuffer apenas envolve o buffer; a cópia para o Tk acontece no paste
+        frame = Image.frombuffer("RGB", size, rgb, "raw", "RGB", 0, 1)
+        if self.photo is None or (self.photo.width(), self.photo.height()) != size:
+            self.photo = ImageTk.PhotoImage(frame)
+        else:
+            self.photo.paste(frame)
+        return self.photo, size
+
+    def _draw_overlay(self, rgb, outline, boxes, shape, size):
+        """
+        Copia o quadro para outro buffer e desenha as caixas e o contorno
+        (o quadro convertido fica intacto)
+        """
+        overlay = self._buffer("overlay", rgb.shape, np.uint8)
+        np.copyto(overlay, rgb)
+        scale = np.array([size[0] / shape[1], size[1] / shape[0]])
+        if boxes is not None and len(boxes):
+            boxes = np.asarray(boxes, dtype=np.float64)
+            corners = np.stack([boxes[:, :2], boxes[:, :2] + boxes[:, 2:] - 1], axis=1)
+            corners = np.round((corners + 0.5) * scale - 0.5).astype(np.int32)
+            x0, y0, x1, y1 = corners[:, 0, 0], corners[:, 0, 1], corners[:, 1, 0], corners[:, 1, 1]
+            # Todas as caixas em uma única chamada (milhares de componentes)
+            rectangles = np.stack([np.stack([x0, y0], 1), np.stack([x1, y0], 1),
+                                   np.stack([x1, y1], 1), np.stack([x0, y1], 1)], axis=1)
+            cv2.polylines(overlay, list(rectangles.reshape(-1, 4, 1, 2)), True, COMPONENT_COLOR, 1)
+        if outline:
+            points = np.round((np.asarray(outline, dtype=np.float64) + 0.5) * scale - 0.5).astype(np.int32)
+            cv2.polylines(overlay, [points.reshape(-1, 1, 2)], len(points) > 2, OUTLINE_COLOR, 1, cv2.LINE_AA)
+        return overlay
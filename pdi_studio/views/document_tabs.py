@@ -0,0 +1,47 @@
+import tkinter as tk
+from tkinter import ttk
+
+class DocumentTabs:
+    """Barra de abas dos documentos abertos (as abas não têm conteúdo próprio: o painel de imagem é compartilhado)"""
+
+    def __init__(self, root, controller=None):
+        self.controller = controller
+        self.notebook = ttk.Notebook(root)
+        # id do documento -> frame da aba
+        self.tabs = {}
+        self._suspend_events = False
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+    def add_tab(self, doc_id, name):
+        """Adiciona uma aba para o documento"""
+        frame = tk.Frame(self.notebook, height=0)
+        self.tabs[doc_id] = frame
+        self._suspend_events = True
+        self.notebook.add(frame, text=name)
+        self._suspend_events = False
+
+    def select(self, doc_id):
+        """Seleciona a aba do documento sem disparar a troca no controller"""
+        if doc_id in self.tabs:
+            self._suspend_events = True
+            self.notebook.select(self.tabs[doc_id])
+            self.notebook.update_idletasks()
+            self._suspend_events = False
+
+    def remove_tab(self, doc_id):
+        """Remove a aba do documento"""
+        frame = self.tabs.pop(doc_id, None)
+        if frame is not None:
+            self._suspend_events = True
+            self.notebook.forget(frame)
+            frame.destroy()
+            self._suspend_events = False
+
+    def _on_tab_changed(self, event):
+        if self._suspend_events or self.controller is None:
+            return
+        selected = self.notebook.select()
+        for doc_id, frame in self.tabs.items():
+            if str(frame) == selected:
+                self.controller.switch_document(doc_id)
+                return
@@ -1,15 +1,17 @@
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import numpy as np
+from PIL import Image, ImageTk
+from views.histogram_renderer import HistogramRenderer, rasterize_joint_histogram
+
+# Cores das curvas dos canais na janela de histogramas por espaço de cor
+CHANNEL_CURVE_COLORS = ["#d83b3b", "#2e9e44", "#3b6fd8"]
 
 class HistogramCanvas:
     def __init__(self, parent):
         self.parent = parent
         self.window = None
-        self.canvas = None
+        self.renderers = []
+        self.log_scale_var = None
         
     def create_histogram_window(self, original_hist, equalized_hist):
         """Cria uma janela para exibir os histogramas"""
@@ -25,39 +27,34 @@ class HistogramCanvas:
         # Criar frame principal
         main_frame = ttk.Frame(self.window)
         main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        plots_frame = ttk.Frame(main_frame)
+        plots_frame.pack(fill="both", expand=True)
         
-        # Criar figura matplotlib
-        fig = Figure(figsize=(10, 4), dpi=100)
-        
-        # Criar subplots
-        ax1 = fig.add_subplot(121)
-        ax2 = fig.add_subplot(122)
-        
-        # Plotar histograma original
-        ax1.plot(original_hist, color='blue', alpha=0.7, linewidth=1)
-        ax1.fill_between(range(256), original_hist.flatten(), alpha=0.3, color='blue')
-        ax1.set_title('Histograma Original', fontsize=12, fontweight='bold')
-        ax1.set_xlabel('Intensidade de Pixel')
-        ax1.set_ylabel('Frequência')
-        ax1.grid(True, alpha=0.3)
-        ax1.set_xlim(0, 255)
-        
-        # Plotar histograma equalizado
-        ax2.plot(equalized_hist, color='red', alpha=0.7, linewidth=1)
-        ax2.fill_between(range(256), equalized_hist.flatten(), alpha=0.3, color='red')
-        ax2.set_title('Histograma Equalizado', fontsize=12, fontweight='bold')
-        ax2.set_xlabel('Intensidade de Pixel')
-        ax2.set_ylabel('Frequência')
-        ax2.grid(True, alpha=0.3)
-        ax2.set_xlim(0, 255)
-        
-        # Ajustar layout
-        fig.tight_layout()
-        
-        # Criar canvas matplotlib
-        self.canvas = FigureCanvasTkAgg(fig, main_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Desenhar os histogramas diretamente em canvas Tk (sem matplotlib)
+        self.renderers = []
+        panels = [
+            ("Histograma Original", original_hist, "#3b6fd8"),
+            ("Histograma Equalizado", equalized_hist, "#d83b3b"),
+        ]
+        for title, hist, color in panels:
+            panel = ttk.Frame(plots_frame)
+            panel.pack(side="left", fill="both", expand=True, padx=5)
+            ttk.Label(panel, text=title, font=("TkDefaultFont", 12, "bold")).pack()
+            canvas = tk.Canvas(panel, width=380, height=380, highlightthickness=0)
+            canvas.pack(fill="both", expand=True)
+            ttk.Label(panel, text=f"Intensidade de Pixel (0-{len(hist) - 1})").pack()
+            renderer = HistogramRenderer(canvas, background="#f4f4f4")
+            renderer.draw([hist], [color])
+            # Redesenhar ao redimensionar a janela
+            canvas.bind("<Configure>", lambda event, r=renderer: r.redraw())
+            self.renderers.append((renderer, hist, color))
+
+        # Alternar entre escala linear e logarítmica
+        self.log_scale_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            main_frame, text="Escala logarítmica", variable=self.log_scale_var, command=self._redraw
+        ).pack(pady=(5, 0))
         
         # Adicionar botão de fechar
         close_button = ttk.Button(main_frame, text="Fechar", command=self.window.destroy)
@@ -66,8 +63,75 @@ class HistogramCanvas:
         # Centralizar janela
         self.window.transient(self.parent)
         self.window.grab_set()
+
+    def _redraw(self):
+        """Redesenha os histogramas com a escala escolhida"""
+        for renderer, hist, color in self.renderers:
+            renderer.draw([hist], [color], log_scale=self.log_scale_var.get())
         
     def show_histograms(self, original_hist, equalized_hist):
         """Mostra os histogramas na janela"""
         self.create_histogram_window(original_hist, equalized_hist)
 
+    def show_color_histograms(self, result):
+        """
+        Mostra os histogramas de um espaço de cor (histogram_engine.color_histograms):
+        as curvas de todos os canais sobrepostas e, se houver, os histogramas 2D como mapas de calor
+        """
+        if self.window is not None:
+            self.window.destroy()
+
+        color_space = result["color_space"].upper()
+        self.window = tk.Toplevel(self.parent)
+        self.window.title(f"Histogramas - {color_space}")
+        self.window.geometry("900x480")
+
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        plots_frame = ttk.Frame(main_frame)
+        plots_frame.pack(fill="both", expand=True)
+
+        # Curvas dos canais sobrepostas (cada uma esticada para a largura toda)
+        names = list(result["channels"])
+        colors = CHANNEL_CURVE_COLORS[:len(names)] if len(names) > 1 else ["#555555"]
+        panel = ttk.Frame(plots_frame)
+        panel.pack(side="left", fill="both", expand=True, padx=5)
+        ttk.Label(panel, text=f"Canais {color_space}", font=("TkDefaultFont", 12, "bold")).pack()
+        canvas = tk.Canvas(panel, width=420, height=340, highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+        legend = "  ".join(
+            f"{name.upper()}: {result['ranges'][name][0]:g}–{result['ranges'][name][1]:.4g}" for name in names
+        )
+        ttk.Label(panel, text=legend).pack()
+        renderer = HistogramRenderer(canvas, background="#f4f4f4")
+        hists = [result["channels"][name] for name in names]
+        renderer.draw(hists, colors, fill=False)
+        canvas.bind("<Configure>", lambda event: renderer.redraw())
+        self.renderers = [(renderer, hists, colors)]
+
+        # Histogramas 2D: eixo horizontal = primeiro canal, vertical = segundo
+        self._joint_photos = []
+        for (a, b), joint in result["joint"].items():
+            joint_panel = ttk.Frame(plots_frame)
+            joint_panel.pack(side="left", fill="both", padx=5)
+            ttk.Label(joint_panel, text=f"{a.upper()} x {b.upper()} ({joint.shape[0]}x{joint.shape[1]} bins)",
+                      font=("TkDefaultFont", 12, "bold")).pack()
+            photo = ImageTk.PhotoImage(Image.fromarray(rasterize_joint_histogram(joint, 340, 340)))
+            self._joint_photos.append(photo)
+            tk.Label(joint_panel, image=photo, bd=0).pack()
+            ttk.Label(joint_panel, text=f"{a.upper()} → / {b.upper()} ↑ (escala log)").pack()
+
+        if result["step"] > 1:
+            ttk.Label(main_frame, text=f"Amostragem: 1 a cada {result['step']}x{result['step']} pixels").pack()
+
+        self.log_scale_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            main_frame, text="Escala logarítmica", variable=self.log_scale_var, command=self._redraw_color
+        ).pack(pady=(5, 0))
+        ttk.Button(main_frame, text="Fechar", command=self.window.destroy).pack(pady=5)
+        self.window.transient(self.parent)
+
+    def _redraw_color(self):
+        """Redesenha as curvas dos canais com a escala escolhida"""
+        for renderer, hists, colors in self.renderers:
+            renderer.draw(hists, colors, log_scale=self.log_scale_var.get(), fill=False)
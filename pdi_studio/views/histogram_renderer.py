@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+
+def _resample(hist, width):
+    """
+    Reduz um histograma para no máximo `width` colunas usando o máximo de cada grupo,
+    para que picos estreitos (ex.: 65.536 bins) não desapareçam
+    """
+    hist = np.asarray(hist, dtype=np.float64).ravel()
+    if len(hist) <= width:
+        return hist
+    edges = (np.arange(width, dtype=np.int64) * len(hist)) // width
+    return np.maximum.reduceat(hist, edges)
+
+def _normalize(hists, log_scale):
+    """Normaliza os histogramas para [0, 1] usando o mesmo máximo (comparáveis na sobreposição)"""
+    values = [np.log1p(h) if log_scale else h for h in hists]
+    peak = max((float(v.max()) for v in values if v.size), default=0.0)
+    if peak <= 0:
+        return [np.zeros_like(v) for v in values]
+    return [v / peak for v in values]
+
+def rasterize_joint_histogram(hist, width, height, log_scale=True):
+    """
+    Desenha um histograma 2D como mapa de calor RGB (height x width x 3)
+    O primeiro eixo do histograma vai na horizontal e o segundo na vertical (crescendo para cima)
+    """
+    values = np.log1p(hist) if log_scale else np.asarray(hist, dtype=np.float64)
+    peak = float(values.max()) if values.size else 0.0
+    scaled = np.zeros(values.shape, dtype=np.uint8) if peak <= 0 else \
+        np.rint(values * (255.0 / peak)).astype(np.uint8)
+    # Linhas da imagem = segundo canal, de cima (maior) para baixo (menor)
+    heat = cv2.applyColorMap(np.ascontiguousarray(scaled.T[::-1]), cv2.COLORMAP_VIRIDIS)
+    heat = cv2.resize(heat, (width, height), interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(heat, cv2.COLOR_BGR2RGB)
+
+class HistogramRenderer:
+    """
+    Desenha histogramas em um tk.Canvas com poucos itens (um polígono ou linha por canal).
+    Os itens são criados uma vez e apenas têm as coordenadas atualizadas a cada redesenho
+    """
+
+    def __init__(self, canvas, background="#111"):
+        self.canvas = canvas
+        self.canvas.config(bg=background)
+        self.items = {}
+        self.last_draw = None
+
+    def draw(self, hists, colors, log_scale=False, fill=None, markers=None):
+        """
+        Desenha (ou atualiza) os histogramas
+        hists: lista de histogramas; colors: lista de cores Tk
+        fill: preenche os polígonos (padrão: só quando há um único canal)
+        markers: linhas verticais sobre o histograma, lista de (posição em [0, 1], cor)
+        """
+        self.last_draw = (hists, colors, log_scale, fill, markers)
+        width = max(2, self.canvas.winfo_width())
+        height = max(2, self.canvas.winfo_height())
+        if width <= 2 or height <= 2:
+            width = int(self.canvas.cget("width"))
+            height = int(self.canvas.cget("height"))
+        if fill is None:
+            fill = len(hists) == 1
+
+        resampled = [_resample(h, width) for h in hists]
+        used = set()
+        for index, (hist, color) in enumerate(zip(_normalize(resampled, log_scale), colors)):
+            xs = np.linspace(0, width, len(hist))
+            ys = height - hist * (height - 1)
+            key = (index, fill)
+            used.add(key)
+            if fill:
+                # Polígono fechado na linha de base
+                points = np.empty(2 * len(hist) + 4)
+                points[0:2] = (0, height)
+                points[2:-2:2] = xs
+                points[3:-2:2] = ys
+                points[-2:] = (width, height)
+                coords = points.tolist()
+                if key not in self.items:
+                    self.items[key] = self.canvas.create_polygon(coords, fill=color, outline=color)
+                else:
+                    self.canvas.coords(self.items[key], coords)
+                    self.canvas.itemconfig(self.items[key], fill=color, outline=color)
+            else:
+                points = np.empty(2 * len(hist))
+                points[0::2] = xs
+                points[1::2] = ys
+                coords = points.tolist()
+                if key not in self.items:
+                    self.items[key] = self.canvas.create_line(coords, fill=color)
+                else:
+                    self.canvas.coords(self.items[key], coords)
+                    self.canvas.itemconfig(self.items[key], fill=color)
+            self.canvas.itemconfig(self.items[key], state="normal")
+
+        # Marcadores (ex.: linha de corte do limiar), sempre por cima dos histogramas
+        for index, (position, color) in enumerate(markers or []):
+            x = min(max(position, 0.0), 1.0) * (width - 1)
+            key = ("marker", index)
+            used.add(key)
+            coords = [x, 0, x, height]
+            if key not in self.items:
+                self.items[key] = self.canvas.create_line(coords, fill=color, dash=(3, 2))
+            else:
+                self.canvas.coords(self.items[key], coords)
+                self.canvas.itemconfig(self.items[key], fill=color)
+            self.canvas.itemconfig(self.items[key], state="normal")
+            self.canvas.tag_raise(self.items[key])
+
+        # Esconder itens de canais que não estão mais sendo exibidos
+        for key, item in self.items.items():
+            if key not in used:
+                self.canvas.itemconfig(item, state="hidden")
+
+    def redraw(self):
+        """Redesenha com os últimos dados (ex.: após redimensionar o canvas)"""
+        if self.last_draw is not None:
+            self.draw(*self.last_draw)
+
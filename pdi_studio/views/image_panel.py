@@ -1,6 +1,12 @@
 import tkinter as tk
 from tkinter import Label
+import numpy as np
 from PIL import Image, ImageTk
+from models.roi import Roi
+from views.display_buffer import DisplayBuffer
+
+# Caixas de componentes desenhadas sobre a imagem (as dos maiores, se houver mais)
+MAX_OVERLAY_COMPONENTS = 5000
 
 class ImagePanel:
     def __init__(self, root, controller=None):
@@ -14,12 +20,20 @@ class ImagePanel:
             "original": (None, None),
             "processed": (None, None),
         }
+        # Buffers de exibição (e PhotoImages) reaproveitados por área
+        self.display_buffers = {key: DisplayBuffer() for key in self.display_sizes}
+        # Seleção de ROI: None, 'rect' (arrastar) ou 'polygon' (cliques nos vértices;
+        # clique duplo ou botão direito fecha). Pontos em coordenadas da imagem
+        self.roi_mode = None
+        self._roi_points = []
+        self._roi_cursor = None
         
         # Frame para visualização única
         self.single_frame = tk.Frame(self.frame, bg="#222")
         self.single_label = Label(self.single_frame, bg="#222")
         self.single_label.pack(fill="both", expand=True)
         self.single_label.bind("<Button-1>", self._on_single_click)
+        self._bind_roi_events(self.single_label, "single")
         
         # Frame para visualização lado a lado
         self.side_by_side_frame = tk.Frame(self.frame, bg="#222")
@@ -35,6 +49,7 @@ class ImagePanel:
         self.processed_label = Label(self.processed_frame, bg="#333", text="Imagem Processada", fg="white")
         self.processed_label.pack(fill="both", expand=True)
         self.processed_label.bind("<Button-1>", self._on_processed_click)
+        self._bind_roi_events(self.processed_label, "processed")
         
         # Empacotar os frames lado a lado
         self.original_frame.pack(side="left", fill="both", expand=True, padx=2)
@@ -43,8 +58,29 @@ class ImagePanel:
         # Mostrar visualização única por padrão
         self.single_frame.pack(fill="both", expand=True)
 
+    def default_display_size(self):
+        """Área máxima de exibição de acordo com o modo de visualização"""
+        if self.single_view:
+            # Para visualização única, usar mais espaço
+            return 1200, 800
+        # Para lado a lado, usar metade do espaço (cada lado)
+        return 600, 600
+
+    def render_array(self, key, image, max_width=None, max_height=None):
+        """
+        Converte um array BGR do Model em PhotoImage no tamanho de exibição,
+        reaproveitando os buffers da área `key` ('single', 'original' ou 'processed')
+        """
+        if max_width is None or max_height is None:
+            max_width, max_height = self.default_display_size()
+        window = None
+        if self.controller is not None and self.controller.model is not None:
+            window = self.controller.model.display_window
+        boxes = self._component_boxes() if key != "original" else None
+        return self.display_buffers[key].render(image, max_width, max_height, window, self._roi_outline(), boxes)
+
     def resize_image_for_display(self, image, max_width=None, max_height=None):
-        """Redimensiona a imagem para caber na área de exibição"""
+        """Redimensiona uma imagem PIL para caber na área de exibição"""
         if image is None:
             return None
             
@@ -53,14 +89,7 @@ class ImagePanel:
         
         # Se não especificado, usar dimensões padrão baseadas no modo de visualização
         if max_width is None or max_height is None:
-            if self.single_view:
-                # Para visualização única, usar mais espaço
-                max_width = 1200
-                max_height = 800
-            else:
-                # Para lado a lado, usar metade do espaço (cada lado)
-                max_width = 600
-                max_height = 600
+            max_width, max_height = self.default_display_size()
         
         # Calcular proporção para manter aspecto
         width_ratio = max_width / img_width
@@ -90,8 +119,12 @@ class ImagePanel:
                 self.processed_label.config(image=image)
                 self.processed_label.image = image
         else:
-            # Se é uma imagem PIL, redimensionar primeiro
-            result = self.resize_image_for_display(image)
+            # Arrays do Model são reduzidos antes de qualquer conversão; imagens PIL, como antes
+            key = "single" if self.single_view else "processed"
+            if isinstance(image, np.ndarray):
+                result = self.render_array(key, image)
+            else:
+                result = self.resize_image_for_display(image)
             if result:
                 resized_image, size = result
                 if self.single_view:
@@ -111,13 +144,24 @@ class ImagePanel:
                 self.original_label.image = image
             else:
                 # Redimensionar para o lado esquerdo (metade do espaço)
-                result = self.resize_image_for_display(image, max_width=600, max_height=600)
+                if isinstance(image, np.ndarray):
+                    result = self.render_array("original", image, max_width=600, max_height=600)
+                else:
+                    result = self.resize_image_for_display(image, max_width=600, max_height=600)
                 if result:
                     resized_image, size = result
                     self.original_label.config(image=resized_image)
                     self.original_label.image = resized_image
                     self.display_sizes["original"] = size
 
+    def clear(self):
+        """Remove as imagens exibidas (ex.: ao fechar o último documento)"""
+        for label in (self.single_label, self.original_label, self.processed_label):
+            label.config(image="")
+            label.image = None
+        for key in self.display_sizes:
+            self.display_sizes[key] = (None, None)
+
     def set_single_view(self):
         """Alterna para visualização única"""
         self.single_view = True
@@ -130,8 +174,115 @@ class ImagePanel:
         self.single_frame.pack_forget()
         self.side_by_side_frame.pack(fill="both", expand=True)
 
+    # ======== Seleção de ROI ========
+    def start_roi_selection(self, mode):
+        """Inicia a seleção de uma ROI com o mouse: 'rect' ou 'polygon'"""
+        self.roi_mode = mode
+        self._roi_points = []
+        self._roi_cursor = None
+
+    def cancel_roi_selection(self):
+        self.roi_mode = None
+        self._roi_points = []
+        self._roi_cursor = None
+        self.refresh_overlay()
+
+    def _roi_outline(self):
+        """Contorno a desenhar: a seleção em andamento ou a ROI do Model"""
+        if self.roi_mode is not None and self._roi_points:
+            if self.roi_mode == "rect":
+                if self._roi_cursor is None:
+                    return None
+                return Roi.from_points([self._roi_points[0], self._roi_cursor]).outline()
+            cursor = [self._roi_cursor] if self._roi_cursor is not None else []
+            return self._roi_points + cursor
+        if self.controller is not None and self.controller.model is not None \
+                and self.controller.model.roi is not None:
+            return self.controller.model.roi.outline()
+        return None
+
+    def _component_boxes(self):
+        """Caixas da última análise de componentes, enquanto ela for da imagem exibida"""
+        if self.controller is None or self.controller.model is None:
+            return None
+        components = self.controller.model.current_components()
+        if components is None:
+            return None
+        return components.boxes(limit=MAX_OVERLAY_COMPONENTS)
+
+    def refresh_overlay(self):
+        """Redesenha as áreas visíveis com o contorno atual (sem reduzir a imagem de novo)"""
+        if self.controller is None or self.controller.model is None:
+            return
+        model = self.controller.model
+        if model.image is not None:
+            self.show_image(model.image)
+        if not self.single_view and model.original is not None:
+            self.show_original_image(model.original)
+
+    def _bind_roi_events(self, widget, display_key):
+        widget.bind("<B1-Motion>", lambda event: self._on_roi_drag(display_key, widget, event))
+        widget.bind("<ButtonRelease-1>", lambda event: self._on_roi_release(display_key, widget, event))
+        widget.bind("<Motion>", lambda event: self._on_roi_motion(display_key, widget, event))
+        widget.bind("<Double-Button-1>", lambda event: self._finish_polygon())
+        widget.bind("<Button-3>", lambda event: self._finish_polygon())
+
+    def _on_roi_press(self, display_key, widget, event):
+        """Clique no modo de seleção. Retorna True se o clique foi usado pela ROI"""
+        if self.roi_mode is None:
+            return False
+        point = self._map_display_to_image(display_key, widget, event.x, event.y)
+        if point is None:
+            return True
+        if self.roi_mode == "rect":
+            self._roi_points = [point]
+            self._roi_cursor = None
+        elif not self._roi_points or self._roi_points[-1] != point:
+            self._roi_points.append(point)
+        self.refresh_overlay()
+        return True
+
+    def _on_roi_drag(self, display_key, widget, event):
+        if self.roi_mode != "rect" or not self._roi_points:
+            return
+        self._roi_cursor = self._map_display_to_image(display_key, widget, event.x, event.y, clamp=True)
+        self.refresh_overlay()
+
+    def _on_roi_motion(self, display_key, widget, event):
+        if self.roi_mode != "polygon" or not self._roi_points:
+            return
+        self._roi_cursor = self._map_display_to_image(display_key, widget, event.x, event.y, clamp=True)
+        self.refresh_overlay()
+
+    def _on_roi_release(self, display_key, widget, event):
+        if self.roi_mode != "rect" or not self._roi_points:
+            return
+        end = self._map_display_to_image(display_key, widget, event.x, event.y, clamp=True)
+        start = self._roi_points[0]
+        if end is None or end == start:
+            return
+        self._select_roi(Roi.from_points([start, end]))
+
+    def _finish_polygon(self):
+        if self.roi_mode != "polygon":
+            return
+        if len(self._roi_points) < 3:
+            return
+        self._select_roi(Roi.from_polygon(self._roi_points))
+
+    def _select_roi(self, roi):
+        self.roi_mode = None
+        self._roi_points = []
+        self._roi_cursor = None
+        if self.controller is not None:
+            self.controller.on_roi_selected(roi)
+
     # ======== Handlers de clique ========
-    def _map_click_to_image_coords(self, display_key, widget, x, y):
+    def _map_display_to_image(self, display_key, widget, x, y, clamp=False):
+        """
+        Converte um ponto do widget em coordenadas (x, y) da imagem exibida
+        clamp: pontos fora da imagem são trazidos para a borda em vez de retornar None
+        """
         if self.controller is None or self.controller.model is None:
             return None
 
@@ -163,7 +314,8 @@ class ImagePanel:
         img_y_relative = y - offset_y
         
         # Verificar se o clique está dentro da área da imagem
-        if img_x_relative < 0 or img_x_relative >= disp_w or img_y_relative < 0 or img_y_relative >= disp_h:
+        outside = img_x_relative < 0 or img_x_relative >= disp_w or img_y_relative < 0 or img_y_relative >= disp_h
+        if outside and not clamp:
             return None
         
         # Mapear coordenadas relativas da imagem para coordenadas da imagem original
@@ -176,12 +328,22 @@ class ImagePanel:
         # Clampear
         img_x = max(0, min(orig_w - 1, img_x))
         img_y = max(0, min(orig_h - 1, img_y))
+        return img_x, img_y
+
+    def _map_click_to_image_coords(self, display_key, widget, x, y):
+        point = self._map_display_to_image(display_key, widget, x, y)
+        if point is None:
+            return None
+        img_x, img_y = point
+        cv_img = self.controller.model.original if display_key == "original" else self.controller.model.image
 
         # OpenCV é BGR
         b, g, r = cv_img[img_y, img_x].tolist()
         return img_x, img_y, r, g, b
 
     def _on_single_click(self, event):
+        if self._on_roi_press("single", self.single_label, event):
+            return
         mapped = self._map_click_to_image_coords("single", self.single_label, event.x, event.y)
         if mapped and self.controller:
             x, y, r, g, b = mapped
@@ -194,6 +356,8 @@ class ImagePanel:
             self.controller.update_pixel_info(x, y, r, g, b)
 
     def _on_processed_click(self, event):
+        if self._on_roi_press("processed", self.processed_label, event):
+            return
         mapped = self._map_click_to_image_coords("processed", self.processed_label, event.x, event.y)
         if mapped and self.controller:
             x, y, r, g, b = mapped
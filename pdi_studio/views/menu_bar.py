@@ -9,9 +9,16 @@ class MenuBar:
         file_menu = tk.Menu(self.menubar, tearoff=0)
         file_menu.add_command(label="Abrir", command=controller.open_image)
         file_menu.add_command(label="Salvar como...", command=controller.save_image)
+        file_menu.add_command(label="Salvar em vários formatos...", command=controller.save_multiple_formats)
+        file_menu.add_command(label="Fechar documento", command=controller.close_document)
+        file_menu.add_separator()
+        file_menu.add_command(label="Abrir sessão...", command=controller.open_session)
+        file_menu.add_command(label="Salvar sessão...", command=controller.save_session)
         file_menu.add_separator()
         file_menu.add_command(label="Exportar PDF...", command=controller.export_pdf)
         file_menu.add_separator()
+        file_menu.add_command(label="Orçamento de memória...", command=controller.set_memory_budget)
+        file_menu.add_separator()
         file_menu.add_command(label="Sair", command=root.quit)
         self.menubar.add_cascade(label="Arquivo", menu=file_menu)
 
@@ -20,15 +27,51 @@ class MenuBar:
         self.menubar.add_command(label="Lado a Lado", command=controller.set_side_by_side_view)
         self.menubar.add_command(label="Reset Imagem", command=controller.reset_image)
 
+        # Menu Geometria
+        geometry_menu = tk.Menu(self.menubar, tearoff=0)
+        geometry_menu.add_command(label="Recortar para a ROI", command=controller.crop_to_roi)
+        geometry_menu.add_separator()
+        geometry_menu.add_command(label="Espelhar Horizontalmente", command=lambda: controller.flip_image("horizontal"))
+        geometry_menu.add_command(label="Espelhar Verticalmente", command=lambda: controller.flip_image("vertical"))
+        geometry_menu.add_separator()
+        geometry_menu.add_command(label="Girar 90° Anti-horário", command=lambda: controller.rotate_image(90))
+        geometry_menu.add_command(label="Girar 90° Horário", command=lambda: controller.rotate_image(-90))
+        geometry_menu.add_command(label="Girar 180°", command=lambda: controller.rotate_image(180))
+        geometry_menu.add_command(label="Girar...", command=controller.rotate_image)
+        geometry_menu.add_separator()
+        geometry_menu.add_command(label="Redimensionar...", command=controller.resize_image)
+        self.menubar.add_cascade(label="Geometria", menu=geometry_menu)
+
         # Menu Filtros
         filter_menu = tk.Menu(self.menubar, tearoff=0)
         filter_menu.add_command(label="Converter para tons de cinza", command=controller.apply_gray)
         filter_menu.add_command(label="Equalizar histograma", command=controller.apply_equalization)
+        filter_menu.add_command(label="Equalizar histograma (cor - YCrCb)", command=lambda: controller.apply_equalization("ycrcb"))
+        filter_menu.add_command(label="Equalizar histograma (cor - Lab)", command=lambda: controller.apply_equalization("lab"))
+        filter_menu.add_separator()
+        filter_menu.add_command(label="CLAHE (adaptativa)...", command=controller.apply_clahe)
+        filter_menu.add_command(label="CLAHE colorida (Lab)...", command=lambda: controller.apply_clahe("lab"))
+        filter_menu.add_separator()
+        filter_menu.add_command(label="Desfoque Gaussiano...", command=lambda: controller.apply_filter("gaussian"))
+        filter_menu.add_command(label="Média (box)...", command=lambda: controller.apply_filter("box"))
+        filter_menu.add_command(label="Mediana...", command=lambda: controller.apply_filter("median"))
+        filter_menu.add_command(label="Bilateral...", command=lambda: controller.apply_filter("bilateral"))
+        filter_menu.add_command(label="Nitidez (Unsharp Mask)...", command=lambda: controller.apply_filter("unsharp"))
+        filter_menu.add_command(label="Bordas - Sobel...", command=lambda: controller.apply_filter("sobel"))
+        filter_menu.add_command(label="Bordas - Laplaciano...", command=lambda: controller.apply_filter("laplacian"))
+        filter_menu.add_command(label="Kernel Personalizado...", command=lambda: controller.apply_filter("custom"))
         self.menubar.add_cascade(label="Filtros", menu=filter_menu)
 
         # Menu Análise
         analysis_menu = tk.Menu(self.menubar, tearoff=0)
         analysis_menu.add_command(label="Mostrar Histogramas", command=controller.show_histograms)
+        analysis_menu.add_command(label="Histogramas por Espaço de Cor...", command=controller.show_color_histograms)
+        analysis_menu.add_command(label="Bins do Histograma...", command=controller.set_histogram_bins)
+        analysis_menu.add_command(label="Reexecutar Histórico (LUT única)", command=controller.replay_fused_history)
+        analysis_menu.add_separator()
+        analysis_menu.add_command(label="Componentes Conectados...", command=controller.analyze_components)
+        analysis_menu.add_command(label="Exportar Componentes (CSV)...", command=controller.export_components_csv)
+        analysis_menu.add_command(label="Ocultar Componentes", command=controller.hide_components)
         self.menubar.add_cascade(label="Análise", menu=analysis_menu)
 
         # Menu Conversão
@@ -51,4 +94,29 @@ class MenuBar:
         threshold_menu.add_command(label="Multissegmentada - 16 tons", command=lambda: controller.apply_multithreshold(16))
         threshold_menu.add_separator()
         threshold_menu.add_command(label="Método de Otsu", command=controller.apply_otsu_threshold)
+        for count in range(2, 6):
+            threshold_menu.add_command(label=f"Otsu Multinível - {count} limiares",
+                                       command=lambda n=count: controller.apply_multi_otsu(n))
+        threshold_menu.add_separator()
+        threshold_menu.add_command(label="Adaptativa - Média Local", command=lambda: controller.apply_adaptive_threshold("mean"))
+        threshold_menu.add_command(label="Adaptativa - Niblack", command=lambda: controller.apply_adaptive_threshold("niblack"))
+        threshold_menu.add_command(label="Adaptativa - Sauvola", command=lambda: controller.apply_adaptive_threshold("sauvola"))
         self.menubar.add_cascade(label="Limiarização", menu=threshold_menu)
+
+        # Menu Morfologia (imagens binárias)
+        morphology_menu = tk.Menu(self.menubar, tearoff=0)
+        morphology_menu.add_command(label="Erosão...", command=lambda: controller.apply_morphology("erode"))
+        morphology_menu.add_command(label="Dilatação...", command=lambda: controller.apply_morphology("dilate"))
+        morphology_menu.add_command(label="Abertura...", command=lambda: controller.apply_morphology("open"))
+        morphology_menu.add_command(label="Fechamento...", command=lambda: controller.apply_morphology("close"))
+        morphology_menu.add_separator()
+        morphology_menu.add_command(label="Preencher buracos", command=lambda: controller.apply_morphology("fill_holes"))
+        self.menubar.add_cascade(label="Morfologia", menu=morphology_menu)
+
+        # Menu ROI (região de interesse)
+        roi_menu = tk.Menu(self.menubar, tearoff=0)
+        roi_menu.add_command(label="Selecionar Retângulo", command=lambda: controller.start_roi_selection("rect"))
+        roi_menu.add_command(label="Selecionar Polígono", command=lambda: controller.start_roi_selection("polygon"))
+        roi_menu.add_separator()
+        roi_menu.add_command(label="Limpar ROI", command=controller.clear_roi)
+        self.menubar.add_cascade(label="ROI", menu=roi_menu)
@@ -2,6 +2,7 @@ import tkinter as tk
 from views.menu_bar import MenuBar
 from views.image_panel import ImagePanel
 from views.control_panel import ControlPanel
+from views.document_tabs import DocumentTabs
 
 class View:
     def __init__(self, root, controller):
@@ -13,15 +14,20 @@ class View:
         self.root.config(menu=self.menu.menubar)
 
         # Painéis
+        self.document_tabs = DocumentTabs(self.root, controller=controller)
         self.image_panel = ImagePanel(self.root, controller=controller)
         self.control_panel = ControlPanel(self.root, controller=controller)
 
         # Prioriza empacotar o painel de controle primeiro para reservar espaço do log
         self.control_panel.frame.pack(side="right", fill="y")
+        self.document_tabs.notebook.pack(side="top", fill="x")
         self.image_panel.frame.pack(side="left", fill="both", expand=True)
 
     def display_image(self, image):
         self.image_panel.show_image(image)
+        # Manter histograma e uso de memória sempre atualizados
+        if self.controller is not None:
+            self.controller.on_image_displayed()
 
     def log_action(self, text):
         self.control_panel.add_log(text)
@@ -0,0 +1,59 @@
+"""
+Processamento automático das imagens que chegam a uma pasta (sem interface gráfica)
+
+Observa a pasta (inotify no Linux, varredura periódica nos demais sistemas), espera cada
+arquivo terminar de ser escrito, aplica as operações do arquivo de passos e grava na saída:
+    NOME.EXT.png        resultado de cada imagem (nome completo de origem + formato de --format)
+    NOME.EXT.pdf        relatório de cada imagem (com --pdf)
+    journal.jsonl       diário das imagens concluídas
+
+O arquivo de passos é um JSON no formato do histórico, ex.: [["gray", {}], ["otsu", {}]],
+ou uma sessão salva (.pdis), cujo histórico é reaplicado em cada imagem.
+Rodar de novo com a mesma saída não reprocessa as imagens concluídas, e as que estavam
+em processamento quando o serviço parou são refeitas.
+
+Uso (a partir da pasta pdi_studio):
+    python watch_folder.py PASTA --output SAIDA --steps PASSOS.json [--workers 2] [--format .png]
+                           [--pdf] [--settle 2] [--polling] [--report-interval 10]
+"""
+import argparse
+import signal
+import sys
+import threading
+from models.watch_folder import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_SECONDS, WatchFolder, load_steps
+
+def main():
+    parser = argparse.ArgumentParser(description="Processa as imagens que chegam a uma pasta")
+    parser.add_argument("input", help="pasta observada")
+    parser.add_argument("--output", required=True, help="pasta dos resultados (e do diário)")
+    parser.add_argument("--steps", required=True, help="operações: JSON [[nome, parâmetros], ...] ou sessão .pdis")
+    parser.add_argument("--workers", type=int, default=2, help="imagens processadas ao mesmo tempo")
+    parser.add_argument("--format", default=".png", help="extensão dos resultados (.png, .jpg, .tif, ...)")
+    parser.add_argument("--pdf", action="store_true", help="grava também o relatório PDF de cada imagem")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="segundos sem mudança para considerar o arquivo completo")
+    parser.add_argument("--polling", action="store_true", help="usa varredura periódica mesmo com inotify")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="segundos entre varreduras")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="segundos entre as linhas de progresso")
+    args = parser.parse_args()
+
+    try:
+        steps = load_steps(args.steps)
+        watcher = WatchFolder(args.input, args.output, steps, workers=args.workers, extension=args.format,
+                              pdf=args.pdf, settle=args.settle, polling=args.polling,
+                              poll_interval=args.poll_interval, report_interval=args.report_interval)
+    except (OSError, ValueError) as error:
+        print(f"Erro: {error}", file=sys.stderr)
+        return 1
+
+    # Ctrl+C e SIGTERM terminam as imagens em processamento antes de sair
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    watcher.run(stop)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())